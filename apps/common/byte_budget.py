@@ -0,0 +1,48 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""按字节数限制并发的异步信号量"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class ByteBudget:
+    """
+    全局字节预算
+
+    每个任务在执行前预留所需的字节数，预算不足时等待其他任务释放；
+    单次预留超过总预算时按总预算计算，避免永远无法执行。
+    """
+
+    def __init__(self, total: int) -> None:
+        """
+        初始化预算
+
+        :param total: 总字节数
+        """
+        self._total = total
+        self._available = total
+        self._condition = asyncio.Condition()
+
+    @property
+    def available(self) -> int:
+        """当前可用的字节数"""
+        return self._available
+
+    @asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[None]:
+        """
+        预留字节数，退出上下文时释放
+
+        :param size: 需要预留的字节数
+        """
+        size = max(0, min(size, self._total))
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._available >= size)
+            self._available -= size
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._available += size
+                self._condition.notify_all()
@@ -0,0 +1,219 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+MongoDB索引注册表
+
+所有集合的索引在此集中声明，并在服务启动时统一创建；业务代码中不应再调用 ``create_index``。
+启动时会对比数据库中已有的索引，输出差异报告：缺失的索引会被创建，定义不一致和未在此声明的索引只报告。
+多个进程同时启动时都会执行，因此启动时不删除任何索引；定义不一致的索引通过 ``apps/scripts/rebuild_indexes.py`` 重建。
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from apps.common.mongo import MongoDB
+
+if TYPE_CHECKING:
+    from pymongo.asynchronous.database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+# 比较索引定义时关注的选项
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds")
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """单个索引的声明"""
+
+    collection: str
+    keys: tuple[tuple[str, int], ...]
+    options: dict[str, Any] = field(default_factory=dict, hash=False)
+
+    @property
+    def name(self) -> str:
+        """索引名称；与MongoDB默认生成的名称一致，以兼容已有的索引"""
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def to_model(self) -> IndexModel:
+        """转换为pymongo的IndexModel"""
+        return IndexModel(list(self.keys), name=self.name, **self.options)
+
+
+MONGO_INDEXES: list[IndexSpec] = [
+    # 会话与Token：过期自动删除
+    IndexSpec("session", (("expired_at", ASCENDING),), {"expireAfterSeconds": 0}),
+    IndexSpec("session", (("user_sub", ASCENDING),)),
+    IndexSpec("session_revocation", (("expired_at", ASCENDING),), {"expireAfterSeconds": 0}),
+    IndexSpec("token", (("expired_at", ASCENDING),), {"expireAfterSeconds": 0}),
+    # 用户
+    IndexSpec("user", (("api_key", ASCENDING),), {"sparse": True}),
+    IndexSpec("user", (("login_time", ASCENDING),)),
+    # 对话与问答
+    IndexSpec(
+        "conversation",
+        (("user_sub", ASCENDING), ("debug", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)),
+    ),
+    IndexSpec("conversation", (("user_sub", ASCENDING), ("llm.llm_id", ASCENDING))),
+    IndexSpec(
+        "record_group",
+        (("conversation_id", ASCENDING), ("user_sub", ASCENDING), ("created_at", DESCENDING)),
+    ),
+    IndexSpec("record_group", (("user_sub", ASCENDING),)),
+    # 仅用于尚未迁移的旧数据
+    IndexSpec("record_group", (("records.id", ASCENDING),)),
+    IndexSpec("record_group", (("task_id", ASCENDING),)),
+    IndexSpec("record", (("groupId", ASCENDING), ("createdAt", ASCENDING))),
+    IndexSpec("record", (("conversationId", ASCENDING),)),
+    IndexSpec("record", (("user_sub", ASCENDING),)),
+    IndexSpec("document", (("user_sub", ASCENDING), ("conversation_id", ASCENDING))),
+    IndexSpec("document", (("conversation_id", ASCENDING),)),
+    # 任务
+    IndexSpec("task", (("conversation_id", ASCENDING),)),
+    IndexSpec("flow_context", (("task_id", ASCENDING), ("created_at", DESCENDING))),
+    # 限流
+    IndexSpec("activity", (("user_sub", ASCENDING),)),
+    IndexSpec("activity", (("timestamp", ASCENDING),)),
+    # 应用、服务与节点
+    IndexSpec("app", (("created_at", DESCENDING),)),
+    IndexSpec("app", (("search_terms", ASCENDING),)),
+    IndexSpec("node", (("service_id", ASCENDING),)),
+    IndexSpec("node", (("call_id", ASCENDING),)),
+    IndexSpec("mcp", (("activated", ASCENDING),)),
+    IndexSpec("mcp", (("name", ASCENDING),)),
+    # 黑名单与画像
+    IndexSpec("blacklist", (("user_sub", ASCENDING),)),
+    IndexSpec("question_blacklist", (("is_audited", ASCENDING),)),
+    IndexSpec("domain", (("domain_name", ASCENDING),)),
+    IndexSpec("llm", (("user_sub", ASCENDING),)),
+]
+"""所有集合的索引声明"""
+
+
+@dataclass
+class IndexDriftReport:
+    """声明的索引与数据库中实际索引的差异"""
+
+    missing: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    extra: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    """创建或重建失败的索引；由 ``ensure_indexes`` 填写"""
+
+    @property
+    def clean(self) -> bool:
+        """数据库中的索引是否与声明完全一致"""
+        return not (self.missing or self.changed or self.extra)
+
+
+def diff_indexes(
+    specs: list[IndexSpec],
+    existing: dict[str, dict[str, dict[str, Any]]],
+) -> IndexDriftReport:
+    """
+    对比声明的索引与已有的索引
+
+    :param specs: 索引声明
+    :param existing: 各集合已有的索引，格式与 ``index_information()`` 的返回值相同
+    :return: 差异报告；条目格式为“集合名.索引名”
+    """
+    report = IndexDriftReport()
+    declared: dict[str, set[str]] = {}
+    for spec in specs:
+        declared.setdefault(spec.collection, set()).add(spec.name)
+        info = existing.get(spec.collection, {}).get(spec.name)
+        if info is None:
+            report.missing.append(f"{spec.collection}.{spec.name}")
+            continue
+        same_keys = [tuple(item) for item in info.get("key", [])] == list(spec.keys)
+        same_options = all(info.get(option) == spec.options.get(option) for option in _COMPARED_OPTIONS)
+        if not (same_keys and same_options):
+            report.changed.append(f"{spec.collection}.{spec.name}")
+
+    for collection, indexes in existing.items():
+        if collection not in declared:
+            continue
+        report.extra.extend(
+            f"{collection}.{name}" for name in indexes if name != "_id_" and name not in declared[collection]
+        )
+    return report
+
+
+async def check_indexes(specs: list[IndexSpec] | None = None) -> IndexDriftReport:
+    """
+    对比声明的索引与数据库中实际的索引；不修改数据库
+
+    :param specs: 索引声明；默认为 ``MONGO_INDEXES``
+    :return: 差异报告
+    """
+    specs = MONGO_INDEXES if specs is None else specs
+    mongo = MongoDB()
+    existing = {
+        name: await mongo.get_collection(name).index_information()
+        for name in sorted({spec.collection for spec in specs})
+    }
+    return diff_indexes(specs, existing)
+
+
+async def ensure_indexes(specs: list[IndexSpec] | None = None, *, rebuild: bool = False) -> IndexDriftReport:
+    """
+    按声明创建索引；可重复执行
+
+    单个索引创建失败（如与已有索引冲突）时记录日志并继续，不影响服务启动
+
+    :param specs: 索引声明；默认为 ``MONGO_INDEXES``
+    :param rebuild: 是否删除并重建定义不一致的索引；为False时只报告
+    :return: 执行前的差异报告，以及创建失败的索引
+    """
+    specs = MONGO_INDEXES if specs is None else specs
+    mongo = MongoDB()
+    report = await check_indexes(specs)
+
+    for spec in specs:
+        key = f"{spec.collection}.{spec.name}"
+        if key not in report.missing and not (rebuild and key in report.changed):
+            continue
+        collection = mongo.get_collection(spec.collection)
+        try:
+            if key in report.changed:
+                await collection.drop_index(spec.name)
+            await collection.create_indexes([spec.to_model()])
+        except OperationFailure:
+            logger.exception("[MongoIndex] 索引 %s 创建失败，请手动处理", key)
+            report.failed.append(key)
+
+    created = [key for key in report.missing if key not in report.failed]
+    if created:
+        logger.info("[MongoIndex] 已创建索引: %s", ", ".join(created))
+    if report.changed and rebuild:
+        rebuilt = [key for key in report.changed if key not in report.failed]
+        logger.warning("[MongoIndex] 索引定义与声明不一致，已重建: %s", ", ".join(rebuilt))
+    elif report.changed:
+        logger.warning(
+            "[MongoIndex] 索引定义与声明不一致，请执行 apps/scripts/rebuild_indexes.py 重建: %s",
+            ", ".join(report.changed),
+        )
+    if report.extra:
+        logger.warning("[MongoIndex] 存在未声明的索引: %s", ", ".join(report.extra))
+    if report.failed:
+        logger.error("[MongoIndex] 以下索引未能创建: %s", ", ".join(report.failed))
+    return report
+
+
+async def explain(collection: str, query: dict[str, Any], sort: list[tuple[str, int]] | None = None) -> dict[str, Any]:
+    """
+    获取查询的执行计划，用于验证查询是否命中索引
+
+    :param collection: 集合名称
+    :param query: 查询条件
+    :param sort: 排序条件
+    :return: 执行计划中的 ``winningPlan``
+    """
+    database: AsyncDatabase = MongoDB().get_collection(collection).database
+    command: dict[str, Any] = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    result = await database.command("explain", command, verbosity="queryPlanner")
+    return result["queryPlanner"]["winningPlan"]
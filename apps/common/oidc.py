@@ -55,11 +55,6 @@ class OIDCProvider:
             upsert=True,
         )
 
-        await sessions_collection.create_index(
-            "expired_at",
-            expireAfterSeconds=0,
-        )
-
     async def get_login_status(self, cookie: dict[str, str]) -> dict[str, Any]:
         """检查登录状态"""
         return await self.provider.get_login_status(cookie)
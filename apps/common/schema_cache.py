@@ -0,0 +1,103 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""全局共享的JSON Schema编译结果；相同的Schema只校验、编译一次"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from copy import deepcopy
+from hashlib import sha256
+from typing import Any, TypeVar
+
+from jsonschema import Draft7Validator
+from jsonschema.protocols import Validator
+
+from apps.common.singleton import SingletonMeta
+from apps.constants import SCHEMA_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+class SchemaCache(metaclass=SingletonMeta):
+    """
+    JSON Schema编译结果的缓存
+
+    以“用途 + Schema哈希”为Key缓存校验器、处理器等由Schema派生的对象；超过容量时按LRU淘汰。
+    缓存的对象在多个请求间共享，调用方不应修改其中的内容。
+    """
+
+    def __init__(self, max_size: int = SCHEMA_CACHE_SIZE) -> None:
+        """初始化缓存"""
+        self._max_size = max_size
+        self._items: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash(schema: dict[str, Any]) -> str:
+        """
+        计算Schema的哈希值；与字段顺序无关
+
+        :param schema: JSON Schema
+        :return: 哈希值
+        """
+        raw = json.dumps(schema, ensure_ascii=False, sort_keys=True, default=str)
+        return sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        kind: str,
+        schema: dict[str, Any],
+        factory: Callable[[dict[str, Any]], T],
+        schema_hash: str | None = None,
+    ) -> T:
+        """
+        获取由Schema派生的对象；不存在时使用factory创建
+
+        :param kind: 派生对象的用途，用于区分同一Schema的不同派生对象
+        :param schema: JSON Schema
+        :param factory: 创建函数，参数为Schema的副本
+        :param schema_hash: 已计算好的Schema哈希值
+        :return: 派生对象
+        """
+        key = (kind, schema_hash or self.hash(schema))
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        # 使用副本，避免调用方后续修改Schema时影响缓存内容
+        item = factory(deepcopy(schema))
+        with self._lock:
+            self._items[key] = item
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+        return item
+
+    def validator(
+        self,
+        schema: dict[str, Any],
+        validator_cls: type[Validator] = Draft7Validator,
+        schema_hash: str | None = None,
+    ) -> Validator:
+        """
+        获取Schema对应的校验器；Schema仅在首次编译时检查合法性
+
+        :param schema: JSON Schema
+        :param validator_cls: 校验器类型
+        :param schema_hash: 已计算好的Schema哈希值
+        :return: 校验器
+        :raises jsonschema.exceptions.SchemaError: Schema不合法
+        """
+        def _create(schema: dict[str, Any]) -> Validator:
+            validator_cls.check_schema(schema)
+            return validator_cls(schema)
+
+        # 动态生成的校验器类可能同名，因此使用类的id区分
+        return self.get(f"validator:{id(validator_cls)}", schema, _create, schema_hash)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
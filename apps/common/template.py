@@ -0,0 +1,71 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""全局共享的Jinja2沙箱模板；相同的模板源码只编译一次"""
+
+import logging
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+
+from jinja2 import BaseLoader, Template
+from jinja2.sandbox import SandboxedEnvironment
+
+from apps.common.singleton import SingletonMeta
+from apps.constants import TEMPLATE_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateRegistry(metaclass=SingletonMeta):
+    """
+    已编译模板的注册表
+
+    模板以“源码哈希 + 是否转义”为Key缓存；超过容量时按LRU淘汰。
+    所有模板共用同一组沙箱环境（trim_blocks、lstrip_blocks均开启）。
+    """
+
+    def __init__(self, max_size: int = TEMPLATE_CACHE_SIZE) -> None:
+        """初始化沙箱环境与缓存"""
+        self._envs = {
+            autoescape: SandboxedEnvironment(
+                loader=BaseLoader(),
+                autoescape=autoescape,
+                trim_blocks=True,
+                lstrip_blocks=True,
+            )
+            for autoescape in (False, True)
+        }
+        self._max_size = max_size
+        self._templates: OrderedDict[tuple[str, bool], Template] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source: str, *, autoescape: bool = False) -> Template:
+        """
+        获取编译后的模板
+
+        :param source: 模板源码
+        :param autoescape: 是否对变量进行HTML转义
+        :return: 编译后的模板
+        """
+        key = (sha256(source.encode("utf-8")).hexdigest(), autoescape)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+
+        template = self._envs[autoescape].from_string(source)
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self._max_size:
+                self._templates.popitem(last=False)
+        return template
+
+    def warmup(self, sources: list[tuple[str, bool]]) -> None:
+        """
+        预先编译模板
+
+        :param sources: (模板源码, 是否转义) 列表
+        """
+        for source, autoescape in sources:
+            self.get(source, autoescape=autoescape)
+        logger.info("[TemplateRegistry] 已预编译 %d 个模板", len(sources))
@@ -0,0 +1,109 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""带过期时间的进程内异步缓存；同一Key的并发未命中只触发一次加载"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    """获取加载任务的异常，避免所有调用方都已取消时出现“异常未被获取”的告警"""
+    if not task.cancelled():
+        task.exception()
+
+
+class AsyncTTLCache(Generic[K, V]):
+    """
+    异步TTL缓存
+
+    加载结果为None时视为“不存在”，按 ``negative_ttl`` 缓存，避免无效Key反复查询数据库；
+    加载过程抛出异常时不缓存，异常会传给所有等待该Key的调用方。
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, max_size: int) -> None:
+        """
+        初始化缓存
+
+        :param ttl: 有效结果的缓存时间，单位为秒
+        :param negative_ttl: 结果为None时的缓存时间，单位为秒
+        :param max_size: 最大条目数；超出时按LRU淘汰
+        """
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_size = max_size
+        self._data: OrderedDict[K, tuple[float, V | None]] = OrderedDict()
+        self._loading: dict[K, asyncio.Task[V | None]] = {}
+        self._generation = 0
+
+    async def get(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> V | None:
+        """
+        获取缓存；未命中时调用 ``loader`` 加载
+
+        :param key: 缓存Key
+        :param loader: 加载函数
+        :return: 缓存的值
+        """
+        item = self._data.get(key)
+        if item is not None:
+            expire_at, value = item
+            if expire_at > time.monotonic():
+                self._data.move_to_end(key)
+                return value
+            del self._data[key]
+
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            task.add_done_callback(_consume_exception)
+            self._loading[key] = task
+        # 调用方被取消时，不影响其他等待同一Key的调用方
+        return await asyncio.shield(task)
+
+    async def _load(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> V | None:
+        """调用加载函数，并将结果写入缓存"""
+        generation = self._generation
+        try:
+            value = await loader()
+        finally:
+            if self._loading.get(key) is asyncio.current_task():
+                del self._loading[key]
+
+        # 加载期间发生过失效操作时，结果可能已过时，不写入缓存
+        if generation == self._generation:
+            self._data[key] = (time.monotonic() + (self._ttl if value is not None else self._negative_ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+        return value
+
+    def invalidate(self, key: K) -> None:
+        """
+        使某个Key失效
+
+        :param key: 缓存Key
+        """
+        self._generation += 1
+        self._data.pop(key, None)
+        self._loading.pop(key, None)
+
+    def invalidate_value(self, value: V) -> None:
+        """
+        使所有值等于 ``value`` 的条目失效
+
+        :param value: 缓存的值
+        """
+        self._generation += 1
+        for key in [key for key, (_, item) in self._data.items() if item == value]:
+            del self._data[key]
+        self._loading.clear()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._generation += 1
+        self._data.clear()
+        self._loading.clear()
@@ -26,6 +26,59 @@ STEP_HISTORY_SIZE = 3
 SESSION_TTL = 30 * 24 * 60
 # JSON生成最大尝试次数
 JSON_GEN_MAX_TRIAL = 3
+# 大模型响应缓存默认有效期，单位为秒
+LLM_CACHE_TTL = 10 * 60
+# 大模型响应缓存（内存后端）最大条目数
+LLM_CACHE_MAX_SIZE = 4096
+# 大模型请求排队超过该时间（秒）时记录告警
+LLM_QUEUE_WARN_TIME = 5
+# 已编译Jinja2模板缓存的最大数量
+TEMPLATE_CACHE_SIZE = 512
+# 已编译JSON Schema（校验器、处理器）缓存的最大数量
+SCHEMA_CACHE_SIZE = 1024
+# Token计数缓存的最大条目数
+TOKEN_COUNT_CACHE_SIZE = 4096
+# 文本总长度（字符数）超过该值时，在线程池中计算Token，避免阻塞事件循环
+TOKEN_OFFLOAD_MIN_CHARS = 20000
+# 问答时知识库检索的最长等待时间（秒）；超时后使用已返回的部分结果
+RAG_SEARCH_DEADLINE = 20
+# 知识库检索结果缓存有效期，单位为秒
+RAG_CACHE_TTL = 5 * 60
+# 知识库检索结果缓存最大条目数
+RAG_CACHE_MAX_SIZE = 1024
+# 对话上下文中，最近问答的Token预算；更早的问答由对话摘要概括
+HISTORY_TOKEN_BUDGET = 4096
+# 对话摘要并发更新冲突时的最大重试次数
+SUMMARY_UPDATE_MAX_RETRY = 3
+# 解密后的历史问答缓存：最多缓存的对话数，以及每个对话最多缓存的问答数
+HISTORY_CACHE_CONVERSATIONS = 1024
+HISTORY_CACHE_RECORDS = 32
+# 鉴权缓存（API Key、用户黑名单）有效期，单位为秒
+AUTH_CACHE_TTL = 60
+# 鉴权缓存中“不存在”结果的有效期，单位为秒
+AUTH_CACHE_NEGATIVE_TTL = 10
+# 鉴权缓存的最大条目数
+AUTH_CACHE_MAX_SIZE = 4096
+# 应用列表页缓存有效期，单位为秒
+APP_LIST_CACHE_TTL = 10
+# 应用列表页缓存的最大条目数
+APP_LIST_CACHE_SIZE = 256
+# 上传文件时用于识别MIME类型的文件头长度，单位为字节；OOXML需在ZIP中向后查找word/、xl/等条目，不能过短
+DOCUMENT_MIME_SNIFF_SIZE = 64 * 1024
+# 上传文件到MinIO时的分片大小，单位为字节；MinIO要求分片不小于5MiB
+DOCUMENT_UPLOAD_PART_SIZE = 5 * 1024 * 1024
+# 所有并发上传共享的内存预算，单位为字节
+DOCUMENT_UPLOAD_BUDGET = 64 * 1024 * 1024
+# Select投票最大次数
+SELECT_VOTE_COUNT = 3
+# 选项数量不超过该值时，Select只进行单次投票
+SELECT_SINGLE_VOTE_MAX_CHOICES = 2
+# Flow向量检索：Top1相似度不低于该值时，才可能跳过大模型选择
+FLOW_VECTOR_BYPASS_MIN_SCORE = 0.75
+# Flow向量检索：Top1相似度领先Top2不少于该值时，跳过大模型选择
+FLOW_VECTOR_BYPASS_MARGIN = 0.1
+# Flow向量检索：交给大模型选择的Flow数量上限
+FLOW_VECTOR_TOP_K = 5
 # 推理开始标记
 REASONING_BEGIN_TOKEN = [
     "<think>",
@@ -6,14 +6,46 @@ import logging
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from starlette import status
+from starlette.datastructures import MutableHeaders
 from starlette.exceptions import HTTPException
 from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from apps.services.api_key import ApiKeyManager
 from apps.services.session import SessionManager
 
 logger = logging.getLogger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+SESSION_TOKEN_HEADER = "X-Session-Token"  # noqa: S105 响应头名称，并非密钥
+
+
+class SessionTokenMiddleware:
+    """Session Token过期后重新签发时，通过响应头将新Token返回给前端"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """初始化"""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """处理请求"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+
+        async def send_with_token(message: Message) -> None:
+            token = state.get("session_token")
+            # 只在成功的响应中返回新Token
+            if (
+                message["type"] == "http.response.start"
+                and token
+                and status.HTTP_200_OK <= message["status"] < status.HTTP_300_MULTIPLE_CHOICES
+            ):
+                MutableHeaders(scope=message)[SESSION_TOKEN_HEADER] = token
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
 
 
 async def _get_session_id_from_request(request: HTTPConnection) -> str | None:
@@ -31,6 +63,20 @@ async def _get_session_id_from_request(request: HTTPConnection) -> str | None:
     return session_id
 
 
+async def _refresh_session_token(request: HTTPConnection, session_id: str) -> None:
+    """
+    Session Token已过期但Session仍然有效时，签发新Token，由中间件通过响应头返回给前端
+
+    调用前需已通过 ``SessionManager.get_user`` 或 ``SessionManager.verify_user`` 校验（含黑名单检查）
+
+    :param request: HTTP请求
+    :param session_id: 请求携带的Session ID或Session Token
+    """
+    token = await SessionManager.refresh_token(session_id)
+    if token is not None:
+        request.state.session_token = token
+
+
 async def verify_user(request: HTTPConnection) -> None:
     """
     验证Session是否已鉴权；未鉴权则抛出HTTP 401；接口级dependence
@@ -59,7 +105,8 @@ async def get_session(request: HTTPConnection) -> str:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Session ID 鉴权失败",
         )
-    return session_id
+    await _refresh_session_token(request, session_id)
+    return SessionManager.get_session_id(session_id)
 
 
 async def get_user(request: HTTPConnection) -> str:
@@ -83,8 +130,9 @@ async def get_user(request: HTTPConnection) -> str:
             detail="Session ID 鉴权失败",
         )
 
+    await _refresh_session_token(request, session_id)
     request.state.user_sub = user_sub
-    request.state.session_id = session_id
+    request.state.session_id = SessionManager.get_session_id(session_id)
     return user_sub
 
 
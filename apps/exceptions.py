@@ -12,15 +12,28 @@ class InstancePermissionError(Exception):
     """App/Service实例的权限错误"""
 
 
-class FlowBranchValidationError(Exception):
+class FlowValidationError(Exception):
+    """service.flow 流程验证错误；一次性包含所有错误信息"""
+
+    def __init__(self, errors: list[str] | str) -> None:
+        """
+        初始化
+
+        :param errors: 错误信息列表
+        """
+        self.errors = [errors] if isinstance(errors, str) else errors
+        super().__init__("；".join(self.errors))
+
+
+class FlowBranchValidationError(FlowValidationError):
     """service.flow 流程分支验证错误"""
 
 
-class FlowNodeValidationError(Exception):
+class FlowNodeValidationError(FlowValidationError):
     """service.flow 流程节点验证错误"""
 
 
-class FlowEdgeValidationError(Exception):
+class FlowEdgeValidationError(FlowValidationError):
     """service.flow 流程边验证错误"""
 
 
@@ -0,0 +1,190 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""大模型响应缓存；对相同的模型、Prompt、Schema和温度，直接返回此前的结果"""
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from copy import deepcopy
+from hashlib import sha256
+from typing import Any
+from uuid import uuid4
+
+import aiofiles
+from anyio import Path
+
+from apps.common.config import Config
+from apps.common.singleton import SingletonMeta
+from apps.constants import LLM_CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCacheBackend(ABC):
+    """缓存后端抽象类"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        """获取缓存；不存在或已过期时返回None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入缓存"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """清空缓存"""
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(LLMCacheBackend):
+    """进程内缓存后端；超出容量时按LRU淘汰"""
+
+    def __init__(self, max_size: int = LLM_CACHE_MAX_SIZE) -> None:
+        """初始化缓存"""
+        self._max_size = max_size
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Any | None:
+        """获取缓存；返回副本，调用方修改结果不会影响缓存"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expire_at, value = item
+        if expire_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return deepcopy(value)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入缓存"""
+        self._data[key] = (time.monotonic() + ttl, deepcopy(value))
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    async def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
+
+
+class DiskCacheBackend(LLMCacheBackend):
+    """磁盘缓存后端；每个Key对应一个JSON文件，可在多个Worker间共享"""
+
+    def __init__(self, path: Path) -> None:
+        """初始化缓存目录"""
+        self._path = path
+
+    def _file(self, key: str) -> Path:
+        """Key对应的缓存文件"""
+        return self._path / key[:2] / f"{key}.json"
+
+    async def get(self, key: str) -> Any | None:
+        """获取缓存"""
+        file = self._file(key)
+        try:
+            async with aiofiles.open(file, encoding="utf-8") as f:
+                item = json.loads(await f.read())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("[LLMCache] 读取缓存文件 %s 失败", file)
+            return None
+
+        if item["expire_at"] < time.time():
+            await file.unlink(missing_ok=True)
+            return None
+        return item["value"]
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入缓存；先写临时文件再重命名，避免读到不完整的内容；临时文件名唯一，并发写入同一Key时互不覆盖"""
+        file = self._file(key)
+        tmp_file = file.with_name(f"{file.name}.{uuid4().hex}.tmp")
+        try:
+            await file.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(tmp_file, "w", encoding="utf-8") as f:
+                await f.write(json.dumps({"expire_at": time.time() + ttl, "value": value}, ensure_ascii=False))
+            await tmp_file.rename(file)
+        except Exception:
+            logger.exception("[LLMCache] 写入缓存文件 %s 失败", file)
+            await tmp_file.unlink(missing_ok=True)
+
+    async def clear(self) -> None:
+        """清空缓存"""
+        if not await self._path.exists():
+            return
+        async for file in self._path.rglob("*.json"):
+            await file.unlink(missing_ok=True)
+
+
+class LLMResponseCache(metaclass=SingletonMeta):
+    """
+    大模型响应缓存
+
+    仅用于输出可复用的内部调用（问题改写、选择、事实提取等）；是否使用缓存由调用方通过 ``cache_ttl`` 决定。
+    只缓存温度为0的调用：启用缓存的调用默认使用温度0，显式指定了非0温度的调用不使用缓存。
+    """
+
+    def __init__(self) -> None:
+        """根据配置文件选择缓存后端"""
+        config = Config().get_config()
+        backend = config.llm_cache.backend
+        self._backend: LLMCacheBackend | None
+        if backend == "memory":
+            self._backend = MemoryCacheBackend()
+        elif backend == "disk":
+            self._backend = DiskCacheBackend(Path(config.deploy.data_dir) / "cache" / "llm")
+        else:
+            self._backend = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: list[dict[str, Any]],
+        schema: dict[str, Any] | None,
+        temperature: float | None,
+    ) -> str:
+        """
+        生成缓存Key
+
+        :param model: 模型名称
+        :param messages: 渲染后的Prompt（消息列表）
+        :param schema: 输出的JSON Schema；非结构化输出时为None
+        :param temperature: 大模型温度
+        :return: 缓存Key
+        """
+        raw = json.dumps(
+            {"model": model, "messages": messages, "schema": schema, "temperature": temperature},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Any | None:
+        """获取缓存"""
+        if self._backend is None:
+            return None
+        value = await self._backend.get(key)
+        if value is not None:
+            logger.info("[LLMCache] 命中缓存 %s", key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入缓存"""
+        if self._backend is None or ttl <= 0:
+            return
+        async with self._lock:
+            await self._backend.set(key, value, ttl)
+
+    async def clear(self) -> None:
+        """清空缓存"""
+        if self._backend is None:
+            return
+        async with self._lock:
+            await self._backend.clear()
@@ -0,0 +1,243 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+大模型请求调度
+
+所有大模型请求在发出前需向调度器申请执行位。调度器按Endpoint限制并发数与每分钟Token数；
+排队的请求按优先级（交互 > 选择 > 后台）出队，同一优先级内按用户轮转，避免单个用户占满上游。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from apps.common.config import Config
+from apps.common.singleton import SingletonMeta
+from apps.constants import LLM_QUEUE_WARN_TIME
+from apps.schemas.config import LLMEndpointLimitConfig
+from apps.schemas.enum_var import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+llm_user: ContextVar[str] = ContextVar("llm_user", default="")
+"""当前发起大模型请求的用户；由Scheduler在任务开始时设置，用于同优先级内的公平排队"""
+
+PRIORITY_ORDER = [LLMPriority.INTERACTIVE, LLMPriority.SELECTION, LLMPriority.BACKGROUND]
+"""优先级从高到低的顺序"""
+
+
+@dataclass
+class LLMTicket:
+    """执行位；请求结束后应将实际消耗的Token数写入 ``used_tokens``"""
+
+    reserved_tokens: int
+    used_tokens: int | None = None
+
+
+@dataclass
+class QueueMetrics:
+    """单个Endpoint、单个优先级的排队统计"""
+
+    count: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def avg_wait(self) -> float:
+        """平均排队时间"""
+        return self.total_wait / self.count if self.count else 0.0
+
+
+@dataclass
+class _Waiter:
+    """排队中的请求"""
+
+    future: asyncio.Future
+    tokens: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class _EndpointState:
+    """单个Endpoint的并发、Token桶与排队状态"""
+
+    def __init__(self, endpoint: str, limit: LLMEndpointLimitConfig) -> None:
+        """初始化"""
+        self.endpoint = endpoint
+        self.max_concurrency = limit.max_concurrency
+        self.tokens_per_minute = limit.tokens_per_minute
+        self.active = 0
+        self.bucket = float(limit.tokens_per_minute)
+        self.bucket_updated = time.monotonic()
+        self.lanes: dict[LLMPriority, OrderedDict[str, deque[_Waiter]]] = {
+            priority: OrderedDict() for priority in PRIORITY_ORDER
+        }
+        self.metrics: dict[LLMPriority, QueueMetrics] = {priority: QueueMetrics() for priority in PRIORITY_ORDER}
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    def _refill(self) -> None:
+        """按时间补充Token桶"""
+        now = time.monotonic()
+        self.bucket = min(
+            float(self.tokens_per_minute),
+            self.bucket + (now - self.bucket_updated) * self.tokens_per_minute / 60,
+        )
+        self.bucket_updated = now
+
+    def _peek(self) -> tuple[LLMPriority, str] | None:
+        """找到下一个应出队的请求：最高优先级中，轮转到的第一个用户"""
+        for priority in PRIORITY_ORDER:
+            lane = self.lanes[priority]
+            if lane:
+                return priority, next(iter(lane))
+        return None
+
+    def _pop(self, priority: LLMPriority, user: str) -> _Waiter:
+        """取出请求；该用户仍有排队请求时，将其移到队尾"""
+        lane = self.lanes[priority]
+        queue = lane.pop(user)
+        waiter = queue.popleft()
+        if queue:
+            lane[user] = queue
+        return waiter
+
+    def enqueue(self, priority: LLMPriority, user: str, waiter: _Waiter) -> None:
+        """请求入队"""
+        self.lanes[priority].setdefault(user, deque()).append(waiter)
+
+    def remove(self, priority: LLMPriority, user: str, waiter: _Waiter) -> None:
+        """移除被取消的请求"""
+        queue = self.lanes[priority].get(user)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self.lanes[priority][user]
+
+    def dispatch(self) -> None:
+        """在并发数和Token桶允许的范围内，唤醒排队的请求"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        while self.active < self.max_concurrency:
+            head = self._peek()
+            if head is None:
+                return
+            priority, user = head
+            waiter = self.lanes[priority][user][0]
+            if waiter.future.done():
+                # 调用方已被取消，但尚未从队列中移除；跳过，不占用执行位和Token
+                self._pop(priority, user)
+                continue
+
+            if self.tokens_per_minute:
+                self._refill()
+                if self.bucket < waiter.tokens:
+                    delay = (waiter.tokens - self.bucket) * 60 / self.tokens_per_minute
+                    self._wakeup = asyncio.get_running_loop().call_later(delay, self.dispatch)
+                    return
+                self.bucket -= waiter.tokens
+
+            self._pop(priority, user)
+            self.active += 1
+            waited = time.monotonic() - waiter.enqueued_at
+            metrics = self.metrics[priority]
+            metrics.count += 1
+            metrics.total_wait += waited
+            metrics.max_wait = max(metrics.max_wait, waited)
+            if waited > LLM_QUEUE_WARN_TIME:
+                logger.warning(
+                    "[LLMDispatcher] %s 请求排队 %.2fs（优先级 %s，用户 %s）",
+                    self.endpoint, waited, priority.value, user,
+                )
+            waiter.future.set_result(None)
+
+    def release(self, ticket: LLMTicket) -> None:
+        """归还执行位；按实际消耗修正Token桶"""
+        self.active -= 1
+        if self.tokens_per_minute and ticket.used_tokens is not None:
+            self._refill()
+            self.bucket = max(
+                -float(self.tokens_per_minute),
+                self.bucket - (ticket.used_tokens - ticket.reserved_tokens),
+            )
+        self.dispatch()
+
+
+def estimate_tokens(messages: list[dict[str, Any]], max_tokens: int | None = None) -> int:
+    """
+    粗略估算一次请求的Token消耗，仅用于速率限制的预占；实际消耗以上游返回的用量为准
+
+    :param messages: 消息列表
+    :param max_tokens: 最大输出Token数
+    :return: 预估Token数
+    """
+    return sum(len(str(msg.get("content", ""))) for msg in messages) // 2 + (max_tokens or 0)
+
+
+class LLMDispatcher(metaclass=SingletonMeta):
+    """大模型请求调度器"""
+
+    def __init__(self) -> None:
+        """初始化"""
+        self._config = Config().get_config().llm_dispatch
+        self._endpoints: dict[str, _EndpointState] = {}
+
+    def _get_state(self, endpoint: str) -> _EndpointState:
+        """获取Endpoint状态；不存在时按配置创建"""
+        if endpoint not in self._endpoints:
+            limit = self._config.endpoints.get(endpoint, self._config.default)
+            self._endpoints[endpoint] = _EndpointState(endpoint, limit)
+        return self._endpoints[endpoint]
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        endpoint: str,
+        priority: LLMPriority,
+        tokens: int = 0,
+    ) -> AsyncGenerator[LLMTicket, None]:
+        """
+        申请执行位，在上下文结束时自动归还
+
+        :param endpoint: 大模型的API地址
+        :param priority: 请求优先级
+        :param tokens: 预估的Token消耗，用于Token速率限制
+        :return: 执行位；调用方应在拿到用量后设置 ``used_tokens``
+        """
+        state = self._get_state(endpoint)
+        if state.tokens_per_minute:
+            tokens = min(tokens, state.tokens_per_minute)
+        user = llm_user.get()
+        waiter = _Waiter(future=asyncio.get_running_loop().create_future(), tokens=tokens)
+        state.enqueue(priority, user, waiter)
+        state.dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已分配执行位，但调用方被取消
+                state.release(LLMTicket(reserved_tokens=tokens))
+            else:
+                state.remove(priority, user, waiter)
+                state.dispatch()
+            raise
+
+        ticket = LLMTicket(reserved_tokens=tokens)
+        try:
+            yield ticket
+        finally:
+            state.release(ticket)
+
+    def get_metrics(self) -> dict[str, dict[str, QueueMetrics]]:
+        """获取各Endpoint、各优先级的排队统计"""
+        return {
+            endpoint: {priority.value: metrics for priority, metrics in state.metrics.items()}
+            for endpoint, state in self._endpoints.items()
+        }
@@ -7,13 +7,17 @@ import re
 from textwrap import dedent
 from typing import Any
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
-from jsonschema import Draft7Validator
+from jsonschema import ValidationError
 
 from apps.common.config import Config
+from apps.common.schema_cache import SchemaCache
+from apps.common.template import TemplateRegistry
 from apps.constants import JSON_GEN_MAX_TRIAL, REASONING_END_TOKEN
+from apps.llm.cache import LLMResponseCache
+from apps.llm.dispatch import LLMDispatcher, estimate_tokens
+from apps.llm.json_repair import coerce_to_schema, repair_json
 from apps.llm.prompt import JSON_GEN_BASIC
+from apps.schemas.enum_var import LLMPriority
 
 logger = logging.getLogger(__name__)
 
@@ -165,7 +169,9 @@ class FunctionLLM:
                 json_str = dedent(json_str).strip()
                 json.loads(json_str)
             except Exception:  # noqa: BLE001
-                json_str = "{}"
+                # 尝试本地修复JSON结构
+                logger.warning("[FunctionCall] 正则提取失败！尝试修复JSON结构")
+                json_str = repair_json(response) or "{}"
 
         return json_str
 
@@ -206,100 +212,208 @@ class FunctionLLM:
         schema: dict[str, Any],
         max_tokens: int | None = None,
         temperature: float | None = None,
+        cache_ttl: float | None = None,
+        priority: LLMPriority = LLMPriority.SELECTION,
     ) -> dict[str, Any]:
         """
         调用FunctionCall小模型
 
         不开放流式输出
+
+        :param cache_ttl: 响应缓存有效期（秒）；为None时不使用缓存。
+            启用缓存且未指定温度时使用温度0；温度不为0时不使用缓存
+        :param priority: 请求优先级；上游繁忙时，高优先级请求先出队
         """
         # 检查max_tokens和temperature是否设置
         if max_tokens is None:
             max_tokens = self._config.max_tokens
         if temperature is None:
-            temperature = self._config.temperature
-
-        if self._config.backend == "ollama":
-            json_str = await self._call_ollama(messages, schema, max_tokens, temperature)
+            temperature = 0 if cache_ttl else self._config.temperature
 
-        elif self._config.backend in ["function_call", "json_mode", "response_format", "vllm"]:
-            json_str = await self._call_openai(messages, schema, max_tokens, temperature)
+        cache_key = None
+        if cache_ttl and temperature == 0:
+            cache_key = LLMResponseCache.make_key(self._config.model, messages, schema, temperature)
+            cached = await LLMResponseCache().get(cache_key)
+            if cached is not None:
+                return cached
 
-        else:
+        if self._config.backend not in ["ollama", "function_call", "json_mode", "response_format", "vllm"]:
             err = "未知的Function模型后端"
             raise ValueError(err)
 
+        async with LLMDispatcher().acquire(
+            self._config.endpoint, priority, estimate_tokens(messages, max_tokens),
+        ):
+            if self._config.backend == "ollama":
+                json_str = await self._call_ollama(messages, schema, max_tokens, temperature)
+            else:
+                json_str = await self._call_openai(messages, schema, max_tokens, temperature)
+
         try:
-            return json.loads(json_str)
+            result = json.loads(json_str)
         except Exception:  # noqa: BLE001
-            logger.error("[FunctionCall] 大模型JSON解析失败：%s", json_str)  # noqa: TRY400
-            return {}
+            repaired = repair_json(json_str)
+            if repaired is None:
+                logger.error("[FunctionCall] 大模型JSON解析失败：%s", json_str)  # noqa: TRY400
+                return {}
+            result = json.loads(repaired)
+
+        if cache_key and result:
+            await LLMResponseCache().set(cache_key, result, cache_ttl)
+        return result
 
 
 class JsonGenerator:
     """JSON生成器"""
 
-    def __init__(self, query: str, conversation: list[dict[str, str]], schema: dict[str, Any]) -> None:
-        """初始化JSON生成器"""
+    def __init__(
+        self,
+        query: str,
+        conversation: list[dict[str, str]],
+        schema: dict[str, Any],
+        cache_ttl: float | None = None,
+        priority: LLMPriority = LLMPriority.SELECTION,
+    ) -> None:
+        """
+        初始化JSON生成器
+
+        :param cache_ttl: 结果缓存有效期（秒）；为None时不使用缓存。仅缓存通过校验的结果；启用缓存时使用温度0
+        :param priority: 请求优先级
+        """
         self._query = query
         self._conversation = conversation
         self._schema = schema
+        self._cache_ttl = cache_ttl
+        self._temperature = 0 if cache_ttl else None
+        self._priority = priority
 
         self._trial = {}
         self._count = 0
-        self._env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
         self._err_info = ""
 
 
-    async def _assemble_message(self) -> str:
+    async def _assemble_message(self, schema: dict[str, Any] | None = None) -> str:
         """组装消息"""
         # 检查类型
         function_call = Config().get_config().function_call.backend == "function_call"
 
         # 渲染模板
-        template = self._env.from_string(JSON_GEN_BASIC)
+        template = TemplateRegistry().get(JSON_GEN_BASIC)
         return template.render(
             query=self._query,
             conversation=self._conversation,
             previous_trial=self._trial,
-            schema=self._schema,
+            schema=schema or self._schema,
             function_call=function_call,
             err_info=self._err_info,
         )
 
-    async def _single_trial(self, max_tokens: int | None = None, temperature: float | None = None) -> dict[str, Any]:
+    async def _single_trial(
+        self,
+        schema: dict[str, Any] | None = None,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> dict[str, Any]:
         """单次尝试"""
-        prompt = await self._assemble_message()
+        schema = schema or self._schema
+        prompt = await self._assemble_message(schema)
         messages = [
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": prompt},
         ]
+        if temperature is None:
+            temperature = self._temperature
         function = FunctionLLM()
-        return await function.call(messages, self._schema, max_tokens, temperature)
+        return await function.call(messages, schema, max_tokens, temperature, priority=self._priority)
+
+
+    def _failing_fields(self, result: dict[str, Any], errors: list[ValidationError]) -> list[str] | None:
+        """
+        找出校验失败的顶层字段
+
+        :return: 失败字段列表；错误不能归结到具体顶层字段时（如根类型错误）返回None
+        """
+        properties = self._schema.get("properties", {})
+        fields = []
+        for error in errors:
+            if error.absolute_path:
+                error_fields = [error.absolute_path[0]]
+            elif error.validator == "required":
+                # 每个缺失字段各对应一条错误，但validator_value都是完整的required列表，因此直接取全部缺失字段
+                error_fields = [name for name in error.validator_value if name not in result]
+            else:
+                return None
+            for field in error_fields:
+                if field not in properties:
+                    return None
+                if field not in fields:
+                    fields.append(field)
+        return fields
+
+
+    async def _partial_reask(self, result: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+        """只针对校验失败的字段重新询问大模型，并合并到原结果中"""
+        logger.info("[JSONGenerator] 仅重新生成字段：%s", fields)
+        sub_schema = {
+            "type": "object",
+            "properties": {field: self._schema["properties"][field] for field in fields},
+            "required": [field for field in fields if field in self._schema.get("required", [])],
+        }
+        if "$defs" in self._schema:
+            sub_schema["$defs"] = self._schema["$defs"]
+
+        partial = await self._single_trial(sub_schema)
+        if isinstance(partial, dict):
+            result = {**result, **{field: partial[field] for field in fields if field in partial}}
+        return coerce_to_schema(result, self._schema)
 
 
     async def generate(self) -> dict[str, Any]:
-        """生成JSON"""
-        Draft7Validator.check_schema(self._schema)
-        validator = Draft7Validator(self._schema)
+        """
+        生成JSON
+
+        每次大模型输出后，先在本地按Schema修复；仍不合法时，若错误集中在部分顶层字段，则只重新生成这些字段，
+        否则带上错误信息完整重试
+        """
+        validator = SchemaCache().validator(self._schema)
         logger.info("[JSONGenerator] Schema：%s", self._schema)
 
+        cache_key = None
+        if self._cache_ttl:
+            config = Config().get_config().function_call
+            cache_key = LLMResponseCache.make_key(
+                config.model,
+                [{"role": "user", "content": await self._assemble_message()}],
+                self._schema,
+                self._temperature,
+            )
+            cached = await LLMResponseCache().get(cache_key)
+            if cached is not None:
+                return cached
+
         while self._count < JSON_GEN_MAX_TRIAL:
             self._count += 1
-            result = await self._single_trial()
+            result = coerce_to_schema(await self._single_trial(), self._schema)
             logger.info("[JSONGenerator] 得到：%s", result)
-            try:
-                validator.validate(result)
-            except Exception as err:  # noqa: BLE001
-                err_info = str(err)
-                err_info = err_info.split("\n\n")[0]
-                self._err_info = err_info
+            errors = list(validator.iter_errors(result))
+
+            while errors and isinstance(result, dict) and self._count < JSON_GEN_MAX_TRIAL:
+                fields = self._failing_fields(result, errors)
+                if not fields:
+                    break
+                self._trial = result
+                self._err_info = str(errors[0]).split("\n\n")[0]
+                self._count += 1
+                result = await self._partial_reask(result, fields)
+                errors = list(validator.iter_errors(result))
+
+            if errors:
+                self._trial = result
+                self._err_info = str(errors[0]).split("\n\n")[0]
                 logger.info("[JSONGenerator] 验证失败：%s", self._err_info)
                 continue
+            if cache_key:
+                await LLMResponseCache().set(cache_key, result, self._cache_ttl)
             return result
 
         return {}
@@ -0,0 +1,256 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+大模型JSON输出的本地修复
+
+在重新调用大模型之前，先尝试在本地修复常见错误：
+
+- 结构修复：单引号、Python字面量、尾随逗号、字符串内换行、被截断的括号
+- 按Schema进行类型转换
+- 填充默认值、将枚举值对齐到最接近的合法选项
+"""
+
+import difflib
+import json
+from typing import Any
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_TRUE_STRINGS = {"true", "yes", "y", "1", "是", "对"}
+_FALSE_STRINGS = {"false", "no", "n", "0", "否", "不是"}
+_ENUM_SNAP_CUTOFF = 0.6
+# 字符串内需要转义的字符
+_QUOTED_ESCAPES = {'"': '\\"', "\n": "\\n"}
+
+
+def _scan_quoted(text: str, i: int, quote: str, out: list[str]) -> tuple[int, str]:
+    """
+    处理字符串内的一个字符
+
+    :return: 下一个字符的位置，以及当前所在字符串的引号；字符串结束时为空
+    """
+    char = text[i]
+    if char == "\\" and i + 1 < len(text):
+        out.append(char + text[i + 1])
+        return i + 2, quote
+    if char == quote:
+        out.append('"')
+        return i + 1, ""
+    # 单引号字符串中的双引号需要转义
+    out.append(_QUOTED_ESCAPES.get(char, char))
+    return i + 1, quote
+
+
+def _read_word(text: str, i: int, out: list[str]) -> int:
+    """
+    读取一个单词，将Python字面量替换为JSON字面量
+
+    :return: 单词之后的位置
+    """
+    start = i
+    while i < len(text) and text[i].isalpha():
+        i += 1
+    word = text[start:i]
+    out.append(_PY_LITERALS.get(word, word))
+    return i
+
+
+def _close_bracket(char: str, out: list[str], stack: list[str]) -> None:
+    """输出右括号，并去掉其前的尾随逗号"""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+    if stack and stack[-1] == char:
+        stack.pop()
+    out.append(char)
+
+
+def _fix_structure(text: str) -> str:
+    """逐字符扫描，修复字符串和括号的结构问题"""
+    out: list[str] = []
+    stack: list[str] = []
+    quote = ""
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quote:
+            i, quote = _scan_quoted(text, i, quote, out)
+            continue
+        if char.isalpha():
+            i = _read_word(text, i, out)
+            continue
+
+        if char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            _close_bracket(char, out, stack)
+        else:
+            out.append(char)
+        i += 1
+
+    # 补齐被截断的字符串和括号
+    if quote:
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] == ","):
+        out.pop()
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def repair_json(text: str) -> str | None:
+    """
+    修复结构有误的JSON字符串
+
+    :param text: 大模型输出的文本（已去除推理过程）
+    :return: 修复后可以解析的JSON字符串；无法修复时返回None
+    """
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    if not starts:
+        return None
+    candidate = _fix_structure(text[min(starts):].strip())
+    try:
+        json.loads(candidate)
+    except Exception:  # noqa: BLE001
+        return None
+    return candidate
+
+
+def _resolve(schema: dict[str, Any], root: dict[str, Any]) -> dict[str, Any]:
+    """解析本地 ``$ref`` 引用（如Pydantic生成的 ``#/$defs/Model``）"""
+    while "$ref" in schema and schema["$ref"].startswith("#/"):
+        node: Any = root
+        for part in schema["$ref"][2:].split("/"):
+            node = node.get(part, {})
+        schema = {**node, **{k: v for k, v in schema.items() if k != "$ref"}}
+    return schema
+
+
+def _snap_enum(value: Any, options: list[Any]) -> Any:
+    """将枚举值对齐到最接近的合法选项；无足够接近的选项时原样返回"""
+    if value in options:
+        return value
+    text = str(value).strip()
+    for option in options:
+        if str(option).strip().lower() == text.lower():
+            return option
+    str_options = [str(option) for option in options]
+    match = difflib.get_close_matches(text, str_options, n=1, cutoff=_ENUM_SNAP_CUTOFF)
+    if match:
+        return options[str_options.index(match[0])]
+    return value
+
+
+def _coerce_scalar(value: Any, type_name: str) -> Any:  # noqa: C901, PLR0911, PLR0912
+    """将值转换为指定的基础类型；无法转换时原样返回"""
+    if type_name == "string":
+        if isinstance(value, bool):
+            return str(value).lower()
+        if isinstance(value, (int, float)):
+            return str(value)
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+    elif type_name in ("integer", "number"):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+    elif type_name == "boolean":
+        if isinstance(value, str):
+            if value.strip().lower() in _TRUE_STRINGS:
+                return True
+            if value.strip().lower() in _FALSE_STRINGS:
+                return False
+        elif isinstance(value, (int, float)) and value in (0, 1):
+            return bool(value)
+    elif type_name == "null" and isinstance(value, str) and value.strip().lower() in ("", "null", "none"):
+        return None
+    return value
+
+
+def _matches_type(value: Any, type_name: str) -> bool:
+    """判断值是否已符合JSON Schema类型"""
+    checks = {
+        "object": lambda v: isinstance(v, dict),
+        "array": lambda v: isinstance(v, list),
+        "string": lambda v: isinstance(v, str),
+        "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+        "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "boolean": lambda v: isinstance(v, bool),
+        "null": lambda v: v is None,
+    }
+    return checks.get(type_name, lambda _: True)(value)
+
+
+def coerce_to_schema(value: Any, schema: dict[str, Any], root: dict[str, Any] | None = None) -> Any:  # noqa: C901, PLR0912
+    """
+    按JSON Schema对值进行类型转换、默认值填充和枚举对齐
+
+    只做确定性的修正；无法修正的部分原样保留，交由Schema校验报错
+
+    :param value: 待修正的值
+    :param schema: 该值对应的JSON Schema
+    :param root: 根Schema，用于解析 ``$ref``
+    :return: 修正后的值
+    """
+    if root is None:
+        root = schema
+    schema = _resolve(schema, root)
+
+    # anyOf / oneOf：优先使用已匹配类型的分支
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            branches = [_resolve(branch, root) for branch in schema[key]]
+            for branch in branches:
+                if "type" in branch and _matches_type(value, branch["type"]):
+                    return coerce_to_schema(value, branch, root)
+            if branches:
+                return coerce_to_schema(value, branches[0], root)
+
+    types = schema.get("type")
+    if isinstance(types, list):
+        if not any(_matches_type(value, t) for t in types):
+            for t in types:
+                coerced = _coerce_scalar(value, t)
+                if _matches_type(coerced, t):
+                    value = coerced
+                    break
+    elif types == "object":
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except Exception:  # noqa: BLE001
+                return value
+        if isinstance(value, dict):
+            properties = schema.get("properties", {})
+            for name, prop_schema in properties.items():
+                if name in value:
+                    value[name] = coerce_to_schema(value[name], prop_schema, root)
+                    continue
+                resolved = _resolve(prop_schema, root)
+                if "default" in resolved:
+                    value[name] = resolved["default"]
+    elif types == "array":
+        if isinstance(value, str):
+            try:
+                parsed = json.loads(value)
+            except Exception:  # noqa: BLE001
+                parsed = None
+            value = parsed if isinstance(parsed, list) else [value]
+        elif not isinstance(value, list):
+            value = [value]
+        if "items" in schema and isinstance(schema["items"], dict):
+            value = [coerce_to_schema(item, schema["items"], root) for item in value]
+    elif isinstance(types, str):
+        value = _coerce_scalar(value, types)
+
+    if "enum" in schema:
+        value = _snap_enum(value, schema["enum"])
+    return value
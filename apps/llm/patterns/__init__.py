@@ -3,12 +3,14 @@
 
 from apps.llm.patterns.core import CorePattern
 from apps.llm.patterns.executor import (
+    ConversationSummary,
     ExecutorSummary,
     ExecutorThought,
 )
 from apps.llm.patterns.select import Select
 
 __all__ = [
+    "ConversationSummary",
     "CorePattern",
     "ExecutorSummary",
     "ExecutorThought",
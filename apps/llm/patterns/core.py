@@ -4,6 +4,8 @@
 from abc import ABC, abstractmethod
 from textwrap import dedent
 
+from apps.schemas.enum_var import LLMPriority
+
 
 class CorePattern(ABC):
     """基础大模型范式抽象类"""
@@ -16,6 +18,10 @@ class CorePattern(ABC):
     """输入Token数量"""
     output_tokens: int = 0
     """输出Token数量"""
+    cache_ttl: float | None = None
+    """大模型响应缓存有效期（秒）；为None时不使用缓存，仅适用于输出可复用的范式"""
+    priority: LLMPriority = LLMPriority.SELECTION
+    """大模型请求优先级"""
 
 
     def __init__(self, system_prompt: str | None = None, user_prompt: str | None = None) -> None:
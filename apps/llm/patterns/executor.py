@@ -6,6 +6,7 @@ from typing import TYPE_CHECKING, Any
 from apps.llm.patterns.core import CorePattern
 from apps.llm.reasoning import ReasoningLLM
 from apps.llm.snippet import convert_context_to_prompt, facts_to_prompt
+from apps.schemas.enum_var import LLMPriority
 
 if TYPE_CHECKING:
     from apps.schemas.scheduler import ExecutorBackground
@@ -74,7 +75,7 @@ class ExecutorThought(CorePattern):
 
         llm = ReasoningLLM()
         result = ""
-        async for chunk in llm.call(messages, streaming=False, temperature=0.7):
+        async for chunk in llm.call(messages, streaming=False, temperature=0.7, priority=self.priority):
             result += chunk
         self.input_tokens = llm.input_tokens
         self.output_tokens = llm.output_tokens
@@ -107,6 +108,8 @@ class ExecutorSummary(CorePattern):
         现在，请开始生成背景总结：
     """
     """用户提示词"""
+    cache_ttl: float | None = None
+    """采样生成（温度0.7），不使用响应缓存"""
 
     def __init__(self, system_prompt: str | None = None, user_prompt: str | None = None) -> None:
         """初始化Background模式"""
@@ -128,7 +131,63 @@ class ExecutorSummary(CorePattern):
 
         result = ""
         llm = ReasoningLLM()
-        async for chunk in llm.call(messages, streaming=False, temperature=0.7):
+        async for chunk in llm.call(
+            messages, streaming=False, temperature=0.7, cache_ttl=self.cache_ttl, priority=self.priority,
+        ):
+            result += chunk
+        self.input_tokens = llm.input_tokens
+        self.output_tokens = llm.output_tokens
+
+        return result.strip().strip("\n")
+
+
+class ConversationSummary(CorePattern):
+    """使用大模型滚动更新对话摘要；每轮问答结束后更新一次"""
+
+    user_prompt: str = r"""
+        <instructions>
+            根据已有的对话摘要和最新一轮问答，生成更新后的对话摘要。这个摘要将代替完整的对话记录，用于后续对话的上下文理解。
+
+            生成摘要的要求如下：
+            1. 保留已有摘要中仍然重要的信息，补充最新一轮问答中的重要信息点，例如时间、地点、人物、事件等。
+            2. 输出时请不要包含XML标签，确保信息准确性，不得编造信息。
+            3. 摘要应少于5句话，应少于500个字。
+
+            已有的对话摘要将在<summary>标签中给出，最新一轮问答将在<conversation>标签中给出。
+        </instructions>
+
+        <summary>
+            {summary}
+        </summary>
+
+        {conversation}
+
+        现在，请开始生成更新后的对话摘要：
+    """
+    """用户提示词"""
+    priority: LLMPriority = LLMPriority.BACKGROUND
+    """大模型请求优先级"""
+
+    def __init__(self, system_prompt: str | None = None, user_prompt: str | None = None) -> None:
+        """初始化对话摘要模式"""
+        super().__init__(system_prompt, user_prompt)
+
+    async def generate(self, **kwargs) -> str:  # noqa: ANN003
+        """生成更新后的对话摘要"""
+        summary: str = kwargs.get("summary", "")
+        conversation: list[dict[str, str]] = kwargs["conversation"]
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": self.user_prompt.format(
+                summary=summary,
+                conversation=convert_context_to_prompt(conversation),
+            )},
+        ]
+
+        result = ""
+        llm = ReasoningLLM()
+        async for chunk in llm.call(messages, streaming=False, temperature=0.7, priority=self.priority):
             result += chunk
         self.input_tokens = llm.input_tokens
         self.output_tokens = llm.output_tokens
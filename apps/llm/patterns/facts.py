@@ -5,10 +5,12 @@ import logging
 
 from pydantic import BaseModel, Field
 
+from apps.constants import LLM_CACHE_TTL
 from apps.llm.function import JsonGenerator
 from apps.llm.patterns.core import CorePattern
 from apps.llm.reasoning import ReasoningLLM
 from apps.llm.snippet import convert_context_to_prompt
+from apps.schemas.enum_var import LLMPriority
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +67,10 @@ class Facts(CorePattern):
         <output>
     """
     """用户提示词"""
+    cache_ttl: float | None = LLM_CACHE_TTL
+    """大模型响应缓存有效期（秒）"""
+    priority: LLMPriority = LLMPriority.BACKGROUND
+    """大模型请求优先级；事实提取不影响当前回答，放入后台队列"""
 
 
     def __init__(self, system_prompt: str | None = None, user_prompt: str | None = None) -> None:
@@ -81,7 +87,7 @@ class Facts(CorePattern):
         ]
         result = ""
         llm = ReasoningLLM()
-        async for chunk in llm.call(messages, streaming=False):
+        async for chunk in llm.call(messages, streaming=False, cache_ttl=self.cache_ttl, priority=self.priority):
             result += chunk
         self.input_tokens = llm.input_tokens
         self.output_tokens = llm.output_tokens
@@ -91,6 +97,8 @@ class Facts(CorePattern):
             query="根据给定的背景信息，提取事实条目",
             conversation=messages,
             schema=FactsResult.model_json_schema(),
+            cache_ttl=self.cache_ttl,
+            priority=self.priority,
         )
 
         try:
@@ -5,6 +5,7 @@ import logging
 
 from pydantic import BaseModel, Field
 
+from apps.constants import LLM_CACHE_TTL
 from apps.llm.function import JsonGenerator
 from apps.llm.patterns.core import CorePattern
 from apps.llm.reasoning import ReasoningLLM
@@ -79,6 +80,8 @@ class QuestionRewrite(CorePattern):
         请输出补全后的问题
       </instructions>
     """
+    cache_ttl: float | None = LLM_CACHE_TTL
+    """大模型响应缓存有效期（秒）"""
 
     async def generate(self, **kwargs) -> str:  # noqa: ANN003
         """问题补全与重写"""
@@ -117,7 +120,7 @@ class QuestionRewrite(CorePattern):
             {"role": "user", "content": self.user_prompt}
         ]
         result = ""
-        async for chunk in llm.call(messages, streaming=False):
+        async for chunk in llm.call(messages, streaming=False, cache_ttl=self.cache_ttl, priority=self.priority):
             result += chunk
         self.input_tokens = llm.input_tokens
         self.output_tokens = llm.output_tokens
@@ -127,6 +130,8 @@ class QuestionRewrite(CorePattern):
             query="根据给定的背景信息，生成预测问题",
             conversation=messages,
             schema=QuestionRewriteResult.model_json_schema(),
+            cache_ttl=self.cache_ttl,
+            priority=self.priority,
         )
         try:
             question_dict = QuestionRewriteResult.model_validate(await json_gen.generate())
@@ -5,8 +5,10 @@ import asyncio
 import json
 import logging
 from collections import Counter
+from copy import deepcopy
 from typing import Any, ClassVar
 
+from apps.constants import SELECT_SINGLE_VOTE_MAX_CHOICES, SELECT_VOTE_COUNT
 from apps.llm.function import JsonGenerator
 from apps.llm.patterns.core import CorePattern
 from apps.llm.reasoning import ReasoningLLM
@@ -85,11 +87,26 @@ class Select(CorePattern):
         "required": ["choice"],
     }
     """最终输出的JSON Schema"""
+    cache_ttl: float | None = None
+    """各次投票需相互独立，不使用响应缓存"""
 
 
-    def __init__(self, system_prompt: str | None = None, user_prompt: str | None = None) -> None:
-        """初始化Prompt"""
+    def __init__(
+        self,
+        system_prompt: str | None = None,
+        user_prompt: str | None = None,
+        vote_count: int = SELECT_VOTE_COUNT,
+    ) -> None:
+        """
+        初始化Prompt
+
+        :param vote_count: 最大投票次数；过半数票一致时提前结束投票
+        """
         super().__init__(system_prompt, user_prompt)
+        if vote_count < 1:
+            err = "[Select] 投票次数必须大于0"
+            raise ValueError(err)
+        self.vote_count = vote_count
 
 
     async def _generate_single_attempt(self, user_input: str, choice_list: list[str]) -> str:
@@ -101,14 +118,14 @@ class Select(CorePattern):
         ]
         result = ""
         llm = ReasoningLLM()
-        async for chunk in llm.call(messages, streaming=False):
+        async for chunk in llm.call(messages, streaming=False, cache_ttl=self.cache_ttl, priority=self.priority):
             result += chunk
-        self.input_tokens = llm.input_tokens
-        self.output_tokens = llm.output_tokens
+        self.input_tokens += llm.input_tokens
+        self.output_tokens += llm.output_tokens
         logger.info("[Select] 选择结果: %s", result)
 
-        # 使用FunctionLLM进行参数提取
-        schema = self.slot_schema
+        # 使用FunctionLLM进行参数提取；Schema为类变量，需复制后再修改
+        schema = deepcopy(self.slot_schema)
         schema["properties"]["choice"]["enum"] = choice_list
 
         messages += [{"role": "assistant", "content": result}]
@@ -116,17 +133,67 @@ class Select(CorePattern):
             query="根据给定的背景信息，生成预测问题",
             conversation=messages,
             schema=schema,
+            cache_ttl=self.cache_ttl,
+            priority=self.priority,
         )
         function_result = await json_gen.generate()
-        return function_result["choice"]
+        choice = function_result.get("choice")
+        if choice not in choice_list:
+            err = f"[Select] 投票结果不在选项列表中: {choice}"
+            raise ValueError(err)
+        return choice
+
+
+    async def _vote(self, user_input: str, choice_list: list[str], vote_count: int) -> str:
+        """
+        并发投票；任一选项获得过半数票时立即返回，并取消其余未完成的投票
+
+        :param user_input: 用户提示词
+        :param choice_list: 选项名称列表
+        :param vote_count: 投票次数
+        :return: 得票最多的选项
+        """
+        majority = vote_count // 2 + 1
+        count = Counter()
+        pending = {
+            asyncio.create_task(self._generate_single_attempt(user_input, choice_list))
+            for _ in range(vote_count)
+        }
+        last_err: BaseException | None = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        last_err = task.exception()
+                        logger.warning("[Select] 单次投票失败: %s", last_err)
+                        continue
+                    count[task.result()] += 1
+
+                if count and count.most_common(1)[0][1] >= majority:
+                    logger.info("[Select] 已达到多数票，提前结束投票，取消 %d 个投票", len(pending))
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if not count:
+            err = "[Select] 所有投票均失败"
+            logger.error(err)
+            raise RuntimeError(err) from last_err
+
+        return count.most_common(1)[0][0]
 
 
     async def generate(self, **kwargs) -> str:  # noqa: ANN003
         """使用大模型做出选择"""
         logger.info("[Select] 使用LLM选择")
-        max_try = 3
-        result_list = []
-
+        if kwargs.get("vote_count", self.vote_count) < 1:
+            err = "[Select] 投票次数必须大于0"
+            raise ValueError(err)
         background = kwargs.get("background", "无背景信息。")
         data_str = json.dumps(kwargs.get("data", {}), ensure_ascii=False)
 
@@ -140,6 +207,11 @@ class Select(CorePattern):
             logger.info("[Select] 选项列表只有一个选项，直接返回")
             return choices_list[0]
 
+        # 选项数量很少时，单次投票即可
+        vote_count = kwargs.get("vote_count", self.vote_count)
+        if len(choices_list) <= SELECT_SINGLE_VOTE_MAX_CHOICES:
+            vote_count = 1
+
         logger.info("[Select] 选项列表: %s", choice_prompt)
         user_input = self.user_prompt.format(
             question=kwargs["question"],
@@ -148,11 +220,6 @@ class Select(CorePattern):
             choice_list=choice_prompt,
         )
 
-        result_coroutine = [self._generate_single_attempt(user_input, choices_list) for _ in range(max_try)]
-        result_list = await asyncio.gather(*result_coroutine)
-
-        count = Counter(result_list)
-        selected_choice = count.most_common(1)[0][0]
-
+        selected_choice = await self._vote(user_input, choices_list, vote_count)
         logger.info("[Select] 选择结果: %s", selected_choice)
         return selected_choice
@@ -1,6 +1,7 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """问答大模型调用"""
 
+import asyncio
 import logging
 from collections.abc import AsyncGenerator
 from dataclasses import dataclass
@@ -10,8 +11,11 @@ from openai.types.chat import ChatCompletionChunk
 
 from apps.common.config import Config
 from apps.constants import REASONING_BEGIN_TOKEN, REASONING_END_TOKEN
-from apps.llm.token import TokenCalculator
+from apps.llm.cache import LLMResponseCache
+from apps.llm.dispatch import LLMDispatcher, estimate_tokens
+from apps.llm.token import TokenCalculator, TokenMeter
 from apps.schemas.config import LLMConfig
+from apps.schemas.enum_var import LLMPriority
 
 logger = logging.getLogger(__name__)
 
@@ -142,11 +146,52 @@ class ReasoningLLM:
             model=model,
             messages=messages,  # type: ignore[]
             max_tokens=max_tokens or self._config.max_tokens,
-            temperature=temperature or self._config.temperature,
+            temperature=self._config.temperature if temperature is None else temperature,
             stream=True,
             stream_options={"include_usage": True},
         )  # type: ignore[]
 
+    async def _read_stream(  # noqa: PLR0913
+        self,
+        chunks: asyncio.Queue[tuple[str, str] | None],
+        meter: TokenMeter,
+        messages: list[dict[str, str]],
+        max_tokens: int | None,
+        temperature: float | None,
+        model: str | None,
+        priority: LLMPriority,
+    ) -> None:
+        """在执行位内读取上游的流式响应，将（推理内容, 结果）放入队列；结束时放入None"""
+        reasoning = ReasoningContent()
+        try:
+            async with LLMDispatcher().acquire(
+                self._config.endpoint, priority, estimate_tokens(messages, max_tokens),
+            ) as ticket:
+                stream = await self._create_stream(messages, max_tokens, temperature, model)
+                async for chunk in stream:
+                    # 如果包含统计信息
+                    if chunk.usage:
+                        self.input_tokens = chunk.usage.prompt_tokens
+                        self.output_tokens = chunk.usage.completion_tokens
+                        if self.output_tokens:
+                            meter.set_usage(self.output_tokens)
+                    # 如果没有Choices
+                    if not chunk.choices:
+                        continue
+
+                    # 处理chunk
+                    if reasoning.is_first_chunk:
+                        reason, text = reasoning.process_first_chunk(chunk)
+                    else:
+                        reason, text = reasoning.process_chunk(chunk)
+                    meter.feed(text)
+                    chunks.put_nowait((reason, text))
+
+                if self.input_tokens and self.output_tokens:
+                    ticket.used_tokens = self.input_tokens + self.output_tokens
+        finally:
+            chunks.put_nowait(None)
+
     async def call(  # noqa: C901, PLR0912, PLR0913
         self,
         messages: list[dict[str, str]],
@@ -156,46 +201,62 @@ class ReasoningLLM:
         streaming: bool = True,
         result_only: bool = True,
         model: str | None = None,
+        cache_ttl: float | None = None,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
     ) -> AsyncGenerator[str, None]:
-        """调用大模型，分为流式和非流式两种"""
+        """
+        调用大模型，分为流式和非流式两种
+
+        :param cache_ttl: 响应缓存有效期（秒）；为None时不使用缓存。命中缓存时推理内容和结果各一次性返回。
+            启用缓存且未指定温度时使用温度0；温度不为0时不使用缓存
+        :param priority: 请求优先级；上游繁忙时，高优先级请求先出队
+        """
         # 检查max_tokens和temperature
         if max_tokens is None:
             max_tokens = self._config.max_tokens
         if temperature is None:
-            temperature = self._config.temperature
+            temperature = 0 if cache_ttl else self._config.temperature
         if model is None:
             model = self._config.model
         msg_list = self._validate_messages(messages)
-        stream = await self._create_stream(msg_list, max_tokens, temperature, model)
-        reasoning = ReasoningContent()
-        reasoning_content = ""
-        result = ""
 
-        async for chunk in stream:
-            # 如果包含统计信息
-            if chunk.usage:
-                self.input_tokens = chunk.usage.prompt_tokens
-                self.output_tokens = chunk.usage.completion_tokens
-            # 如果没有Choices
-            if not chunk.choices:
-                continue
-
-            # 处理chunk
-            if reasoning.is_first_chunk:
-                reason, text = reasoning.process_first_chunk(chunk)
-            else:
-                reason, text = reasoning.process_chunk(chunk)
+        cache_key = None
+        if cache_ttl and temperature == 0:
+            cache_key = LLMResponseCache.make_key(model, msg_list, None, temperature)
+            cached = await LLMResponseCache().get(cache_key)
+            if cached is not None:
+                self.input_tokens = 0
+                self.output_tokens = 0
+                if not result_only and cached["reasoning"]:
+                    yield cached["reasoning"]
+                yield cached["result"]
+                return
 
-            # 推送消息
-            if streaming:
-                if reason and not result_only:
-                    yield reason
-                if text:
-                    yield text
+        reasoning_content = ""
+        result = ""
+        meter = TokenMeter()
 
-            # 整理结果
-            reasoning_content += reason
-            result += text
+        # 执行位只在读取上游响应期间占用；调用方消费缓慢时不会一直占着执行位
+        chunks: asyncio.Queue[tuple[str, str] | None] = asyncio.Queue()
+        reader = asyncio.create_task(
+            self._read_stream(chunks, meter, msg_list, max_tokens, temperature, model, priority),
+        )
+        try:
+            while (item := await chunks.get()) is not None:
+                reason, text = item
+                # 推送消息
+                if streaming:
+                    if reason and not result_only:
+                        yield reason
+                    if text:
+                        yield text
+
+                # 整理结果
+                reasoning_content += reason
+                result += text
+            await reader
+        finally:
+            reader.cancel()
 
         if not streaming:
             if not result_only:
@@ -204,12 +265,10 @@ class ReasoningLLM:
 
         logger.info("[Reasoning] 推理内容: %s\n\n%s", reasoning_content, result)
 
-        # 更新token统计
+        if cache_key and result:
+            await LLMResponseCache().set(cache_key, {"reasoning": reasoning_content, "result": result}, cache_ttl)
+
+        # 上游未返回用量时，在线程池中计算token统计
         if self.input_tokens == 0 or self.output_tokens == 0:
-            self.input_tokens = TokenCalculator().calculate_token_length(
-                messages,
-            )
-            self.output_tokens = TokenCalculator().calculate_token_length(
-                [{"role": "assistant", "content": result}],
-                pure_text=True,
-            )
+            self.input_tokens = await asyncio.to_thread(TokenCalculator().calculate_token_length, messages)
+            self.output_tokens = await meter.finalize()
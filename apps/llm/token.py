@@ -1,18 +1,126 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """用于计算Token消耗量"""
+import asyncio
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 
 from apps.common.singleton import SingletonMeta
+from apps.constants import TOKEN_COUNT_CACHE_SIZE, TOKEN_OFFLOAD_MIN_CHARS
+
 logger = logging.getLogger(__name__)
 
 
 class TokenCalculator(metaclass=SingletonMeta):
-    """用于计算Token消耗量"""
+    """
+    用于计算Token消耗量
+
+    相同文本的Token数会被缓存（如反复出现的文档分片）；批量计算时只对未命中缓存的文本编码。
+    缓存以文本的SHA-256摘要为Key，不持有文本本身。
+    """
 
     def __init__(self) -> None:
         """初始化Tokenizer"""
         import tiktoken
         self._encoder = tiktoken.get_encoding("cl100k_base")
+        self._cache: OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(text: str) -> bytes:
+        """生成缓存Key"""
+        return hashlib.sha256(text.encode("utf-8", "surrogatepass")).digest()
+
+    def _cache_get(self, text: str) -> int | None:
+        """读取Token数缓存"""
+        key = self._cache_key(text)
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+            return count
+
+    def _cache_set(self, texts: list[str], counts: list[int]) -> None:
+        """写入Token数缓存"""
+        keys = [self._cache_key(text) for text in texts]
+        with self._lock:
+            for key, count in zip(keys, counts, strict=True):
+                self._cache[key] = count
+                self._cache.move_to_end(key)
+            while len(self._cache) > TOKEN_COUNT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def count_tokens(self, text: str) -> int:
+        """
+        计算单段文本的Token数
+
+        :param text: 文本
+        :return: Token数
+        """
+        return self.count_tokens_batch([text])[0]
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        """
+        批量计算多段文本的Token数
+
+        :param texts: 文本列表
+        :return: 与文本列表一一对应的Token数
+        """
+        counts: list[int | None] = [self._cache_get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, count in zip(texts, counts, strict=True) if count is None))
+        if missing:
+            missing_counts = [len(tokens) for tokens in self._encoder.encode_ordinary_batch(missing)]
+            self._cache_set(missing, missing_counts)
+            missing_map = dict(zip(missing, missing_counts, strict=True))
+            counts = [missing_map[text] if count is None else count for text, count in zip(texts, counts, strict=True)]
+        return counts  # type: ignore[return-value]
+
+    async def count_tokens_batch_async(self, texts: list[str]) -> list[int]:
+        """
+        批量计算多段文本的Token数；文本较长时在线程池中计算
+
+        :param texts: 文本列表
+        :return: 与文本列表一一对应的Token数
+        """
+        if sum(len(text) for text in texts) < TOKEN_OFFLOAD_MIN_CHARS:
+            return self.count_tokens_batch(texts)
+        return await asyncio.to_thread(self.count_tokens_batch, texts)
+
+    def truncate(self, text: str, k: int | None = None) -> str:
+        """
+        截取文本的前k个Token；文本只编码一次，按Token位置截断
+
+        :param text: 文本
+        :param k: 最多保留的Token数；为None时不截断
+        :return: 截断后的文本
+        """
+        if k is None:
+            return text
+        if k <= 0:
+            return ""
+        cached = self._cache_get(text)
+        if cached is not None and cached <= k:
+            return text
+
+        tokens = self._encoder.encode_ordinary(text)
+        self._cache_set([text], [len(tokens)])
+        if len(tokens) <= k:
+            return text
+        # 截断位置可能落在多字节字符中间，丢弃不完整的字节
+        return self._encoder.decode_bytes(tokens[:k]).decode("utf-8", errors="ignore")
+
+    async def truncate_async(self, text: str, k: int | None = None) -> str:
+        """
+        截取文本的前k个Token；文本较长时在线程池中计算
+
+        :param text: 文本
+        :param k: 最多保留的Token数；为None时不截断
+        :return: 截断后的文本
+        """
+        if len(text) < TOKEN_OFFLOAD_MIN_CHARS:
+            return self.truncate(text, k)
+        return await asyncio.to_thread(self.truncate, text, k)
 
     def calculate_token_length(self, messages: list[dict[str, str]], *, pure_text: bool = False) -> int:
         """使用ChatGPT的cl100k tokenizer，估算Token消耗量"""
@@ -20,34 +128,74 @@ class TokenCalculator(metaclass=SingletonMeta):
         if not pure_text:
             result += 3 * (len(messages) + 1)
 
-        for msg in messages:
-            result += len(self._encoder.encode(msg["content"]))
-
-        return result
+        return result + sum(self.count_tokens_batch([msg["content"] for msg in messages]))
 
     @staticmethod
     def get_k_tokens_words_from_content(content: str, k: int | None = None) -> str:
         """获取k个token的词"""
-        if k is None:
-            return content
-        if k <= 0:
-            return ""
         try:
-            if TokenCalculator().calculate_token_length(messages=[
-                {"role": "user", "content": content},
-            ], pure_text=True) <= k:
-                return content
-            l = 0
-            r = len(content)
-            while l + 1 < r:
-                mid = (l + r) // 2
-                if TokenCalculator().calculate_token_length(messages=[
-                    {"role": "user", "content": content[:mid]},
-                ], pure_text=True) <= k:
-                    l = mid
-                else:
-                    r = mid
-            return content[:l]
+            return TokenCalculator().truncate(content, k)
         except Exception:
             logger.exception("[RAG] 获取k个token的词失败")
         return ""
+
+
+class TokenMeter:
+    """
+    流式输出的增量Token计数
+
+    流式输出期间只按字节数粗略估算，不进行分词；上游返回的用量（usage）为权威值。
+    上游未返回用量时，在输出结束后于线程池中对完整文本计数一次。
+    """
+
+    def __init__(self) -> None:
+        """初始化计数器"""
+        self._parts: list[str] = []
+        self._estimate = 0
+        self._usage: int | None = None
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        """
+        粗略估算文本的Token数：ASCII字符约4个一个Token，其他字符约一个字符一个Token
+
+        :param text: 文本
+        :return: 估算的Token数
+        """
+        non_ascii = (len(text.encode("utf-8")) - len(text)) // 2
+        return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+    def feed(self, delta: str) -> int:
+        """
+        记录一段增量输出
+
+        :param delta: 增量文本
+        :return: 当前的Token总数（估算值或上游用量）
+        """
+        if delta:
+            self._parts.append(delta)
+            self._estimate += self.estimate(delta)
+        return self.total
+
+    def set_usage(self, tokens: int) -> None:
+        """
+        记录上游返回的输出Token数
+
+        :param tokens: 上游返回的输出Token数
+        """
+        self._usage = tokens
+
+    @property
+    def total(self) -> int:
+        """当前的Token总数；有上游用量时以上游为准"""
+        return self._usage if self._usage is not None else self._estimate
+
+    async def finalize(self) -> int:
+        """
+        输出结束后获取准确的Token总数
+
+        :return: 上游用量；若上游未返回，则为完整文本的实际Token数
+        """
+        if self._usage is None:
+            self._usage = await asyncio.to_thread(TokenCalculator().count_tokens, "".join(self._parts))
+        return self._usage
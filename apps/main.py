@@ -17,7 +17,11 @@ from rich.logging import RichHandler
 
 from apps.common.config import Config
 from apps.common.lance import LanceDB
+from apps.common.mongo_index import ensure_indexes
+from apps.common.template import TemplateRegistry
 from apps.common.wordscheck import WordsCheck
+from apps.dependency.user import SESSION_TOKEN_HEADER, SessionTokenMiddleware
+from apps.llm.prompt import JSON_GEN_BASIC
 from apps.llm.token import TokenCalculator
 from apps.routers import (
     api_key,
@@ -37,6 +41,11 @@ from apps.routers import (
     service,
     user,
 )
+from apps.scheduler.call.facts.prompt import DOMAIN_PROMPT, FACTS_PROMPT
+from apps.scheduler.call.llm.prompt import LLM_CONTEXT_PROMPT, LLM_DEFAULT_PROMPT
+from apps.scheduler.call.slot.prompt import SLOT_GEN_PROMPT
+from apps.scheduler.call.suggest.prompt import SUGGEST_PROMPT
+from apps.scheduler.mcp.prompt import CREATE_PLAN, FINAL_ANSWER, MCP_SELECT, MEMORY_TEMPLATE
 from apps.scheduler.pool.pool import Pool
 
 # 定义FastAPI app
@@ -48,7 +57,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[SESSION_TOKEN_HEADER],
 )
+app.add_middleware(SessionTokenMiddleware)
+
 # 关联API路由
 app.include_router(conversation.router)
 app.include_router(auth.router)
@@ -84,9 +96,23 @@ logging.basicConfig(
 async def init_resources() -> None:
     """初始化必要资源"""
     WordsCheck()
+    await ensure_indexes()
     await LanceDB().init()
     await Pool.init()
     TokenCalculator()
+    TemplateRegistry().warmup([
+        (JSON_GEN_BASIC, False),
+        (FACTS_PROMPT, False),
+        (DOMAIN_PROMPT, False),
+        (LLM_CONTEXT_PROMPT, False),
+        (LLM_DEFAULT_PROMPT, False),
+        (SLOT_GEN_PROMPT, False),
+        (MEMORY_TEMPLATE, False),
+        (SUGGEST_PROMPT, True),
+        (CREATE_PLAN, True),
+        (FINAL_ANSWER, True),
+        (MCP_SELECT, True),
+    ])
 
 # 运行
 if __name__ == "__main__":
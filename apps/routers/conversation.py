@@ -72,19 +72,36 @@ async def create_new_conversation(
     "",
     response_model=ConversationListRsp,
     responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ResponseData},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": ResponseData},
     },
 )
-async def get_conversation_list(user_sub: Annotated[str, Depends(get_user)]) -> JSONResponse:
-    """获取对话列表"""
-    conversations = await ConversationManager.get_conversation_by_user_sub(user_sub)
+async def get_conversation_list(
+    user_sub: Annotated[str, Depends(get_user)],
+    cursor: Annotated[str | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+) -> JSONResponse:
+    """获取对话列表；传入limit时分页，下一页使用返回的nextCursor"""
+    try:
+        conversations, next_cursor = await ConversationManager.list_conversation_with_doc_count(
+            user_sub, cursor, limit,
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=ResponseData(
+                code=status.HTTP_400_BAD_REQUEST,
+                message=str(e),
+                result={},
+            ).model_dump(exclude_none=True, by_alias=True),
+        )
     # 把已有对话转换为列表
     result_conversations = []
-    for conv in conversations:
+    for conv, doc_count in conversations:
         conversation_list_item = ConversationListItem(
             conversationId=conv.id,
             title=conv.title,
-            docCount=await DocumentManager.get_doc_count(user_sub, conv.id),
+            docCount=doc_count,
             createdTime=datetime.fromtimestamp(conv.created_at, tz=pytz.timezone("Asia/Shanghai")).strftime(
                 "%Y-%m-%d %H:%M:%S",
             ),
@@ -118,7 +135,7 @@ async def get_conversation_list(user_sub: Annotated[str, Depends(get_user)]) ->
         content=ConversationListRsp(
             code=status.HTTP_200_OK,
             message="success",
-            result=ConversationListMsg(conversations=result_conversations),
+            result=ConversationListMsg(conversations=result_conversations, nextCursor=next_cursor),
         ).model_dump(exclude_none=True, by_alias=True),
     )
 
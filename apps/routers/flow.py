@@ -8,6 +8,7 @@ from fastapi.responses import JSONResponse
 
 from apps.dependency import get_user
 from apps.dependency.user import verify_user
+from apps.exceptions import FlowValidationError
 from apps.schemas.request_data import PutFlowReq
 from apps.schemas.response_data import (
     FlowStructureDeleteMsg,
@@ -129,8 +130,18 @@ async def put_flow(
                 result=FlowStructurePutMsg(),
             ).model_dump(exclude_none=True, by_alias=True),
         )
-    put_body.flow = await FlowService.remove_excess_structure_from_flow(put_body.flow)
-    await FlowService.validate_flow_illegal(put_body.flow)
+    try:
+        put_body.flow = await FlowService.remove_excess_structure_from_flow(put_body.flow)
+        await FlowService.validate_flow_illegal(put_body.flow)
+    except FlowValidationError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=FlowStructurePutRsp(
+                code=status.HTTP_400_BAD_REQUEST,
+                message=str(e),
+                result=FlowStructurePutMsg(),
+            ).model_dump(exclude_none=True, by_alias=True),
+        )
     put_body.flow.connectivity = await FlowService.validate_flow_connectivity(put_body.flow)
     result = await FlowManager.put_flow_by_app_and_flow_id(app_id, flow_id, put_body.flow)
     if result is None:
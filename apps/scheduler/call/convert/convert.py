@@ -6,10 +6,9 @@ from datetime import datetime
 from typing import Any
 
 import pytz
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 from pydantic import Field
 
+from apps.common.template import TemplateRegistry
 from apps.scheduler.call.convert.schema import ConvertInput, ConvertOutput
 from apps.scheduler.call.core import CallOutputChunk, CoreCall
 from apps.schemas.enum_var import CallOutputType
@@ -30,7 +29,9 @@ class Convert(CoreCall, input_model=ConvertInput, output_model=ConvertOutput):
     @classmethod
     def info(cls) -> CallInfo:
         """返回Call的名称和描述"""
-        return CallInfo(name="模板转换", description="使用jinja2语法和jsonnet语法，将自然语言信息和原始数据进行格式化。")
+        return CallInfo(
+            name="模板转换", description="使用jinja2语法和jsonnet语法，将自然语言信息和原始数据进行格式化。",
+        )
 
     async def _init(self, call_vars: CallVars) -> ConvertInput:
         """初始化工具"""
@@ -38,12 +39,6 @@ class Convert(CoreCall, input_model=ConvertInput, output_model=ConvertOutput):
 
         self._history = call_vars.history
         self._question = call_vars.question
-        self._env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
         return ConvertInput()
 
 
@@ -59,13 +54,13 @@ class Convert(CoreCall, input_model=ConvertInput, output_model=ConvertOutput):
         if self.text_template is None:
             result_message = last_output.get("message", "")
         else:
-            text_template = self._env.from_string(self.text_template)
+            text_template = TemplateRegistry().get(self.text_template)
             result_message = text_template.render(time=time, history=self._history, question=self._question)
 
         if self.data_template is None:
             result_data = last_output.get("output", {})
         else:
-            data_template = self._env.from_string(self.data_template)
+            data_template = TemplateRegistry().get(self.data_template)
             result_data = data_template.render(
                 time=time,
                 question=self._question,
@@ -5,8 +5,10 @@ Core Call类是定义了所有Call都应具有的方法和参数的PyDantic类
 所有Call类必须继承此类，并根据需求重载方法。
 """
 
+import json
 import logging
 from collections.abc import AsyncGenerator
+from copy import deepcopy
 from typing import TYPE_CHECKING, Any, ClassVar, Self
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -14,7 +16,7 @@ from pydantic.json_schema import SkipJsonSchema
 
 from apps.llm.function import FunctionLLM
 from apps.llm.reasoning import ReasoningLLM
-from apps.schemas.enum_var import CallOutputType
+from apps.schemas.enum_var import CallOutputType, LLMPriority
 from apps.schemas.pool import NodePool
 from apps.schemas.scheduler import (
     CallError,
@@ -33,13 +35,20 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+_MODEL_SCHEMA_CACHE: dict[tuple[type[BaseModel], str], dict[str, Any]] = {}
+"""各输入/输出类型生成的JSON Schema；类型在运行期间不会变化，只需生成一次"""
+
+
 class DataBase(BaseModel):
     """所有Call的输入基类"""
 
     @classmethod
     def model_json_schema(cls, override: dict[str, Any] | None = None, **kwargs: Any) -> dict[str, Any]:
-        """通过override参数，动态填充Schema内容"""
-        schema = super().model_json_schema(**kwargs)
+        """通过override参数，动态填充Schema内容；返回的是缓存的副本，可以修改"""
+        key = (cls, json.dumps(kwargs, sort_keys=True, default=str))
+        if key not in _MODEL_SCHEMA_CACHE:
+            _MODEL_SCHEMA_CACHE[key] = super().model_json_schema(**kwargs)
+        schema = deepcopy(_MODEL_SCHEMA_CACHE[key])
         if override:
             for key, value in override.items():
                 schema["properties"][key] = value
@@ -200,19 +209,26 @@ class CoreCall(BaseModel):
         await self._after_exec(input_data)
 
 
-    async def _llm(self, messages: list[dict[str, Any]]) -> str:
+    async def _llm(
+        self, messages: list[dict[str, Any]], priority: LLMPriority = LLMPriority.SELECTION,
+    ) -> str:
         """Call可直接使用的LLM非流式调用"""
         result = ""
         llm = ReasoningLLM()
-        async for chunk in llm.call(messages, streaming=False):
+        async for chunk in llm.call(messages, streaming=False, priority=priority):
             result += chunk
         self.input_tokens = llm.input_tokens
         self.output_tokens = llm.output_tokens
         return result
 
 
-    async def _json(self, messages: list[dict[str, Any]], schema: type[BaseModel]) -> BaseModel:
+    async def _json(
+        self,
+        messages: list[dict[str, Any]],
+        schema: type[BaseModel],
+        priority: LLMPriority = LLMPriority.SELECTION,
+    ) -> BaseModel:
         """Call可直接使用的JSON生成"""
         json = FunctionLLM()
-        result = await json.call(messages=messages, schema=schema.model_json_schema())
+        result = await json.call(messages=messages, schema=schema.model_json_schema(), priority=priority)
         return schema.model_validate(result)
@@ -4,10 +4,9 @@
 from collections.abc import AsyncGenerator
 from typing import TYPE_CHECKING, Any, Self
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 from pydantic import Field
 
+from apps.common.template import TemplateRegistry
 from apps.scheduler.call.core import CoreCall
 from apps.scheduler.call.facts.prompt import DOMAIN_PROMPT, FACTS_PROMPT
 from apps.scheduler.call.facts.schema import (
@@ -16,7 +15,7 @@ from apps.scheduler.call.facts.schema import (
     FactsInput,
     FactsOutput,
 )
-from apps.schemas.enum_var import CallOutputType
+from apps.schemas.enum_var import CallOutputType, LLMPriority
 from apps.schemas.pool import NodePool
 from apps.schemas.scheduler import CallInfo, CallOutputChunk, CallVars
 from apps.services.user_domain import UserDomainManager
@@ -69,29 +68,22 @@ class FactsCall(CoreCall, input_model=FactsInput, output_model=FactsOutput):
     async def _exec(self, input_data: dict[str, Any]) -> AsyncGenerator[CallOutputChunk, None]:
         """执行工具"""
         data = FactsInput(**input_data)
-        # jinja2 环境
-        env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
 
         # 提取事实信息
-        facts_tpl = env.from_string(FACTS_PROMPT)
+        facts_tpl = TemplateRegistry().get(FACTS_PROMPT)
         facts_prompt = facts_tpl.render(conversation=data.message)
         facts_obj: FactsGen = await self._json([
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": facts_prompt},
-        ], FactsGen) # type: ignore[arg-type]
+        ], FactsGen, LLMPriority.BACKGROUND) # type: ignore[arg-type]
 
         # 更新用户画像
-        domain_tpl = env.from_string(DOMAIN_PROMPT)
+        domain_tpl = TemplateRegistry().get(DOMAIN_PROMPT)
         domain_prompt = domain_tpl.render(conversation=data.message)
         domain_list: DomainGen = await self._json([
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": domain_prompt},
-        ], DomainGen) # type: ignore[arg-type]
+        ], DomainGen, LLMPriority.BACKGROUND) # type: ignore[arg-type]
 
         for domain in domain_list.keywords:
             await UserDomainManager.update_user_domain_by_user_sub_and_domain_name(data.user_sub, domain)
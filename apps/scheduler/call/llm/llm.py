@@ -7,10 +7,9 @@ from datetime import datetime
 from typing import Any
 
 import pytz
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 from pydantic import Field
 
+from apps.common.template import TemplateRegistry
 from apps.llm.reasoning import ReasoningLLM
 from apps.scheduler.call.core import CoreCall
 from apps.scheduler.call.llm.prompt import LLM_CONTEXT_PROMPT, LLM_DEFAULT_PROMPT
@@ -47,21 +46,13 @@ class LLM(CoreCall, input_model=LLMInput, output_model=LLMOutput):
 
     async def _prepare_message(self, call_vars: CallVars) -> list[dict[str, Any]]:
         """准备消息"""
-        # 创建共享的 Environment 实例
-        env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
-
         # 上下文信息
         step_history = []
         for ids in call_vars.history_order[-self.step_history_size:]:
             step_history += [call_vars.history[ids]]
 
         if self.enable_context:
-            context_tmpl = env.from_string(LLM_CONTEXT_PROMPT)
+            context_tmpl = TemplateRegistry().get(LLM_CONTEXT_PROMPT)
             context_prompt = context_tmpl.render(
                 summary=call_vars.summary,
                 history_data=step_history,
@@ -79,11 +70,11 @@ class LLM(CoreCall, input_model=LLMInput, output_model=LLMOutput):
 
         try:
             # 准备系统提示词
-            system_tmpl = env.from_string(self.system_prompt)
+            system_tmpl = TemplateRegistry().get(self.system_prompt)
             system_input = system_tmpl.render(**formatter)
 
             # 准备用户提示词
-            user_tmpl = env.from_string(self.user_prompt)
+            user_tmpl = TemplateRegistry().get(self.user_prompt)
             user_input = user_tmpl.render(**formatter)
         except Exception as e:
             raise CallError(message=f"用户提示词渲染失败：{e!s}", data={}) from e
@@ -6,10 +6,8 @@ from collections.abc import AsyncGenerator
 from typing import Any
 
 import httpx
-from fastapi import status
 from pydantic import Field
 
-from apps.common.config import Config
 from apps.llm.patterns.rewrite import QuestionRewrite
 from apps.scheduler.call.core import CoreCall
 from apps.scheduler.call.rag.schema import RAGInput, RAGOutput, SearchMethod
@@ -20,6 +18,7 @@ from apps.schemas.scheduler import (
     CallOutputChunk,
     CallVars,
 )
+from apps.services.rag import RAGRetriever
 
 logger = logging.getLogger(__name__)
 
@@ -67,45 +66,33 @@ class RAG(CoreCall, input_model=RAGInput, output_model=RAGOutput):
         self.tokens.input_tokens += question_obj.input_tokens
         self.tokens.output_tokens += question_obj.output_tokens
 
-        url = Config().get_config().rag.rag_service.rstrip("/") + "/chunk/search"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {data.session_id}",
-        }
-
-        # 发送请求
+        # 发送请求；相同的检索在有效期内直接使用缓存结果
         data_json = data.model_dump(exclude_none=True, by_alias=True)
         del data_json["session_id"]
-        async with httpx.AsyncClient(timeout=300) as client:
-            response = await client.post(url, headers=headers, json=data_json)
-
-            # 检查响应状态码
-            if response.status_code == status.HTTP_200_OK:
-                result = response.json()
-                doc_chunk_list = result["result"]["docChunks"]
-
-                corpus = []
-                for doc_chunk in doc_chunk_list:
-                    for chunk in doc_chunk["chunks"]:
-                        corpus.extend([chunk["text"].replace("\n", "")])
-
-                yield CallOutputChunk(
-                    type=CallOutputType.DATA,
-                    content=RAGOutput(
-                        question=data.question,
-                        corpus=corpus,
-                    ).model_dump(exclude_none=True, by_alias=True),
-                )
-                return
-
-            text = response.text
+        try:
+            doc_chunk_list = await RAGRetriever().search(data.session_id, data_json, request_timeout=300)
+        except httpx.HTTPStatusError as e:
+            text = e.response.text
             logger.error("[RAG] 调用失败：%s", text)
 
             raise CallError(
                 message=f"rag调用失败：{text}",
                 data={
                     "question": data.question,
-                    "status": response.status_code,
+                    "status": e.response.status_code,
                     "text": text,
                 },
-            )
+            ) from e
+
+        corpus = []
+        for doc_chunk in doc_chunk_list:
+            for chunk in doc_chunk["chunks"]:
+                corpus.extend([chunk["text"].replace("\n", "")])
+
+        yield CallOutputChunk(
+            type=CallOutputType.DATA,
+            content=RAGOutput(
+                question=data.question,
+                corpus=corpus,
+            ).model_dump(exclude_none=True, by_alias=True),
+        )
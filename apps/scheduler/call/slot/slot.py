@@ -5,10 +5,9 @@ import json
 from collections.abc import AsyncGenerator
 from typing import TYPE_CHECKING, Any, Self
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 from pydantic import Field
 
+from apps.common.template import TemplateRegistry
 from apps.llm.function import FunctionLLM, JsonGenerator
 from apps.llm.reasoning import ReasoningLLM
 from apps.scheduler.call.core import CoreCall
@@ -41,13 +40,7 @@ class Slot(CoreCall, input_model=SlotInput, output_model=SlotOutput):
 
     async def _llm_slot_fill(self, remaining_schema: dict[str, Any]) -> tuple[str, dict[str, Any]]:
         """使用大模型填充参数；若大模型解析度足够，则直接返回结果"""
-        env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
-        template = env.from_string(SLOT_GEN_PROMPT)
+        template = TemplateRegistry().get(SLOT_GEN_PROMPT)
 
         conversation = [
             {"role": "system", "content": "You are a helpful assistant."},
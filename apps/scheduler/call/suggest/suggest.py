@@ -5,12 +5,11 @@ import random
 from collections.abc import AsyncGenerator
 from typing import TYPE_CHECKING, Any, Self
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 from pydantic import Field
 from pydantic.json_schema import SkipJsonSchema
 
-from apps.common.security import Security
+from apps.common.template import TemplateRegistry
+from apps.constants import LLM_CACHE_TTL
 from apps.llm.function import FunctionLLM
 from apps.scheduler.call.core import CoreCall
 from apps.scheduler.call.suggest.prompt import SUGGEST_PROMPT
@@ -22,7 +21,6 @@ from apps.scheduler.call.suggest.schema import (
 )
 from apps.schemas.enum_var import CallOutputType
 from apps.schemas.pool import NodePool
-from apps.schemas.record import RecordContent
 from apps.schemas.scheduler import (
     CallError,
     CallInfo,
@@ -89,12 +87,6 @@ class Suggestion(CoreCall, input_model=SuggestionInput, output_model=SuggestionO
         self._app_id = call_vars.ids.app_id
         self._flow_id = call_vars.ids.flow_id
         app_metadata = await AppCenterManager.fetch_app_data_by_id(self._app_id)
-        self._env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=True,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
 
         self._avaliable_flows = {}
         for flow in app_metadata.flows:
@@ -112,17 +104,12 @@ class Suggestion(CoreCall, input_model=SuggestionInput, output_model=SuggestionO
 
     async def _get_history_questions(self, user_sub: str, conversation_id: str) -> list[str]:
         """获取当前对话的历史问题"""
-        records = await RecordManager.query_record_by_conversation_id(
+        records = await RecordManager.query_record_content_by_conversation_id(
             user_sub,
             conversation_id,
             15,
         )
-
-        history_questions = []
-        for record in records:
-            record_data = RecordContent.model_validate_json(Security.decrypt(record.content, record.key))
-            history_questions.append(record_data.question)
-        return history_questions
+        return [record_data.question for record_data in records]
 
 
     async def _exec(self, input_data: dict[str, Any]) -> AsyncGenerator[CallOutputChunk, None]:
@@ -141,7 +128,7 @@ class Suggestion(CoreCall, input_model=SuggestionInput, output_model=SuggestionO
         # 已推送问题数量
         pushed_questions = 0
         # 初始化Prompt
-        prompt_tpl = self._env.from_string(SUGGEST_PROMPT)
+        prompt_tpl = TemplateRegistry().get(SUGGEST_PROMPT, autoescape=True)
 
         # 先处理configs
         for config in self.configs:
@@ -169,6 +156,7 @@ class Suggestion(CoreCall, input_model=SuggestionInput, output_model=SuggestionO
                         {"role": "user", "content": prompt},
                     ],
                     schema=SuggestGenResult.model_json_schema(),
+                    cache_ttl=LLM_CACHE_TTL,
                 )
                 questions = SuggestGenResult.model_validate(result)
                 question = questions.predicted_questions[random.randint(0, len(questions.predicted_questions) - 1)]  # noqa: S311
@@ -185,6 +173,7 @@ class Suggestion(CoreCall, input_model=SuggestionInput, output_model=SuggestionO
             pushed_questions += 1
 
 
+        # Prompt每轮相同，需要每次重新生成，不能使用响应缓存
         while pushed_questions < self.num:
             prompt = prompt_tpl.render(
                 conversation=self.context,
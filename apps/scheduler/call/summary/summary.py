@@ -53,7 +53,15 @@ class Summary(CoreCall, input_model=DataBase, output_model=SummaryOutput):
 
 
     async def _exec(self, _input_data: dict[str, Any]) -> AsyncGenerator[CallOutputChunk, None]:
-        """执行工具"""
+        """
+        执行工具
+
+        优先使用对话的滚动摘要；仅在没有摘要的历史对话中，才调用大模型生成
+        """
+        if self.context.summary or not (self.context.conversation or self.context.facts):
+            yield CallOutputChunk(type=CallOutputType.TEXT, content=self.context.summary)
+            return
+
         summary_obj = ExecutorSummary()
         summary = await summary_obj.generate(background=self.context)
         self.tokens.input_tokens += summary_obj.input_tokens
@@ -65,6 +65,9 @@ class FlowExecutor(BaseExecutor):
                 step_id="start",
                 step_name="开始",
             )
+            # 对话摘要作为各步骤提示词中的上下文；“理解上下文”步骤运行后会被覆盖
+            if not self.task.runtime.summary:
+                self.task.runtime.summary = self.background.summary
         self.validate_flow_state(self.task)
         # 是否到达Flow结束终点（变量）
         self._reached_end: bool = False
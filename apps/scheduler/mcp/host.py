@@ -5,11 +5,10 @@ import json
 import logging
 from typing import Any
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 from mcp.types import TextContent
 
 from apps.common.mongo import MongoDB
+from apps.common.template import TemplateRegistry
 from apps.llm.function import JsonGenerator
 from apps.scheduler.mcp.prompt import MEMORY_TEMPLATE
 from apps.scheduler.pool.mcp.client import MCPClient
@@ -33,12 +32,6 @@ class MCPHost:
         self._runtime_id = runtime_id
         self._runtime_name = runtime_name
         self._context_list = []
-        self._env = SandboxedEnvironment(
-            loader=BaseLoader(),
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
 
 
     async def get_client(self, mcp_id: str) -> MCPClient | None:
@@ -74,7 +67,7 @@ class MCPHost:
                 continue
             context_list.append(context)
 
-        return self._env.from_string(MEMORY_TEMPLATE).render(
+        return TemplateRegistry().get(MEMORY_TEMPLATE).render(
             context_list=context_list,
         )
 
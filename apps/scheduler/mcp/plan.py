@@ -1,9 +1,7 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """MCP 用户目标拆解与规划"""
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
-
+from apps.common.template import TemplateRegistry
 from apps.llm.function import JsonGenerator
 from apps.llm.reasoning import ReasoningLLM
 from apps.scheduler.mcp.prompt import CREATE_PLAN, FINAL_ANSWER
@@ -16,12 +14,6 @@ class MCPPlanner:
     def __init__(self, user_goal: str) -> None:
         """初始化MCP规划器"""
         self.user_goal = user_goal
-        self._env = SandboxedEnvironment(
-            loader=BaseLoader,
-            autoescape=True,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
         self.input_tokens = 0
         self.output_tokens = 0
 
@@ -38,7 +30,7 @@ class MCPPlanner:
     async def _get_reasoning_plan(self, tool_list: list[MCPTool], max_steps: int) -> str:
         """获取推理大模型的结果"""
         # 格式化Prompt
-        template = self._env.from_string(CREATE_PLAN)
+        template = TemplateRegistry().get(CREATE_PLAN, autoescape=True)
         prompt = template.render(
             goal=self.user_goal,
             tools=tool_list,
@@ -88,7 +80,7 @@ class MCPPlanner:
 
     async def generate_answer(self, plan: MCPPlan, memory: str) -> str:
         """生成最终回答"""
-        template = self._env.from_string(FINAL_ANSWER)
+        template = TemplateRegistry().get(FINAL_ANSWER, autoescape=True)
         prompt = template.render(
             plan=plan,
             memory=memory,
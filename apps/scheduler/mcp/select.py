@@ -3,11 +3,11 @@
 
 import logging
 
-from jinja2 import BaseLoader
-from jinja2.sandbox import SandboxedEnvironment
 
 from apps.common.lance import LanceDB
 from apps.common.mongo import MongoDB
+from apps.common.template import TemplateRegistry
+from apps.constants import LLM_CACHE_TTL
 from apps.llm.embedding import Embedding
 from apps.llm.function import FunctionLLM
 from apps.llm.reasoning import ReasoningLLM
@@ -80,14 +80,7 @@ class MCPSelector:
         mcp_ids: list[str],
     ) -> MCPSelectResult:
         """通过LLM选择最合适的MCP Server"""
-        # 初始化jinja2环境
-        env = SandboxedEnvironment(
-            loader=BaseLoader,
-            autoescape=True,
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
-        template = env.from_string(MCP_SELECT)
+        template = TemplateRegistry().get(MCP_SELECT, autoescape=True)
         # 渲染模板
         mcp_prompt = template.render(
             mcp_list=mcp_list,
@@ -110,7 +103,7 @@ class MCPSelector:
             {"role": "user", "content": prompt},
         ]
         result = ""
-        async for chunk in llm.call(message):
+        async for chunk in llm.call(message, cache_ttl=LLM_CACHE_TTL):
             result += chunk
         self.input_tokens += llm.input_tokens
         self.output_tokens += llm.output_tokens
@@ -128,7 +121,7 @@ class MCPSelector:
         schema = MCPSelectResult.model_json_schema()
         # schema中加入选项
         schema["properties"]["mcp_id"]["enum"] = mcp_ids
-        result = await llm.call(messages=message, schema=schema)
+        result = await llm.call(messages=message, schema=schema, cache_ttl=LLM_CACHE_TTL)
         try:
             result = MCPSelectResult.model_validate(result)
         except Exception:
@@ -3,6 +3,7 @@
 
 import logging
 import shutil
+from hashlib import sha256
 
 from anyio import Path
 from fastapi.encoders import jsonable_encoder
@@ -16,6 +17,7 @@ from apps.common.mongo import MongoDB
 from apps.scheduler.pool.check import FileChecker
 from apps.scheduler.pool.loader.flow import FlowLoader
 from apps.scheduler.pool.loader.metadata import MetadataLoader
+from apps.services.app_search import AppSearch
 
 logger = logging.getLogger(__name__)
 BASE_PATH = Path(Config().get_config().deploy.data_dir) / "semantics" / "app"
@@ -102,6 +104,27 @@ class AppLoader:
         await file_checker.diff_one(app_path)
         await self.load(app_id, file_checker.hashes[f"app/{app_id}"])
 
+    async def save_metadata(self, metadata: AppMetadata | AgentAppMetadata, app_id: str) -> None:
+        """
+        只保存应用元数据，不重新载入工作流
+
+        工作流由 ``FlowLoader`` 逐个保存并更新数据库；修改发布状态等只涉及元数据的操作使用此方法，
+        避免重新解析和向量化应用下的全部工作流。
+
+        :param metadata: 应用元数据
+        :param app_id: 应用 ID
+        """
+        await MetadataLoader().save_one(MetadataType.APP, metadata, app_id)
+        app_collection = MongoDB().get_collection("app")
+        app_data = await app_collection.find_one({"_id": app_id}, {"hashes": 1})
+        if not app_data:
+            # 数据库中没有该应用时，回退到完整载入
+            await self.save(metadata, app_id)
+            return
+        metadata_hash = sha256(await (BASE_PATH / app_id / "metadata.yaml").read_bytes()).hexdigest()
+        metadata.hashes = {**(app_data.get("hashes") or {}), "metadata.yaml": metadata_hash}
+        await self._update_db(metadata)
+
 
     @staticmethod
     async def delete(app_id: str, *, is_reload: bool = False) -> None:
@@ -127,6 +150,7 @@ class AppLoader:
             )
         except Exception:
             logger.exception("[AppLoader] MongoDB删除App失败")
+        AppSearch.invalidate()
 
         if not is_reload:
             app_path = BASE_PATH / app_id
@@ -145,17 +169,17 @@ class AppLoader:
         try:
             app_collection = mongo.get_collection("app")
             metadata.permission = metadata.permission if metadata.permission else Permission()
+            app_data = AppPool(_id=metadata.id, **(metadata.model_dump(by_alias=True)))
             await app_collection.update_one(
                 {"_id": metadata.id},
                 {
-                    "$set": jsonable_encoder(
-                        AppPool(
-                            _id=metadata.id,
-                            **(metadata.model_dump(by_alias=True)),
-                        ),
-                    ),
+                    "$set": {
+                        **jsonable_encoder(app_data),
+                        "search_terms": AppSearch.terms(app_data.name, app_data.description, app_data.author),
+                    },
                 },
                 upsert=True,
             )
         except Exception:
             logger.exception("[AppLoader] 更新 MongoDB 失败")
+        AppSearch.invalidate()
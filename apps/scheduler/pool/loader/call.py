@@ -17,6 +17,7 @@ from apps.models.vector import CallPoolVector
 from apps.llm.embedding import Embedding
 from apps.common.lance import LanceDB
 from apps.common.mongo import MongoDB
+from apps.services.node_catalog import NodeCatalog
 
 logger = logging.getLogger(__name__)
 BASE_PATH = Path(Config().get_config().deploy.data_dir) / "semantics" / "call"
@@ -157,6 +158,7 @@ class CallLoader(metaclass=SingletonMeta):
             err = f"[CallLoader] 从MongoDB删除Call失败：{e}"
             logger.exception(err)
             raise RuntimeError(err) from e
+        await NodeCatalog.bump()
 
         # 从LanceDB中删除
         while True:
@@ -199,6 +201,7 @@ class CallLoader(metaclass=SingletonMeta):
             err = "[CallLoader] 更新MongoDB失败"
             logger.exception(err)
             raise RuntimeError(err) from e
+        await NodeCatalog.bump()
 
         while True:
             try:
@@ -13,7 +13,6 @@ from anyio import Path
 from apps.common.config import Config
 from apps.schemas.enum_var import EdgeType
 from apps.schemas.flow import AppFlow, Flow
-from apps.schemas.pool import AppPool
 from apps.models.vector import FlowPoolVector
 from apps.llm.embedding import Embedding
 from apps.services.node import NodeManager
@@ -72,6 +71,12 @@ class FlowLoader:
     async def _process_steps(self, flow_yaml: dict[str, Any], flow_id: str, app_id: str) -> dict[str, Any]:
         """处理工作流步骤的转换"""
         logger.info("[FlowLoader] 应用 %s：解析工作流 %s 的步骤", flow_id, app_id)
+        # 一次性查询所有步骤引用的节点
+        node_ids = [
+            step["node"] for key, step in flow_yaml["steps"].items()
+            if key not in ("start", "end") and "node" in step
+        ]
+        nodes = await NodeManager.get_node_brief(node_ids) if node_ids else {}
         for key, step in flow_yaml["steps"].items():
             if key[0] == "_":
                 err = f"[FlowLoader] 步骤名称不能以下划线开头：{key}"
@@ -86,16 +91,12 @@ class FlowLoader:
                 step["description"] = "结束节点"
                 step["type"] = "end"
             else:
-                try:
-                    step["type"] = await NodeManager.get_node_call_id(step["node"])
-                except ValueError as e:
-                    logger.warning("[FlowLoader] 获取节点call_id失败：%s，错误信息：%s", step["node"], e)
-                    step["type"] = "Empty"
-                step["name"] = (
-                    (await NodeManager.get_node_name(step["node"]))
-                    if "name" not in step or step["name"] == ""
-                    else step["name"]
-                )
+                call_id, node_name = nodes.get(step["node"], ("Empty", ""))
+                if step["node"] not in nodes:
+                    logger.warning("[FlowLoader] 获取节点call_id失败：%s，节点不存在", step["node"])
+                step["type"] = call_id
+                if "name" not in step or step["name"] == "":
+                    step["name"] = node_name
         return flow_yaml
 
     async def load(self, app_id: str, flow_id: str) -> Flow | None:
@@ -190,51 +191,60 @@ class FlowLoader:
         logger.warning("[FlowLoader] 工作流文件不存在或不是文件：%s", flow_path)
         return True
 
-    async def _update_db(self, app_id: str, metadata: AppFlow) -> None:  # noqa: C901
-        """更新数据库"""
+    async def _update_db(self, app_id: str, metadata: AppFlow) -> None:
+        """
+        更新数据库中单个工作流的信息
+
+        只更新该工作流在应用中的条目、文件哈希和向量，不影响应用下的其他工作流；
+        内容未变化时不写入数据库，描述未变化时不重新向量化。
+        """
+        old_flow: AppFlow | None = None
         try:
             app_collection = MongoDB().get_collection("app")
-            # 获取当前的flows
-            app_data = await app_collection.find_one({"_id": app_id})
+            app_data = await app_collection.find_one(
+                {"_id": app_id},
+                {"flows": {"$elemMatch": {"id": metadata.id}}, "hashes": 1},
+            )
             if not app_data:
                 err = f"[FlowLoader] App {app_id} 不存在"
                 logger.error(err)
                 return
-            app_obj = AppPool.model_validate(app_data)
-            flows = app_obj.flows
+            if app_data.get("flows"):
+                old_flow = AppFlow.model_validate(app_data["flows"][0])
 
-            for flow in flows:
-                if flow.id == metadata.id:
-                    flows.remove(flow)
-                    break
-            flows.append(metadata)
+            flow_data = metadata.model_dump(by_alias=True, exclude_none=True)
+            if old_flow is None:
+                await app_collection.update_one({"_id": app_id}, {"$push": {"flows": flow_data}})
+            elif old_flow != metadata:
+                await app_collection.update_one(
+                    {"_id": app_id, "flows.id": metadata.id},
+                    {"$set": {"flows.$": flow_data}},
+                )
 
-            # 执行更新操作
-            await app_collection.update_one(
-                filter={
-                    "_id": app_id,
-                },
-                update={
-                    "$set": {
-                        "flows": [flow.model_dump(by_alias=True, exclude_none=True) for flow in flows],
-                    },
-                },
-                upsert=True,
-            )
             flow_path = BASE_PATH / app_id / "flow" / f"{metadata.id}.yaml"
             async with aiofiles.open(flow_path, "rb") as f:
                 new_hash = sha256(await f.read()).hexdigest()
-
-            key = f"hashes.flow/{metadata.id}.yaml"
-            await app_collection.aggregate(
-                [
-                    {"$match": {"_id": app_id}},
-                    {"$replaceWith": {"$setField": {"field": key, "input": "$$ROOT", "value": new_hash}}},
-                ],
-            )
+            # 文件名中含有“.”，需使用 $setField 更新，不能使用点号路径
+            key = f"flow/{metadata.id}.yaml"
+            if (app_data.get("hashes") or {}).get(key) != new_hash:
+                await app_collection.update_one(
+                    {"_id": app_id},
+                    [{"$set": {"hashes": {"$setField": {
+                        "field": key,
+                        "input": {"$ifNull": ["$hashes", {}]},
+                        "value": new_hash,
+                    }}}}],
+                )
         except Exception:
             logger.exception("[FlowLoader] 更新 MongoDB 失败")
 
+        if old_flow is not None and old_flow.description == metadata.description:
+            return
+        await self._update_vector(app_id, metadata)
+
+    @staticmethod
+    async def _update_vector(app_id: str, metadata: AppFlow) -> None:
+        """重新生成工作流描述的向量，并写入LanceDB"""
         # 删除重复的ID
         while True:
             try:
@@ -7,6 +7,7 @@ import json
 import logging
 import random
 import shutil
+from typing import ClassVar
 
 import asyncer
 from anyio import Path
@@ -43,6 +44,9 @@ class MCPLoader(metaclass=SingletonMeta):
     创建MCP Client，启动MCP进程，并将MCP基本信息（名称、描述、工具列表等）写入数据库
     """
 
+    _icons: ClassVar[dict[str, tuple[tuple[int, int], str]]] = {}
+    """MCP ID -> ((修改时间, 文件大小), Base64编码的图标)"""
+
     @staticmethod
     async def _check_dir() -> None:
         """
@@ -346,13 +350,24 @@ class MCPLoader(metaclass=SingletonMeta):
         :rtype: str
         """
         icon_path = MCP_PATH / "template" / mcp_id / "icon.png"
-        if not await icon_path.exists():
+        try:
+            stat = await icon_path.stat()
+        except FileNotFoundError:
             logger.warning("[MCPLoader] MCP模板图标不存在: %s", mcp_id)
+            MCPLoader._icons.pop(mcp_id, None)
             return ""
+
+        # 文件未变化时直接返回缓存的Base64编码
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = MCPLoader._icons.get(mcp_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
         f = await icon_path.open("rb")
-        icon = await f.read()
+        icon = base64.b64encode(await f.read()).decode("utf-8")
         await f.aclose()
-        return base64.b64encode(icon).decode("utf-8")
+        MCPLoader._icons[mcp_id] = (version, icon)
+        return icon
 
     @staticmethod
     async def get_config(mcp_id: str) -> MCPServerConfig:
@@ -513,6 +528,7 @@ class MCPLoader(metaclass=SingletonMeta):
         :return: 无
         """
         await MCPLoader.remove_deleted_mcp([mcp_id])
+        MCPLoader._icons.pop(mcp_id, None)
         template_path = MCP_PATH / "template" / mcp_id
         if await template_path.exists():
             await asyncer.asyncify(shutil.rmtree)(template_path.as_posix(), ignore_errors=True)
@@ -18,6 +18,7 @@ from apps.common.mongo import MongoDB
 from apps.scheduler.pool.check import FileChecker
 from apps.scheduler.pool.loader.metadata import MetadataLoader, MetadataType
 from apps.scheduler.pool.loader.openapi import OpenAPILoader
+from apps.services.node_catalog import NodeCatalog
 
 logger = logging.getLogger(__name__)
 BASE_PATH = Path(Config().get_config().deploy.data_dir) / "semantics" / "service"
@@ -78,6 +79,7 @@ class ServiceLoader:
             await node_collection.delete_many({"service_id": service_id})
         except Exception:
             logger.exception("[ServiceLoader] 删除Service失败")
+        await NodeCatalog.bump()
 
         try:
             # 获取 LanceDB 表
@@ -132,6 +134,7 @@ class ServiceLoader:
             err = f"[ServiceLoader] 更新 MongoDB 失败：{e}"
             logger.exception(err)
             raise RuntimeError(err) from e
+        await NodeCatalog.bump()
 
         # 向量化所有数据并保存
         while True:
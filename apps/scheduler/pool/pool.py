@@ -3,6 +3,7 @@
 
 import importlib
 import logging
+from collections.abc import Iterable
 from typing import Any
 
 from anyio import Path
@@ -20,6 +21,7 @@ from apps.scheduler.pool.loader import (
 from apps.schemas.enum_var import MetadataType
 from apps.schemas.flow import Flow
 from apps.schemas.pool import AppFlow, CallPool
+from apps.services.app_search import AppSearch
 
 logger = logging.getLogger(__name__)
 
@@ -122,6 +124,8 @@ class Pool:
             hash_key = Path("app/" + app).as_posix()
             if hash_key in checker.hashes:
                 await app_loader.load(app, checker.hashes[hash_key])
+        # 为旧版本写入的应用补全搜索词
+        await AppSearch.backfill()
 
         # 载入MCP
         logger.info("[Pool] 载入MCP")
@@ -164,7 +168,34 @@ class Pool:
             logger.error(err)
             raise ValueError(err)
 
-        call_metadata = CallPool.model_validate(call_db_data)
+        return self._import_call(CallPool.model_validate(call_db_data))
+
+
+    async def get_calls(self, call_ids: Iterable[str]) -> dict[str, Any]:
+        """
+        批量获取Call的类，只查询一次数据库
+
+        :param call_ids: Call ID
+        :return: Call ID -> Call类；不存在或无法导入的Call不包含在结果中
+        """
+        ids = list(set(call_ids))
+        if not ids:
+            return {}
+        call_collection = MongoDB().get_collection("call")
+        result = {}
+        async for call_db_data in call_collection.find({"_id": {"$in": ids}}):
+            try:
+                call_class = self._import_call(CallPool.model_validate(call_db_data))
+            except (ValueError, RuntimeError):
+                continue
+            if call_class is not None:
+                result[call_db_data["_id"]] = call_class
+        return result
+
+
+    @staticmethod
+    def _import_call(call_metadata: CallPool) -> Any:
+        """[Exception] 根据Call的路径导入Call类"""
         call_path_split = call_metadata.path.split("::")
         if not call_path_split:
             err = f"[Pool] Call路径{call_metadata.path}不合法"
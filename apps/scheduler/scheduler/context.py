@@ -1,30 +1,37 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """上下文管理"""
 
+import asyncio
 import logging
-from datetime import UTC, datetime
 import re
+from datetime import UTC, datetime
 
 from apps.common.security import Security
+from apps.constants import HISTORY_TOKEN_BUDGET, SUMMARY_UPDATE_MAX_RETRY
+from apps.llm.patterns.executor import ConversationSummary
 from apps.llm.patterns.facts import Facts
+from apps.llm.token import TokenCalculator
 from apps.schemas.collection import Document
 from apps.schemas.enum_var import StepStatus
 from apps.schemas.record import (
+    FootNoteMetaData,
     Record,
     RecordContent,
     RecordDocument,
     RecordGroupDocument,
-    FootNoteMetaData,
     RecordMetadata,
 )
 from apps.schemas.request_data import RequestData
 from apps.schemas.task import Task
 from apps.services.appcenter import AppCenterManager
+from apps.services.conversation import ConversationManager
 from apps.services.document import DocumentManager
-from apps.services.record import RecordManager
+from apps.services.record import HistoryCache, RecordManager
 from apps.services.task import TaskManager
 
 logger = logging.getLogger(__name__)
+# 正在运行的对话摘要更新任务；保留引用，避免任务被提前回收
+_summary_tasks: set[asyncio.Task] = set()
 
 
 async def get_docs(user_sub: str, post_body: RequestData) -> tuple[list[RecordDocument] | list[Document], list[str]]:
@@ -71,26 +78,77 @@ async def get_context(user_sub: str, post_body: RequestData, n: int) -> tuple[li
     """
     获取当前问答的上下文信息
 
+    从最近的问答开始，在Token预算内保留，按时间顺序返回；更早的问答由对话摘要概括（见get_summary）
     注意：这里的n要比用户选择的多，因为要考虑事实信息和历史问题
     """
     # 最多15轮
     n = min(n, 15)
 
-    # 获取最后n+5条Record
-    records = await RecordManager.query_record_by_conversation_id(user_sub, post_body.conversation_id, n + 5)
+    # 获取最后n+5条Record（按时间倒序）
+    contents = await RecordManager.query_record_content_by_conversation_id(
+        user_sub, post_body.conversation_id, n + 5,
+    )
 
-    # 组装问答
-    context = []
     facts = []
-    for record in records:
-        record_data = RecordContent.model_validate_json(Security.decrypt(record.content, record.key))
-        context.append({"role": "user", "content": record_data.question})
-        context.append({"role": "assistant", "content": record_data.answer})
+    for record_data in contents:
         facts.extend(record_data.facts)
 
+    # 在Token预算内保留最近的问答
+    token_calculator = TokenCalculator()
+    counts = await token_calculator.count_tokens_batch_async(
+        [text for record_data in contents for text in (record_data.question, record_data.answer)],
+    )
+    leave_tokens = HISTORY_TOKEN_BUDGET
+    context = []
+    for index, record_data in enumerate(contents):
+        question_tokens, answer_tokens = counts[2 * index], counts[2 * index + 1]
+        answer = record_data.answer
+        if question_tokens + answer_tokens > leave_tokens:
+            if context or question_tokens >= leave_tokens:
+                break
+            # 最近一轮问答本身超出预算时，截断答案
+            answer = await token_calculator.truncate_async(answer, leave_tokens - question_tokens)
+            answer_tokens = leave_tokens - question_tokens
+        leave_tokens -= question_tokens + answer_tokens
+        context.append({"role": "assistant", "content": answer})
+        context.append({"role": "user", "content": record_data.question})
+    context.reverse()
+
     return context, facts
 
 
+async def get_summary(user_sub: str, conversation_id: str) -> str:
+    """获取对话的滚动摘要"""
+    result = await ConversationManager.get_summary(user_sub, conversation_id)
+    return result[0] if result else ""
+
+
+async def update_summary(user_sub: str, conversation_id: str, question: str, answer: str) -> None:
+    """
+    将最新一轮问答合并到对话的滚动摘要中，并保存
+
+    连续的问答可能同时更新摘要；按版本号条件写入，冲突时基于最新的摘要重新合并，避免丢失某一轮问答
+    """
+    try:
+        for _ in range(SUMMARY_UPDATE_MAX_RETRY):
+            result = await ConversationManager.get_summary(user_sub, conversation_id)
+            if result is None:
+                return
+            summary, version = result
+            summary = await ConversationSummary().generate(
+                summary=summary,
+                conversation=[
+                    {"role": "user", "content": question},
+                    {"role": "assistant", "content": answer},
+                ],
+            )
+            if await ConversationManager.save_summary(user_sub, conversation_id, summary, version):
+                return
+        logger.warning("[Scheduler] 对话 %s 的摘要更新冲突过多，放弃本轮更新", conversation_id)
+    except Exception:
+        logger.exception("[Scheduler] 更新对话摘要失败")
+
+
 async def generate_facts(task: Task, question: str) -> tuple[Task, list[str]]:
     """生成Facts"""
     message = [
@@ -105,29 +163,18 @@ async def generate_facts(task: Task, question: str) -> tuple[Task, list[str]]:
     return task, facts
 
 
-async def save_data(task: Task, user_sub: str, post_body: RequestData) -> None:
-    """保存当前Executor、Task、Record等的数据"""
-    # 构造RecordContent
-    used_docs = []
-    order_to_id = {}
-    for docs in task.runtime.documents:
-        used_docs.append(
-            RecordGroupDocument(
-                _id=docs["id"],
-                name=docs["name"],
-                abstract=docs.get("abstract", ""),
-                extension=docs.get("extension", ""),
-                size=docs.get("size", 0),
-                associated="answer",
-            )
-        )
-        if docs.get("order") is not None:
-            order_to_id[docs["order"]] = docs["id"]
+def _extract_foot_notes(answer: str, order_to_id: dict[int, str]) -> tuple[str, list[FootNoteMetaData]]:
+    """
+    从答案中提取脚注
 
+    :param answer: 带有 ``[[序号]]`` 脚注的答案
+    :param order_to_id: 文档序号到文档ID的映射
+    :return: 移除所有脚注后的答案，以及脚注在移除后答案中的位置
+    """
     foot_note_pattern = re.compile(r"\[\[(\d+)\]\]")
     foot_note_metadata_list = []
     offset = 0
-    for match in foot_note_pattern.finditer(task.runtime.answer):
+    for match in foot_note_pattern.finditer(answer):
         order = int(match.group(1))
         if order in order_to_id:
             # 计算移除脚注后的插入位置
@@ -140,14 +187,53 @@ async def save_data(task: Task, user_sub: str, post_body: RequestData) -> None:
                     insertPosition=new_position,
                     footSource="rag_search",
                     footType="document",
-                )
+                ),
             )
 
             # 更新偏移量，因为脚注被移除会导致后续内容前移
             offset += len(match.group(0))
 
     # 最后统一移除所有脚注
-    task.runtime.answer = foot_note_pattern.sub("", task.runtime.answer).strip()
+    return foot_note_pattern.sub("", answer).strip(), foot_note_metadata_list
+
+
+async def _insert_record(
+    user_sub: str, conversation_id: str, record_group: str, record: Record, record_content: RecordContent,
+) -> None:
+    """保存问答对；保存成功时，将解密后的内容写入历史问答缓存，下一轮无需再次解密"""
+    if await RecordManager.insert_record_data_into_record_group(user_sub, record_group, record):
+        HistoryCache().put(conversation_id, record.id, record_content)
+
+
+def _schedule_summary_update(user_sub: str, conversation_id: str, record_content: RecordContent) -> None:
+    """在后台更新对话摘要，不阻塞本轮问答"""
+    summary_task = asyncio.create_task(update_summary(
+        user_sub, conversation_id, record_content.question, record_content.answer,
+    ))
+    _summary_tasks.add(summary_task)
+    summary_task.add_done_callback(_summary_tasks.discard)
+
+
+async def save_data(task: Task, user_sub: str, post_body: RequestData) -> None:
+    """保存当前Executor、Task、Record等的数据"""
+    # 构造RecordContent
+    used_docs = []
+    order_to_id = {}
+    for docs in task.runtime.documents:
+        used_docs.append(
+            RecordGroupDocument(
+                _id=docs["id"],
+                name=docs["name"],
+                abstract=docs.get("abstract", ""),
+                extension=docs.get("extension", ""),
+                size=docs.get("size", 0),
+                associated="answer",
+            )
+        )
+        if docs.get("order") is not None:
+            order_to_id[docs["order"]] = docs["id"]
+
+    task.runtime.answer, foot_note_metadata_list = _extract_foot_notes(task.runtime.answer, order_to_id)
     record_content = RecordContent(
         question=task.runtime.question,
         answer=task.runtime.answer,
@@ -202,7 +288,8 @@ async def save_data(task: Task, user_sub: str, post_body: RequestData) -> None:
     # 修改文件状态
     await DocumentManager.change_doc_status(user_sub, post_body.conversation_id, record_group)
     # 保存Record
-    await RecordManager.insert_record_data_into_record_group(user_sub, record_group, record)
+    await _insert_record(user_sub, post_body.conversation_id, record_group, record, record_content)
+    _schedule_summary_update(user_sub, post_body.conversation_id, record_content)
     # 保存与答案关联的文件
     await DocumentManager.save_answer_doc(user_sub, record_group, used_docs)
 
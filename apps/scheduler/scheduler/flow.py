@@ -3,8 +3,16 @@
 
 import logging
 
+from apps.common.lance import LanceDB
+from apps.constants import (
+    FLOW_VECTOR_BYPASS_MARGIN,
+    FLOW_VECTOR_BYPASS_MIN_SCORE,
+    FLOW_VECTOR_TOP_K,
+)
+from apps.llm.embedding import Embedding
 from apps.llm.patterns import Select
 from apps.scheduler.pool.pool import Pool
+from apps.schemas.flow import AppFlow
 from apps.schemas.request_data import RequestDataApp
 from apps.schemas.task import Task
 
@@ -21,8 +29,40 @@ class FlowChooser:
         self._user_selected = user_selected
 
 
+    async def _rank_flows_by_embedding(self, app_id: str, flow_list: list[AppFlow]) -> list[tuple[AppFlow, float]]:
+        """
+        通过向量检索，按与问题的相似度对Flow排序
+
+        :param app_id: 应用ID
+        :param flow_list: 应用下的全部Flow
+        :return: (Flow, 余弦相似度) 列表，按相似度从高到低排列；检索失败时返回空列表
+        """
+        flow_map = {flow.id: flow for flow in flow_list}
+        try:
+            flow_table = await LanceDB().get_table("flow")
+            query_embedding = await Embedding.get_embedding([self._question])
+            flow_vecs = await (await flow_table.search(
+                query=query_embedding[0],
+                vector_column_name="embedding",
+            )).distance_type("cosine").where(f"app_id = '{app_id}'").limit(len(flow_list)).to_list()
+        except Exception:
+            logger.exception("[FlowChooser] 应用 %s 的Flow向量检索失败", app_id)
+            return []
+
+        return [
+            (flow_map[flow_vec["id"]], 1 - flow_vec["_distance"])
+            for flow_vec in flow_vecs
+            if flow_vec["id"] in flow_map
+        ]
+
+
     async def get_top_flow(self) -> str:
-        """获取Top1 Flow"""
+        """
+        获取Top1 Flow
+
+        先通过向量检索对Flow排序：所有Flow都有向量、且Top1相似度足够高并明显领先Top2时直接选中，不再调用大模型；
+        否则将Top K个Flow与尚无向量的Flow交给大模型投票选择
+        """
         # 获取所选应用的所有Flow
         if not self._user_selected or not self._user_selected.app_id:
             return "KnowledgeBase"
@@ -30,8 +70,31 @@ class FlowChooser:
         flow_list = await Pool().get_flow_metadata(self._user_selected.app_id)
         if not flow_list:
             return "KnowledgeBase"
+        if len(flow_list) == 1:
+            return flow_list[0].id
 
         logger.info("[FlowChooser] 选择任务 %s 最合适的Flow", self.task.id)
+        ranked = await self._rank_flows_by_embedding(self._user_selected.app_id, flow_list)
+        if ranked:
+            # 尚未生成向量的Flow没有相似度，不能被排除，也不能据此跳过大模型选择
+            ranked_ids = {flow.id for flow, _ in ranked}
+            unranked = [flow for flow in flow_list if flow.id not in ranked_ids]
+            top_flow, top_score = ranked[0]
+            second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+            if (
+                not unranked
+                and top_score >= FLOW_VECTOR_BYPASS_MIN_SCORE
+                and top_score - second_score >= FLOW_VECTOR_BYPASS_MARGIN
+            ):
+                logger.info(
+                    "[FlowChooser] 向量检索直接选中Flow %s（相似度 %.3f，领先 %.3f）",
+                    top_flow.id, top_score, top_score - second_score,
+                )
+                return top_flow.id
+            if unranked:
+                logger.info("[FlowChooser] 应用 %s 有 %d 个Flow尚无向量", self._user_selected.app_id, len(unranked))
+            flow_list = [flow for flow, _ in ranked[:FLOW_VECTOR_TOP_K]] + unranked
+
         choices = [{
             "name": flow.id,
             "description": f"{flow.name}, {flow.description}",
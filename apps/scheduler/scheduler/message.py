@@ -3,7 +3,6 @@
 
 import logging
 from datetime import UTC, datetime
-from textwrap import dedent
 
 from apps.common.config import Config
 from apps.common.queue import MessageQueue
@@ -61,68 +60,68 @@ async def push_init_message(
 async def push_rag_message(
         task: Task, queue: MessageQueue, user_sub: str, llm: LLM, history: list[dict[str, str]],
         doc_ids: list[str],
-        rag_data: RAGQueryReq,) -> Task:
-    """推送RAG消息"""
-    full_answer = ""
+        rag_data: RAGQueryReq) -> Task:
+    """推送RAG消息；任务只在回答结束后保存一次；``task.runtime.summary`` 中的对话摘要会一并提供给大模型"""
+    answer_parts = []
 
-    async for chunk in RAG.chat_with_llm_base_on_rag(user_sub, llm, history, doc_ids, rag_data):
-        task, content_obj = await _push_rag_chunk(task, queue, chunk)
-        if content_obj.event_type == EventType.TEXT_ADD.value:
+    async for event in RAG.chat_with_llm_base_on_rag(
+        user_sub, llm, history, doc_ids, rag_data, task.runtime.summary,
+    ):
+        if not await _push_rag_chunk(task, queue, event):
+            continue
+        if event.event_type == EventType.TEXT_ADD.value:
             # 如果是文本消息，直接拼接到答案中
-            full_answer += content_obj.content
-        elif content_obj.event_type == EventType.DOCUMENT_ADD.value:
+            answer_parts.append(event.content)
+        elif event.event_type == EventType.DOCUMENT_ADD.value:
             task.runtime.documents.append({
-                "id": content_obj.content.get("id", ""),
-                "order": content_obj.content.get("order", 0),
-                "name": content_obj.content.get("name", ""),
-                "abstract": content_obj.content.get("abstract", ""),
-                "extension": content_obj.content.get("extension", ""),
-                "size": content_obj.content.get("size", 0),
+                "id": event.content.get("id", ""),
+                "order": event.content.get("order", 0),
+                "name": event.content.get("name", ""),
+                "abstract": event.content.get("abstract", ""),
+                "extension": event.content.get("extension", ""),
+                "size": event.content.get("size", 0),
             })
     # 保存答案
-    task.runtime.answer = full_answer
+    task.runtime.answer = "".join(answer_parts)
     await TaskManager.save_task(task.id, task)
     return task
 
 
-async def _push_rag_chunk(task: Task, queue: MessageQueue, content: str) -> tuple[Task, RAGEventData]:
-    """推送RAG单个消息块"""
-    # 如果是换行
-    if not content or not content.rstrip().rstrip("\n"):
-        return task, ""
+async def _push_rag_chunk(task: Task, queue: MessageQueue, event: RAGEventData) -> bool:
+    """
+    推送RAG单个消息块
 
-    try:
-        content_obj = RAGEventData.model_validate_json(dedent(content[6:]).rstrip("\n"))
-        # 如果是空消息
-        if not content_obj.content:
-            return task, ""
+    :return: 是否推送成功；空消息不推送
+    """
+    # 如果是空消息
+    if not event.content:
+        return False
 
-        task.tokens.input_tokens = content_obj.input_tokens
-        task.tokens.output_tokens = content_obj.output_tokens
+    try:
+        task.tokens.input_tokens = event.input_tokens
+        task.tokens.output_tokens = event.output_tokens
 
-        await TaskManager.save_task(task.id, task)
         # 推送消息
-        if content_obj.event_type == EventType.TEXT_ADD.value:
+        if event.event_type == EventType.TEXT_ADD.value:
             await queue.push_output(
                 task=task,
-                event_type=content_obj.event_type,
-                data=TextAddContent(text=content_obj.content).model_dump(exclude_none=True, by_alias=True),
+                event_type=event.event_type,
+                data=TextAddContent(text=event.content).model_dump(exclude_none=True, by_alias=True),
             )
-        elif content_obj.event_type == EventType.DOCUMENT_ADD.value:
+        elif event.event_type == EventType.DOCUMENT_ADD.value:
             await queue.push_output(
                 task=task,
-                event_type=content_obj.event_type,
+                event_type=event.event_type,
                 data=DocumentAddContent(
-                    documentId=content_obj.content.get("id", ""),
-                    documentOrder=content_obj.content.get("order", 0),
-                    documentName=content_obj.content.get("name", ""),
-                    documentAbstract=content_obj.content.get("abstract", ""),
-                    documentType=content_obj.content.get("extension", ""),
-                    documentSize=content_obj.content.get("size", 0),
+                    documentId=event.content.get("id", ""),
+                    documentOrder=event.content.get("order", 0),
+                    documentName=event.content.get("name", ""),
+                    documentAbstract=event.content.get("abstract", ""),
+                    documentType=event.content.get("extension", ""),
+                    documentSize=event.content.get("size", 0),
                 ).model_dump(exclude_none=True, by_alias=True),
             )
     except Exception:
         logger.exception("[Scheduler] RAG服务返回错误数据")
-        return task, ""
-    else:
-        return task, content_obj
+        return False
+    return True
@@ -7,10 +7,11 @@ from datetime import UTC, datetime
 from apps.common.config import Config
 from apps.common.mongo import MongoDB
 from apps.common.queue import MessageQueue
+from apps.llm.dispatch import llm_user
 from apps.scheduler.executor.agent import MCPAgentExecutor
 from apps.scheduler.executor.flow import FlowExecutor
 from apps.scheduler.pool.pool import Pool
-from apps.scheduler.scheduler.context import get_context, get_docs
+from apps.scheduler.scheduler.context import get_context, get_docs, get_summary
 from apps.scheduler.scheduler.flow import FlowChooser
 from apps.scheduler.scheduler.message import (
     push_init_message,
@@ -45,8 +46,10 @@ class Scheduler:
         self.queue = queue
         self.post_body = post_body
 
-    async def run(self) -> None:  # noqa: PLR0911
+    async def run(self) -> None:  # noqa: PLR0911, PLR0915
         """运行调度器"""
+        # 标记当前任务所属用户，用于大模型请求的公平排队
+        llm_user.set(self.task.ids.user_sub)
         try:
             # 获取当前会话使用的大模型
             llm_id = await LLMManager.get_llm_id_by_conversation_id(
@@ -91,6 +94,7 @@ class Scheduler:
             await self.queue.close()
             return
         history, _ = await get_context(self.task.ids.user_sub, self.post_body, 3)
+        self.task.runtime.summary = await get_summary(self.task.ids.user_sub, self.post_body.conversation_id)
         # 已使用文档
 
         # 如果是智能问答，直接执行
@@ -102,7 +106,9 @@ class Scheduler:
                 query=self.post_body.question,
                 tokensLimit=llm.max_tokens,
             )
-            self.task = await push_rag_message(self.task, self.queue, self.task.ids.user_sub, llm, history, doc_ids, rag_data)
+            self.task = await push_rag_message(
+                self.task, self.queue, self.task.ids.user_sub, llm, history, doc_ids, rag_data,
+            )
             self.task.tokens.full_time = round(datetime.now(UTC).timestamp(), 2) - self.task.tokens.time
         else:
             # 查找对应的App元数据
@@ -126,6 +132,7 @@ class Scheduler:
             executor_background = ExecutorBackground(
                 conversation=context,
                 facts=facts,
+                summary=self.task.runtime.summary,
             )
             await self.run_executor(self.queue, self.post_body, executor_background)
 
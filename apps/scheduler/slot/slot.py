@@ -4,7 +4,9 @@
 import json
 import logging
 import traceback
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
+from copy import deepcopy
+from functools import cache
 from typing import Any
 
 from jsonschema import Draft7Validator
@@ -12,6 +14,7 @@ from jsonschema.exceptions import ValidationError
 from jsonschema.protocols import Validator
 from jsonschema.validators import extend
 
+from apps.common.schema_cache import SchemaCache
 from apps.scheduler.slot.parser import (
     SlotConstParser,
     SlotDateParser,
@@ -44,6 +47,86 @@ _KEYWORD_CONVERTER = {
 }
 
 
+def _identity(json_value: Any) -> Any:
+    """不做处理，原样返回"""
+    return json_value
+
+
+def _compile_processor(spec_data: Any) -> Callable[[Any], Any]:
+    """
+    将JSON Schema编译为处理函数树；处理逻辑与逐字段遍历Schema相同，但Schema只需遍历一次
+
+    :param spec_data: 字段对应的JSON Schema
+    :return: 处理该字段的函数
+    """
+    if not isinstance(spec_data, dict):
+        return _identity
+
+    if "allOf" in spec_data:
+        all_of = [_compile_processor(item) for item in spec_data["allOf"]]
+
+        def _process_all_of(json_value: Any) -> Any:
+            processed_dict = {}
+            for processor in all_of:
+                processed_dict.update(processor(json_value))
+            return processed_dict
+
+        return _process_all_of
+
+    typed = _compile_typed_processor(spec_data)
+    any_of = [
+        _compile_processor(item) for key in ("anyOf", "oneOf") if key in spec_data for item in spec_data[key]
+    ]
+    if not any_of:
+        return typed
+
+    def _process_any_of(json_value: Any) -> Any:
+        for processor in any_of:
+            processed = processor(json_value)
+            if processed is not None:
+                return processed
+        return typed(json_value)
+
+    return _process_any_of
+
+
+def _compile_typed_processor(spec_data: dict[str, Any]) -> Callable[[Any], Any]:
+    """按 ``type`` 字段编译处理函数"""
+    spec_type = spec_data.get("type")
+    if spec_type == "array":
+        # 若Schema不标准，则不进行处理
+        if "items" not in spec_data:
+            return _identity
+        item_processor = _compile_processor(spec_data["items"])
+        return lambda json_value: (
+            [item_processor(item) for item in json_value] if isinstance(json_value, list) else json_value
+        )
+
+    if spec_type == "object":
+        # 若Schema不标准，则不进行处理
+        if "properties" not in spec_data:
+            return _identity
+        properties = {key: _compile_processor(val) for key, val in spec_data["properties"].items()}
+        return lambda json_value: (
+            {key: properties[key](val) if key in properties else val for key, val in json_value.items()}
+            if isinstance(json_value, dict) else json_value
+        )
+
+    return _compile_converter(spec_data, spec_type)
+
+
+def _compile_converter(spec_data: dict[str, Any], spec_type: Any) -> Callable[[Any], Any]:
+    """按自定义类型编译处理函数；不是自定义类型时原样返回"""
+    converter = next((item for item in _TYPE_CONVERTER if item.name == spec_type), None)
+    if converter is None:
+        return _identity
+    # 如果类型有附加字段
+    if converter.name in spec_data:
+        kwargs = spec_data[converter.name]
+        return lambda json_value: converter.convert(json_value, **kwargs)
+    return converter.convert
+
+
 class Slot:
     """
     参数槽
@@ -54,7 +137,11 @@ class Slot:
     """
 
     def __init__(self, schema: dict) -> None:
-        """初始化参数槽处理器"""
+        """
+        初始化参数槽处理器
+
+        校验器和处理函数按Schema哈希全局缓存，相同Schema的参数槽共享同一份编译结果
+        """
         try:
             # 导入所有校验器，动态生成新的类
             self._validator_cls = Slot._construct_validator()
@@ -64,20 +151,22 @@ class Slot:
 
         # 预初始化变量
         self._json = {}
+        self._schema_hash = SchemaCache.hash(schema)
 
         try:
             # 校验提供的JSON Schema是否合法
-            self._validator_cls.check_schema(schema)
+            self._validator = SchemaCache().validator(schema, self._validator_cls, self._schema_hash)
         except Exception as e:
             err = f"Invalid JSON Schema: {e!s}"
             raise ValueError(err) from e
 
-        self._validator = self._validator_cls(schema)
+        self._processor = SchemaCache().get("slot:processor", schema, _compile_processor, self._schema_hash)
         self._schema = schema
 
     @staticmethod
+    @cache
     def _construct_validator() -> type[Validator]:
-        """构造JSON Schema验证器"""
+        """构造JSON Schema验证器；验证器类只需构造一次"""
         type_checker = Draft7Validator.TYPE_CHECKER
         # 把所有type_checker都添加
         for checker in _TYPE_CHECKER:
@@ -92,64 +181,13 @@ class Slot:
             Draft7Validator, type_checker=type_checker, format_checker=format_checker, validators=_KEYWORD_CHECKER,
         )
 
-    def process_json(self, json_data: str | dict[str, Any]) -> dict[str, Any]:  # noqa: C901
+    def process_json(self, json_data: str | dict[str, Any]) -> dict[str, Any]:
         """将提供的JSON数据进行处理"""
         if isinstance(json_data, str):
             json_data = json.loads(json_data)
 
-        def _process_json_value(json_value: Any, spec_data: dict[str, Any]) -> Any:  # noqa: C901, PLR0911, PLR0912
-            """
-            使用递归的方式对JSON返回值进行处理
-
-            :param json_value: 返回值中的字段
-            :param spec_data: 返回值字段对应的JSON Schema
-            :return: 处理后的这部分返回值字段
-            """
-            if "allOf" in spec_data:
-                processed_dict = {}
-                for item in spec_data["allOf"]:
-                    processed_dict.update(_process_json_value(json_value, item))
-                return processed_dict
-
-            for key in ("anyOf", "oneOf"):
-                if key in spec_data:
-                    for item in spec_data[key]:
-                        processed_dict = _process_json_value(json_value, item)
-                        if processed_dict is not None:
-                            return processed_dict
-
-            if "type" in spec_data:
-                if spec_data["type"] == "array" and isinstance(json_value, list):
-                    # 若Schema不标准，则不进行处理
-                    if "items" not in spec_data:
-                        return json_value
-                    # Schema标准
-                    return [_process_json_value(item, spec_data["items"]) for item in json_value]
-                if spec_data["type"] == "object" and isinstance(json_value, dict):
-                    # 若Schema不标准，则不进行处理
-                    if "properties" not in spec_data:
-                        return json_value
-                    # Schema标准
-                    processed_dict = {}
-                    for key, val in json_value.items():
-                        if key not in spec_data["properties"]:
-                            processed_dict[key] = val
-                            continue
-                        processed_dict[key] = _process_json_value(val, spec_data["properties"][key])
-                    return processed_dict
-
-                for converter in _TYPE_CONVERTER:
-                    # 如果是自定义类型
-                    if converter.name == spec_data["type"]:
-                        # 如果类型有附加字段
-                        if converter.name in spec_data:
-                            return converter.convert(json_value, **spec_data[converter.name])
-                        return converter.convert(json_value)
-
-            return json_value
-
         # 遍历JSON，处理每一个字段
-        return _process_json_value(json_data, self._schema)
+        return self._processor(json_data)
 
     @staticmethod
     def _generate_example(schema_node: dict) -> Any:  # noqa: PLR0911
@@ -190,7 +228,8 @@ class Slot:
 
     def create_empty_slot(self) -> dict[str, Any]:
         """创建一个空的槽位"""
-        return self._generate_example(self._schema)
+        example = SchemaCache().get("slot:example", self._schema, self._generate_example, self._schema_hash)
+        return deepcopy(example)
 
     def extract_type_desc_from_schema(self) -> dict[str, str]:
         """从JSON Schema中提取类型描述"""
@@ -219,7 +258,8 @@ class Slot:
                 items_schema = schema_node.get("items", {})
                 data["items"] = _extract_type_desc(items_schema)
             return data
-        return _extract_type_desc(self._schema)
+        type_desc = SchemaCache().get("slot:type_desc", self._schema, _extract_type_desc, self._schema_hash)
+        return deepcopy(type_desc)
 
     def _flatten_schema(self, schema: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
         """将JSON Schema扁平化"""
@@ -260,7 +300,8 @@ class Slot:
 
             # 如果字段存在，则返回裁剪后的schema
             if isinstance(error.schema, Mapping) and "properties" in error.schema and key in error.schema["properties"]:
-                schema = error.schema["properties"][key]
+                # 校验器在请求间共享，不能直接修改其中的Schema
+                schema = deepcopy(error.schema["properties"][key])
                 # 将默认值改为当前值
                 schema["default"] = ""
                 return schema, [key]
@@ -271,7 +312,7 @@ class Slot:
 
         # 默认无需裁剪
         if isinstance(error.schema, Mapping):
-            return dict(error.schema.items()), []
+            return deepcopy(dict(error.schema.items())), []
 
         logger.exception("[Slot] 错误schema不合法: %s", error.schema)
         return {}, []
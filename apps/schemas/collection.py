@@ -3,6 +3,7 @@
 
 import uuid
 from datetime import UTC, datetime
+from typing import Any
 
 from pydantic import BaseModel, Field
 
@@ -55,7 +56,9 @@ class User(BaseModel):
     is_whitelisted: bool = False
     credit: int = 100
     api_key: str | None = None
-    conversations: list[str] = []
+    conversations: list[str] = Field(
+        default=[], description="[已废弃] 旧版本记录的对话ID；对话通过conversation集合的user_sub查询",
+    )
     domains: list[UserDomainData] = []
     app_usage: dict[str, AppUsageData] = {}
     fav_apps: list[str] = []
@@ -110,10 +113,15 @@ class Conversation(BaseModel):
     app_id: str | None = Field(default="")
     tasks: list[str] = []
     unused_docs: list[str] = []
-    record_groups: list[str] = []
+    record_groups: list[str] = Field(
+        default=[], description="[已废弃] 旧版本记录的问答组ID；问答组通过conversation_id查询",
+    )
     debug: bool = Field(default=False)
     llm: LLMItem | None = None
     kb_list: list[KnowledgeBaseItem] = Field(default=[])
+    summary: str = Field(default="", description="对话的滚动摘要（加密）；每轮问答结束后更新")
+    summary_key: dict[str, Any] = Field(default={}, description="对话摘要的加密密钥")
+    summary_version: int = Field(default=0, description="对话摘要的版本号，用于并发更新时的条件写入")
 
 
 class Document(BaseModel):
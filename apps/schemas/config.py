@@ -98,6 +98,34 @@ class FunctionCallConfig(BaseModel):
     temperature: float | None = Field(description="Function Call 温度", default=None)
 
 
+class LLMCacheConfig(BaseModel):
+    """大模型响应缓存配置"""
+
+    backend: Literal["memory", "disk", "disable"] = Field(description="缓存后端", default="memory")
+
+
+class LLMEndpointLimitConfig(BaseModel):
+    """单个大模型Endpoint的限流配置"""
+
+    max_concurrency: int = Field(description="最大并发请求数", default=16, ge=1)
+    tokens_per_minute: int = Field(description="每分钟Token数上限；为0时不限制", default=0, ge=0)
+
+
+class LLMDispatchConfig(BaseModel):
+    """大模型请求调度配置"""
+
+    default: LLMEndpointLimitConfig = Field(description="默认限流配置", default_factory=LLMEndpointLimitConfig)
+    endpoints: dict[str, LLMEndpointLimitConfig] = Field(description="按Endpoint地址覆盖的限流配置", default={})
+
+
+class SessionConfig(BaseModel):
+    """浏览器Session配置"""
+
+    stateless: bool = Field(description="是否签发无状态的Session Token", default=False)
+    token_ttl: int = Field(description="Session Token有效期，单位为秒", default=15 * 60, ge=60)
+    revocation_sync: int = Field(description="吊销列表同步间隔，单位为秒", default=10, ge=1)
+
+
 class SecurityConfig(BaseModel):
     """安全配置"""
 
@@ -132,6 +160,9 @@ class ConfigModel(BaseModel):
     mongodb: MongoDBConfig
     llm: LLMConfig
     function_call: FunctionCallConfig
+    llm_cache: LLMCacheConfig = Field(default_factory=LLMCacheConfig)
+    llm_dispatch: LLMDispatchConfig = Field(default_factory=LLMDispatchConfig)
+    session: SessionConfig = Field(default_factory=SessionConfig)
     security: SecurityConfig
     check: CheckConfig
     extra: ExtraConfig
@@ -45,6 +45,14 @@ class EventType(str, Enum):
     DONE = "done"
 
 
+class LLMPriority(str, Enum):
+    """大模型请求优先级"""
+
+    INTERACTIVE = "interactive"
+    SELECTION = "selection"
+    BACKGROUND = "background"
+
+
 class CallType(str, Enum):
     """Call类型"""
 
@@ -126,12 +126,12 @@ class RecordGroup(BaseModel):
 
     多次重新生成的问答都是一个问答组
     Collection: record_group
-    外键：record_group - document
+    外键：record_group - document, record
     """
 
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
     user_sub: str
-    records: list[Record] = []
+    records: list[Record] = Field(default=[], description="问答对；保存在record集合中，读取时填充")
     docs: list[RecordGroupDocument] = []    # 问题不变，所用到的文档不变
     conversation_id: str
     task_id: str
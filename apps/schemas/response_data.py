@@ -117,6 +117,7 @@ class ConversationListMsg(BaseModel):
     """GET /api/conversation Result数据结构"""
 
     conversations: list[ConversationListItem]
+    next_cursor: str | None = Field(alias="nextCursor", default=None)
 
 
 class ConversationListRsp(ResponseData):
@@ -48,6 +48,7 @@ class ExecutorBackground(BaseModel):
 
     conversation: list[dict[str, str]] = Field(description="对话记录")
     facts: list[str] = Field(description="当前Executor的背景信息")
+    summary: str = Field(description="对话的滚动摘要", default="")
 
 
 class CallError(Exception):
@@ -18,3 +18,12 @@ class Session(BaseModel):
     user_sub: str | None = None
     nonce: str | None = None
     expired_at: datetime
+
+
+class SessionToken(BaseModel):
+    """无状态Session Token的内容"""
+
+    sid: str = Field(description="Session ID")
+    sub: str = Field(description="用户sub")
+    iat: int = Field(description="签发时间（Unix时间戳），即Token的生效纪元")
+    exp: int = Field(description="过期时间（Unix时间戳）")
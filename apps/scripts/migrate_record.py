@@ -0,0 +1,128 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+在线迁移问答数据的存储结构
+
+旧版本将问答对内嵌在 ``record_group.records`` 数组中，并在 ``conversation.record_groups``、
+``user.conversations`` 中记录ID列表，数组随使用时间无限增长。新版本中问答对保存在独立的 ``record`` 集合，
+对话与问答组均通过带索引的字段查询。
+
+迁移可在服务运行时执行，也可以中断后重复执行：服务读取时会合并新旧两处的数据。
+每个问答组在一个事务中重新读取、写入 ``record`` 集合并从问答组中移除；迁移期间问答组被修改（如更新评论）时，
+事务因写冲突回滚并重试，不会用旧数据覆盖新的修改。
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from pymongo import ReplaceOne
+
+from apps.common.mongo import MongoDB
+from apps.schemas.record import Record
+from apps.services.record import RecordManager
+
+if TYPE_CHECKING:
+    from pymongo.asynchronous.client_session import AsyncClientSession
+
+logger = logging.getLogger(__name__)
+
+
+async def _migrate_group(mongo: MongoDB, group_id: str) -> int:
+    """
+    在事务中迁移单个问答组的问答对
+
+    :param group_id: 问答组ID
+    :return: 迁移的问答对数量
+    """
+    group_collection = mongo.get_collection("record_group")
+    record_collection = mongo.get_collection("record")
+
+    async def move(session: "AsyncClientSession") -> int:
+        # 在事务内重新读取，保证写入的是最新的数据
+        group = await group_collection.find_one(
+            {"_id": group_id}, {"records": 1, "conversation_id": 1, "user_sub": 1}, session=session,
+        )
+        if not group or not group.get("records"):
+            return 0
+        records = [
+            Record.model_validate(item).model_copy(update={
+                "group_id": group["_id"],
+                "conversation_id": group["conversation_id"],
+                "user_sub": group["user_sub"],
+            })
+            for item in group["records"]
+        ]
+        await record_collection.bulk_write([
+            ReplaceOne({"_id": record.id}, RecordManager.record_to_document(record), upsert=True)
+            for record in records
+        ], ordered=False, session=session)
+        await group_collection.update_one(
+            {"_id": group_id},
+            {"$pull": {"records": {"id": {"$in": [record.id for record in records]}}}},
+            session=session,
+        )
+        return len(records)
+
+    async with mongo.get_session() as session:
+        return await session.with_transaction(move)
+
+
+async def migrate_records(batch_size: int, *, dry_run: bool) -> int:
+    """
+    将内嵌的问答对移动到record集合
+
+    :param batch_size: 每批处理的问答组数量
+    :param dry_run: 只统计，不修改数据
+    :return: 迁移的问答对数量
+    """
+    mongo = MongoDB()
+    group_collection = mongo.get_collection("record_group")
+
+    total = 0
+    groups = 0
+    query = {"records.0": {"$exists": True}}
+    async for group in group_collection.find(query, {"records.id": 1}).batch_size(batch_size):
+        if dry_run:
+            total += len(group["records"])
+            continue
+
+        total += await _migrate_group(mongo, group["_id"])
+        groups += 1
+        if groups % batch_size == 0:
+            logger.info("[MigrateRecord] 已处理 %d 个问答组，迁移 %d 条问答对", groups, total)
+    return total
+
+
+async def drop_id_lists(*, dry_run: bool) -> None:
+    """
+    删除对话与用户文档中已废弃的ID列表
+
+    :param dry_run: 只统计，不修改数据
+    """
+    mongo = MongoDB()
+    for collection_name, field in (("conversation", "record_groups"), ("user", "conversations")):
+        collection = mongo.get_collection(collection_name)
+        query = {field: {"$exists": True}}
+        if dry_run:
+            count = await collection.count_documents(query)
+            logger.info("[MigrateRecord] %s 中有 %d 个文档包含 %s", collection_name, count, field)
+            continue
+        result = await collection.update_many(query, {"$unset": {field: ""}})
+        logger.info("[MigrateRecord] 已删除 %d 个 %s 文档中的 %s", result.modified_count, collection_name, field)
+
+
+async def main(batch_size: int, *, dry_run: bool) -> None:
+    """执行迁移"""
+    total = await migrate_records(batch_size, dry_run=dry_run)
+    logger.info("[MigrateRecord] 共%s %d 条问答对", "需迁移" if dry_run else "迁移", total)
+    await drop_id_lists(dry_run=dry_run)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="迁移问答数据的存储结构")
+    parser.add_argument("--batch-size", type=int, default=100, help="每批处理的问答组数量")
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要迁移的数据，不修改数据库")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, dry_run=args.dry_run))
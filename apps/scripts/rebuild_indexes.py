@@ -0,0 +1,34 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+重建定义与声明不一致的MongoDB索引
+
+服务启动时只创建缺失的索引；修改了 ``MONGO_INDEXES`` 中已有索引的定义后，需在维护窗口内执行本脚本，
+删除旧索引并按新定义重建。重建期间相关查询可能变慢，请勿与服务启动同时执行。
+"""
+
+import argparse
+import asyncio
+import logging
+
+from apps.common.mongo_index import check_indexes, ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+
+async def main(*, dry_run: bool) -> None:
+    """执行重建"""
+    if not dry_run:
+        await ensure_indexes(rebuild=True)
+        return
+    report = await check_indexes()
+    logger.info("[RebuildIndexes] 缺失: %s", ", ".join(report.missing) or "无")
+    logger.info("[RebuildIndexes] 需重建: %s", ", ".join(report.changed) or "无")
+    logger.info("[RebuildIndexes] 未声明: %s", ", ".join(report.extra) or "无")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="重建定义与声明不一致的MongoDB索引")
+    parser.add_argument("--dry-run", action="store_true", help="只报告差异，不修改数据库")
+    args = parser.parse_args()
+    asyncio.run(main(dry_run=args.dry_run))
@@ -6,6 +6,8 @@ import logging
 import uuid
 
 from apps.common.mongo import MongoDB
+from apps.common.ttl_cache import AsyncTTLCache
+from apps.constants import AUTH_CACHE_MAX_SIZE, AUTH_CACHE_NEGATIVE_TTL, AUTH_CACHE_TTL
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,14 @@ logger = logging.getLogger(__name__)
 class ApiKeyManager:
     """API Key管理"""
 
+    _cache: AsyncTTLCache[str, str] = AsyncTTLCache(AUTH_CACHE_TTL, AUTH_CACHE_NEGATIVE_TTL, AUTH_CACHE_MAX_SIZE)
+    """API Key哈希 -> 用户ID；无效的API Key同样缓存"""
+
+    @staticmethod
+    def _hash(api_key: str) -> str:
+        """计算API Key的哈希"""
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
     @staticmethod
     async def generate_api_key(user_sub: str) -> str | None:
         """
@@ -23,7 +33,7 @@ class ApiKeyManager:
         """
         mongo = MongoDB()
         api_key = str(uuid.uuid4().hex)
-        api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        api_key_hash = ApiKeyManager._hash(api_key)
 
         try:
             user_collection = mongo.get_collection("user")
@@ -35,6 +45,8 @@ class ApiKeyManager:
             logger.exception("[ApiKeyManager] 生成API Key失败")
             return None
         else:
+            ApiKeyManager._cache.invalidate_value(user_sub)
+            ApiKeyManager._cache.invalidate(api_key_hash)
             return api_key
 
     @staticmethod
@@ -57,6 +69,7 @@ class ApiKeyManager:
         except Exception:
             logger.exception("[ApiKeyManager] 删除API Key失败")
             return False
+        ApiKeyManager._cache.invalidate_value(user_sub)
         return True
 
     @staticmethod
@@ -76,6 +89,13 @@ class ApiKeyManager:
             logger.exception("[ApiKeyManager] 检查API Key是否存在失败")
             return False
 
+    @staticmethod
+    async def _load_user(api_key_hash: str) -> str | None:
+        """从数据库中查询API Key对应的用户ID"""
+        user_collection = MongoDB().get_collection("user")
+        user_data = await user_collection.find_one({"api_key": api_key_hash}, {"_id": 1})
+        return user_data["_id"] if user_data else None
+
     @staticmethod
     async def get_user_by_api_key(api_key: str) -> str | None:
         """
@@ -84,12 +104,9 @@ class ApiKeyManager:
         :param api_key: API Key
         :return: 用户ID
         """
-        mongo = MongoDB()
-        api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        api_key_hash = ApiKeyManager._hash(api_key)
         try:
-            user_collection = mongo.get_collection("user")
-            user_data = await user_collection.find_one({"api_key": api_key_hash}, {"_id": 1})
-            return user_data["_id"] if user_data else None
+            return await ApiKeyManager._cache.get(api_key_hash, lambda: ApiKeyManager._load_user(api_key_hash))
         except Exception:
             logger.exception("[ApiKeyManager] 根据API Key获取用户信息失败")
             return None
@@ -102,16 +119,7 @@ class ApiKeyManager:
         :param api_key: API Key
         :return: 验证API Key是否成功
         """
-        mongo = MongoDB()
-        api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
-        try:
-            user_collection = mongo.get_collection("user")
-            key_data = await user_collection.find_one({"api_key": api_key_hash}, {"_id": 1})
-        except Exception:
-            logger.exception("[ApiKeyManager] 验证API Key失败")
-            return False
-        else:
-            return key_data is not None
+        return await ApiKeyManager.get_user_by_api_key(api_key) is not None
 
     @staticmethod
     async def update_api_key(user_sub: str) -> str | None:
@@ -125,7 +133,7 @@ class ApiKeyManager:
         if not await ApiKeyManager.api_key_exists(user_sub):
             return None
         api_key = str(uuid.uuid4().hex)
-        api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        api_key_hash = ApiKeyManager._hash(api_key)
         try:
             user_collection = mongo.get_collection("user")
             await user_collection.update_one(
@@ -135,4 +143,6 @@ class ApiKeyManager:
         except Exception:
             logger.exception("[ApiKeyManager] 更新API Key失败")
             return None
+        ApiKeyManager._cache.invalidate_value(user_sub)
+        ApiKeyManager._cache.invalidate(api_key_hash)
         return api_key
@@ -0,0 +1,130 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+应用搜索
+
+应用的名称、描述和作者被切分为单字和二元组（n-gram），保存在 ``search_terms`` 字段并建立多键索引。
+搜索时先用关键字的n-gram命中索引缩小范围，再用正则表达式精确匹配，结果与直接使用正则表达式一致。
+"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Any
+
+from apps.common.mongo import MongoDB
+from apps.common.ttl_cache import AsyncTTLCache
+from apps.constants import APP_LIST_CACHE_SIZE, APP_LIST_CACHE_TTL
+from apps.schemas.pool import AppPool
+
+logger = logging.getLogger(__name__)
+
+
+class AppSearch:
+    """应用搜索与列表缓存"""
+
+    _cache: AsyncTTLCache[str, tuple[list[AppPool], int]] = AsyncTTLCache(
+        APP_LIST_CACHE_TTL, APP_LIST_CACHE_TTL, APP_LIST_CACHE_SIZE,
+    )
+    """查询条件 + 页码 -> (应用列表, 总数)"""
+
+    @staticmethod
+    def _ngrams(text: str, n: int) -> set[str]:
+        """切分n-gram；跳过包含空白的片段"""
+        return {text[i:i + n] for i in range(len(text) - n + 1) if not any(c.isspace() for c in text[i:i + n])}
+
+    @staticmethod
+    def terms(*texts: str) -> list[str]:
+        """
+        生成应用的搜索词：单字与二元组
+
+        :param texts: 应用名称、描述、作者等文本
+        :return: 去重后的搜索词
+        """
+        result: set[str] = set()
+        for text in texts:
+            text = text.casefold()
+            result |= AppSearch._ngrams(text, 1) | AppSearch._ngrams(text, 2)
+        return sorted(result)
+
+    @staticmethod
+    def keyword_filter(keyword: str) -> dict[str, Any]:
+        """
+        生成关键字搜索条件
+
+        :param keyword: 搜索关键字
+        :return: MongoDB查询条件
+        """
+        text = keyword.casefold()
+        terms = AppSearch._ngrams(text, 2) or AppSearch._ngrams(text, 1)
+        pattern = re.escape(keyword)
+        condition: dict[str, Any] = {
+            "$or": [
+                {"name": {"$regex": pattern, "$options": "i"}},
+                {"description": {"$regex": pattern, "$options": "i"}},
+                {"author": {"$regex": pattern, "$options": "i"}},
+            ],
+        }
+        if terms:
+            condition["search_terms"] = {"$all": sorted(terms)}
+        return condition
+
+    @staticmethod
+    async def search(
+        filters: dict[str, Any],
+        page: int,
+        page_size: int,
+    ) -> tuple[list[AppPool], int]:
+        """
+        按条件查询一页应用及总数；一次聚合完成，结果短暂缓存
+
+        :param filters: MongoDB查询条件
+        :param page: 页码，从1开始
+        :param page_size: 每页数量
+        :return: 应用列表, 总应用数
+        """
+        raw = json.dumps([filters, page, page_size], sort_keys=True, ensure_ascii=False, default=str)
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return await AppSearch._cache.get(key, lambda: AppSearch._query(filters, page, page_size))
+
+    @staticmethod
+    async def _query(filters: dict[str, Any], page: int, page_size: int) -> tuple[list[AppPool], int]:
+        """执行聚合查询"""
+        app_collection = MongoDB().get_collection("app")
+        cursor = await app_collection.aggregate([
+            {"$match": filters},
+            {"$sort": {"created_at": -1}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "apps": [
+                    {"$skip": (page - 1) * page_size},
+                    {"$limit": page_size},
+                    {"$project": {"search_terms": 0, "hashes": 0}},
+                ],
+            }},
+        ])
+        result = await cursor.to_list(length=1)
+        if not result:
+            return [], 0
+        total = result[0]["total"][0]["count"] if result[0]["total"] else 0
+        return [AppPool.model_validate(doc) for doc in result[0]["apps"]], total
+
+    @staticmethod
+    def invalidate() -> None:
+        """应用发生变化时清空列表缓存"""
+        AppSearch._cache.clear()
+
+    @staticmethod
+    async def backfill() -> None:
+        """为缺少搜索词的应用补全 ``search_terms`` 字段"""
+        app_collection = MongoDB().get_collection("app")
+        count = 0
+        async for app in app_collection.find(
+            {"search_terms": {"$exists": False}}, {"name": 1, "description": 1, "author": 1},
+        ):
+            terms = AppSearch.terms(app.get("name", ""), app.get("description", ""), app.get("author", ""))
+            await app_collection.update_one({"_id": app["_id"]}, {"$set": {"search_terms": terms}})
+            count += 1
+        if count:
+            logger.info("[AppSearch] 已为 %d 个应用补全搜索词", count)
+        AppSearch.invalidate()
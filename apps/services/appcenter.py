@@ -17,6 +17,7 @@ from apps.schemas.enum_var import AppFilterType, AppType, PermissionType
 from apps.schemas.flow import AppMetadata, MetadataType, Permission
 from apps.schemas.pool import AppPool
 from apps.schemas.response_data import RecentAppList, RecentAppListItem
+from apps.services.app_search import AppSearch
 from apps.services.flow import FlowManager
 from apps.services.mcp_service import MCPServiceManager
 
@@ -75,11 +76,8 @@ class AppCenterManager:
 
         # 添加关键字搜索条件
         if keyword:
-            filters["$or"] = [
-                {"name": {"$regex": keyword, "$options": "i"}},
-                {"description": {"$regex": keyword, "$options": "i"}},
-                {"author": {"$regex": keyword, "$options": "i"}},
-            ]
+            # 与权限条件组合，不能覆盖权限条件中的 $or
+            filters = {"$and": [filters, AppSearch.keyword_filter(keyword)]}
 
         # 添加应用类型过滤条件
         if app_type is not None:
@@ -191,13 +189,15 @@ class AppCenterManager:
             {"$set": {"published": published}},
         )
 
-        await AppCenterManager._process_app_and_save(
+        # 工作流已由 FlowLoader 单独保存，这里只更新应用元数据
+        metadata = await AppCenterManager._create_metadata(
             app_type=app_data.app_type,
             app_id=app_id,
             user_sub=user_sub,
             app_data=app_data,
             published=published,
         )
+        await AppLoader().save_metadata(metadata, app_id)
 
         return published
 
@@ -361,18 +361,7 @@ class AppCenterManager:
         page_size: int,
     ) -> tuple[list[AppPool], int]:
         """根据过滤条件搜索应用并计算总页数"""
-        mongo = MongoDB()
-        app_collection = mongo.get_collection("app")
-        total_apps = await app_collection.count_documents(search_conditions)
-        db_data = (
-            await app_collection.find(search_conditions)
-            .sort("created_at", -1)
-            .skip((page - 1) * page_size)
-            .limit(page_size)
-            .to_list(length=page_size)
-        )
-        apps = [AppPool.model_validate(doc) for doc in db_data]
-        return apps, total_apps
+        return await AppSearch.search(search_conditions, page, page_size)
 
     @staticmethod
     async def _get_app_data(app_id: str, user_sub: str, *, check_permission: bool = True) -> AppPool:
@@ -6,11 +6,14 @@ import re
 
 from apps.common.mongo import MongoDB
 from apps.common.security import Security
+from apps.common.ttl_cache import AsyncTTLCache
+from apps.constants import AUTH_CACHE_MAX_SIZE, AUTH_CACHE_NEGATIVE_TTL, AUTH_CACHE_TTL
 from apps.schemas.collection import (
     Blacklist,
     User,
 )
-from apps.schemas.record import Record, RecordContent
+from apps.schemas.record import RecordContent
+from apps.services.record import RecordManager
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +88,9 @@ class QuestionBlacklistManager:
 class UserBlacklistManager:
     """用户黑名单相关操作"""
 
+    _cache: AsyncTTLCache[str, bool] = AsyncTTLCache(AUTH_CACHE_TTL, AUTH_CACHE_NEGATIVE_TTL, AUTH_CACHE_MAX_SIZE)
+    """用户sub -> 是否已被拉黑"""
+
     @staticmethod
     async def get_blacklisted_users(limit: int, offset: int) -> list[str]:
         """获取当前所有黑名单用户"""
@@ -101,19 +107,27 @@ class UserBlacklistManager:
             logger.exception("[UserBlacklistManager] 查询用户黑名单失败")
             return []
 
+    @staticmethod
+    async def _load_blacklisted(user_sub: str) -> bool:
+        """从数据库中查询用户是否已被拉黑"""
+        user_collection = MongoDB().get_collection("user")
+        result = await user_collection.find_one(
+            {"user_sub": user_sub, "credit": {"$lte": 0}, "is_whitelisted": False}, {"_id": 1},
+        )
+        return result is not None
+
     @staticmethod
     async def check_blacklisted_users(user_sub: str) -> bool:
         """检测某用户是否已被拉黑"""
         try:
-            user_collection = MongoDB().get_collection("user")
-            result = await user_collection.find_one(
-                {"user_sub": user_sub, "credit": {"$lte": 0}, "is_whitelisted": False}, {"_id": 1},
+            result = await UserBlacklistManager._cache.get(
+                user_sub, lambda: UserBlacklistManager._load_blacklisted(user_sub),
             )
         except Exception:
             logger.exception("[UserBlacklistManager] 检查用户黑名单失败")
             return False
         else:
-            if result is not None:
+            if result:
                 logger.info("[UserBlacklistManager] 用户在黑名单中")
                 return True
             return False
@@ -124,7 +138,7 @@ class UserBlacklistManager:
         try:
             # 获取用户当前信用分
             user_collection = MongoDB().get_collection("user")
-            result = await user_collection.find_one({"user_sub": user_sub}, {"_id": 0, "credit": 1})
+            result = await user_collection.find_one({"user_sub": user_sub}, {"credit": 1, "is_whitelisted": 1})
             # 用户不存在
             if result is None:
                 logger.info("[UserBlacklistManager] 用户不存在")
@@ -153,6 +167,12 @@ class UserBlacklistManager:
 
             # 更新用户信用分
             await user_collection.update_one({"user_sub": user_sub}, {"$set": {"credit": new_credit}})
+            UserBlacklistManager._cache.invalidate(user_sub)
+            # 用户被封禁时，已签发的无状态Session Token不再查询黑名单，需立即吊销；session模块依赖本模块，因此在此导入
+            if new_credit <= 0:
+                from apps.services.session import SessionRevocation
+
+                await SessionRevocation().revoke_user(user_sub)
         except Exception:
             # 数据库错误
             logger.exception("[UserBlacklistManager] 修改用户黑名单失败")
@@ -169,23 +189,12 @@ class AbuseManager:
         """存储用户举报详情"""
         try:
             # 判断record_id是否合法
-            record_group_collection = MongoDB().get_collection("record_group")
-            record = await record_group_collection.aggregate(
-                [
-                    {"$match": {"user_sub": user_sub}},
-                    {"$unwind": "$records"},
-                    {"$match": {"records.id": record_id}},
-                    {"$limit": 1},
-                ],
-            )
-
-            record = await record.to_list(length=1)
-            if not record:
+            record = await RecordManager.get_record(record_id, user_sub=user_sub)
+            if record is None:
                 logger.info("[AbuseManager] 举报记录不合法")
                 return False
 
             # 获得Record明文内容
-            record = Record.model_validate(record[0]["records"])
             record_data = Security.decrypt(record.content, record.key)
             record_data = RecordContent.model_validate_json(record_data)
 
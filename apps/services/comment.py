@@ -5,6 +5,7 @@ import logging
 
 from apps.common.mongo import MongoDB
 from apps.schemas.record import RecordComment
+from apps.services.record import RecordManager
 
 logger = logging.getLogger(__name__)
 
@@ -20,19 +21,10 @@ class CommentManager:
         :param record_id: 问答ID
         :return: 评论内容
         """
-        record_group_collection = MongoDB().get_collection("record_group")
-        result = await record_group_collection.aggregate(
-            [
-                {"$match": {"_id": group_id, "records.id": record_id}},
-                {"$unwind": "$records"},
-                {"$match": {"records.id": record_id}},
-                {"$limit": 1},
-            ],
-        )
-        result = await result.to_list(length=1)
-        if result:
-            return RecordComment.model_validate(result[0]["records"]["comment"])
-        return None
+        record = await RecordManager.get_record(record_id, group_id)
+        if record is None:
+            return None
+        return record.comment
 
     @staticmethod
     async def update_comment(group_id: str, record_id: str, data: RecordComment) -> None:
@@ -43,8 +35,23 @@ class CommentManager:
         :param data: 评论内容
         """
         mongo = MongoDB()
-        record_group_collection = mongo.get_collection("record_group")
-        await record_group_collection.update_one(
+        comment = data.model_dump(by_alias=True)
+        record_collection = mongo.get_collection("record")
+        result = await record_collection.update_one(
+            {"_id": record_id, "groupId": group_id},
+            {"$set": {"comment": comment}},
+        )
+        if result.matched_count:
+            return
+        # 尚未迁移的问答对仍内嵌在问答组中
+        result = await mongo.get_collection("record_group").update_one(
             {"_id": group_id, "records.id": record_id},
-            {"$set": {"records.$.comment": data.model_dump(by_alias=True)}},
+            {"$set": {"records.$.comment": comment}},
+        )
+        if result.matched_count:
+            return
+        # 问答对可能恰好在两次更新之间被迁移
+        await record_collection.update_one(
+            {"_id": record_id, "groupId": group_id},
+            {"$set": {"comment": comment}},
         )
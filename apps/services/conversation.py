@@ -1,6 +1,8 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """对话 Manager"""
 
+import base64
+import json
 import logging
 import uuid
 from datetime import UTC, datetime
@@ -8,9 +10,11 @@ from typing import Any
 
 from apps.common.config import Config
 from apps.common.mongo import MongoDB
+from apps.common.security import Security
 from apps.schemas.collection import Conversation, KnowledgeBaseItem, LLMItem
 from apps.services.knowledge import KnowledgeBaseManager
 from apps.services.llm import LLMManager
+from apps.services.record import HistoryCache
 from apps.services.task import TaskManager
 from apps.templates.generate_llm_operator_config import llm_provider_dict
 
@@ -29,6 +33,75 @@ class ConversationManager:
             async for conv in conv_collection.find({"user_sub": user_sub, "debug": False}).sort({"created_at": 1})
         ]
 
+    @staticmethod
+    def _encode_cursor(conv: Conversation) -> str:
+        """将分页位置编码为游标"""
+        return base64.urlsafe_b64encode(json.dumps([conv.created_at, conv.id]).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[float, str]:
+        """解析游标；格式错误时抛出ValueError"""
+        try:
+            created_at, conv_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return float(created_at), str(conv_id)
+        except Exception as e:
+            err = f"无效的游标: {cursor}"
+            raise ValueError(err) from e
+
+    @staticmethod
+    async def list_conversation_with_doc_count(
+        user_sub: str, cursor: str | None = None, limit: int | None = None,
+    ) -> tuple[list[tuple[Conversation, int]], str | None]:
+        """
+        获取对话列表及每个对话的文件数量，按创建时间排序；一次聚合查询完成
+
+        :param user_sub: 用户ID
+        :param cursor: 上一页返回的游标；为None时从头开始
+        :param limit: 每页数量；为None时返回全部
+        :return: (对话, 文件数量) 列表，以及下一页的游标（没有下一页时为None）
+        """
+        match: dict[str, Any] = {"user_sub": user_sub, "debug": False}
+        if cursor:
+            created_at, conv_id = ConversationManager._decode_cursor(cursor)
+            match["$or"] = [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "_id": {"$gt": conv_id}},
+            ]
+
+        pipeline: list[dict[str, Any]] = [
+            {"$match": match},
+            {"$sort": {"created_at": 1, "_id": 1}},
+        ]
+        if limit is not None:
+            # 多取一条，用于判断是否还有下一页
+            pipeline.append({"$limit": limit + 1})
+        pipeline += [
+            # 列表中用不到的数组字段可能很长，不读取
+            {"$project": {"tasks": 0, "record_groups": 0, "unused_docs": 0, "summary": 0, "summary_key": 0}},
+            {"$lookup": {
+                "from": "document",
+                "let": {"conversation_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"user_sub": user_sub, "$expr": {"$eq": ["$conversation_id", "$$conversation_id"]}}},
+                    {"$count": "count"},
+                ],
+                "as": "doc_count",
+            }},
+            {"$set": {"doc_count": {"$ifNull": [{"$arrayElemAt": ["$doc_count.count", 0]}, 0]}}},
+        ]
+
+        conv_collection = MongoDB().get_collection("conversation")
+        result: list[tuple[Conversation, int]] = []
+        async for item in await conv_collection.aggregate(pipeline):
+            doc_count = item.pop("doc_count")
+            result.append((Conversation.model_validate(item), doc_count))
+
+        next_cursor = None
+        if limit is not None and len(result) > limit:
+            result = result[:limit]
+            next_cursor = ConversationManager._encode_cursor(result[-1][0])
+        return result, next_cursor
+
     @staticmethod
     async def get_conversation_by_conversation_id(user_sub: str, conversation_id: str) -> Conversation | None:
         """通过ConversationID查询对话信息"""
@@ -82,23 +155,20 @@ class ConversationManager:
             async with mongo.get_session() as session, await session.start_transaction():
                 conv_collection = mongo.get_collection("conversation")
                 await conv_collection.insert_one(conv.model_dump(by_alias=True), session=session)
-                user_collection = mongo.get_collection("user")
-                update_data: dict[str, dict[str, Any]] = {
-                    "$push": {"conversations": conversation_id},
-                }
-                if app_id:
-                    # 非调试模式下更新应用使用情况
-                    if not debug:
-                        update_data["$set"] = {
-                            f"app_usage.{app_id}.last_used": round(datetime.now(UTC).timestamp(), 3),
-                        }
-                        update_data["$inc"] = {f"app_usage.{app_id}.count": 1}
+                # 非调试模式下更新应用使用情况；对话通过conversation集合的user_sub索引查询，不再记录在用户文档中
+                if app_id and not debug:
+                    user_collection = mongo.get_collection("user")
                     await user_collection.update_one(
                         {"_id": user_sub},
-                        update_data,
+                        {
+                            "$set": {
+                                f"app_usage.{app_id}.last_used": round(datetime.now(UTC).timestamp(), 3),
+                            },
+                            "$inc": {f"app_usage.{app_id}.count": 1},
+                        },
                         session=session,
                     )
-                    await session.commit_transaction()
+                await session.commit_transaction()
                 return conv
         except Exception:
             logger.exception("[ConversationManager] 新建对话失败")
@@ -115,6 +185,44 @@ class ConversationManager:
         )
         return result.modified_count > 0
 
+    @staticmethod
+    async def get_summary(user_sub: str, conversation_id: str) -> tuple[str, int] | None:
+        """
+        获取解密后的对话摘要
+
+        :return: 对话摘要和版本号；对话不存在时返回None
+        """
+        conv_collection = MongoDB().get_collection("conversation")
+        result = await conv_collection.find_one(
+            {"_id": conversation_id, "user_sub": user_sub},
+            {"summary": 1, "summary_key": 1, "summary_version": 1},
+        )
+        if not result:
+            return None
+        summary = result.get("summary", "")
+        # 没有密钥的是旧版本未加密的摘要，下次更新时加密保存
+        if summary and result.get("summary_key"):
+            summary = Security.decrypt(summary, result["summary_key"])
+        return summary, result.get("summary_version", 0)
+
+    @staticmethod
+    async def save_summary(user_sub: str, conversation_id: str, summary: str, version: int) -> bool:
+        """
+        加密并保存对话摘要；仅当摘要仍为读取时的版本时写入
+
+        :param version: 读取摘要时的版本号
+        :return: 是否写入成功；摘要已被其他问答更新时返回False
+        """
+        encrypt_data, encrypt_config = Security.encrypt(summary)
+        conv_collection = MongoDB().get_collection("conversation")
+        # 旧对话没有版本号字段，视为版本0
+        version_filter = version if version else {"$in": [0, None]}
+        result = await conv_collection.update_one(
+            {"_id": conversation_id, "user_sub": user_sub, "summary_version": version_filter},
+            {"$set": {"summary": encrypt_data, "summary_key": encrypt_config, "summary_version": version + 1}},
+        )
+        return result.modified_count > 0
+
     @staticmethod
     async def delete_conversation_by_conversation_id(user_sub: str, conversation_id: str) -> None:
         """通过ConversationID删除对话"""
@@ -122,6 +230,7 @@ class ConversationManager:
         user_collection = mongo.get_collection("user")
         conv_collection = mongo.get_collection("conversation")
         record_group_collection = mongo.get_collection("record_group")
+        record_collection = mongo.get_collection("record")
 
         async with mongo.get_session() as session, await session.start_transaction():
             conversation_data = await conv_collection.find_one_and_delete(
@@ -130,10 +239,16 @@ class ConversationManager:
             if not conversation_data:
                 return
 
+            # 旧版本的用户文档中记录了对话ID列表
             await user_collection.update_one(
-                {"_id": user_sub}, {"$pull": {"conversations": conversation_id}}, session=session,
+                {"_id": user_sub, "conversations": conversation_id},
+                {"$pull": {"conversations": conversation_id}},
+                session=session,
             )
             await record_group_collection.delete_many({"conversation_id": conversation_id}, session=session)
+            await record_collection.delete_many({"conversationId": conversation_id}, session=session)
             await session.commit_transaction()
 
+        HistoryCache().invalidate(conversation_id)
+
         await TaskManager.delete_tasks_by_conversation_id(conversation_id)
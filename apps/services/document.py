@@ -1,6 +1,7 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """文件Manager"""
 
+import asyncio
 import base64
 import logging
 import uuid
@@ -8,8 +9,10 @@ import uuid
 import asyncer
 from fastapi import UploadFile
 
+from apps.common.byte_budget import ByteBudget
 from apps.common.minio import MinioClient
 from apps.common.mongo import MongoDB
+from apps.constants import DOCUMENT_MIME_SNIFF_SIZE, DOCUMENT_UPLOAD_BUDGET, DOCUMENT_UPLOAD_PART_SIZE
 from apps.schemas.collection import (
     Conversation,
     Document,
@@ -24,24 +27,27 @@ logger = logging.getLogger(__name__)
 class DocumentManager:
     """文件相关操作"""
 
+    _upload_budget = ByteBudget(DOCUMENT_UPLOAD_BUDGET)
+    """所有并发上传共享的内存预算"""
+
     @classmethod
     def _storage_single_doc_minio(cls, file_id: str, document: UploadFile) -> str:
-        """存储单个文件到MinIO"""
-        MinioClient.check_bucket("document")
+        """存储单个文件到MinIO；只读取文件头识别MIME，文件内容按分片上传"""
         file = document.file
         # 获取文件MIME
         import magic
-        mime = magic.from_buffer(file.read(), mime=True)
+        file.seek(0)
+        mime = magic.from_buffer(file.read(DOCUMENT_MIME_SNIFF_SIZE), mime=True)
         file.seek(0)
 
-        # 上传到MinIO
+        # 上传到MinIO；已知文件大小时，内存中最多保留一个分片
         MinioClient.upload_file(
             bucket_name="document",
             object_name=file_id,
             data=file,
             content_type=mime,
-            length=-1,
-            part_size=10 * 1024 * 1024,
+            length=document.size if document.size is not None else -1,
+            part_size=DOCUMENT_UPLOAD_PART_SIZE,
             metadata={
                 # type: ignore[arg-type]
                 "file_name": base64.b64encode(document.filename.encode("utf-8")).decode("ascii"),
@@ -49,45 +55,57 @@ class DocumentManager:
         )
         return mime
 
+    @classmethod
+    async def _upload_single_doc(cls, user_sub: str, conversation_id: str, document: UploadFile) -> Document | None:
+        """在内存预算内上传单个文件；失败时返回None"""
+        file_id = str(uuid.uuid4())
+        try:
+            async with cls._upload_budget.reserve(min(document.size or 0, DOCUMENT_UPLOAD_PART_SIZE)):
+                mime = await asyncer.asyncify(cls._storage_single_doc_minio)(file_id, document)
+        except Exception:
+            logger.exception("[DocumentManager] 上传文件失败")
+            return None
+
+        return Document(
+            _id=file_id,
+            user_sub=user_sub,
+            name=document.filename,
+            type=mime,
+            size=(document.size or 0) / 1024.0,
+            conversation_id=conversation_id,
+        )
+
     @classmethod
     async def storage_docs(cls, user_sub: str, conversation_id: str, documents: list[UploadFile]) -> list[Document]:
-        """存储多个文件"""
-        uploaded_files = []
+        """存储多个文件；多个文件并发上传，共享全局内存预算"""
+        documents = [document for document in documents if document.filename is not None and document.size is not None]
+        if not documents:
+            return []
+
+        try:
+            await asyncer.asyncify(MinioClient.check_bucket)("document")
+        except Exception:
+            logger.exception("[DocumentManager] 检查MinIO Bucket失败")
+            return []
+
+        results = await asyncio.gather(
+            *[cls._upload_single_doc(user_sub, conversation_id, document) for document in documents],
+        )
+        uploaded_files = [doc for doc in results if doc is not None]
+        if not uploaded_files:
+            return []
 
+        # 保存到MongoDB
         mongo = MongoDB()
         doc_collection = mongo.get_collection("document")
         conversation_collection = mongo.get_collection("conversation")
-        for document in documents:
-            if document.filename is None or document.size is None:
-                continue
-
-            file_id = str(uuid.uuid4())
-            try:
-                mime = await asyncer.asyncify(cls._storage_single_doc_minio)(file_id, document)
-            except Exception:
-                logger.exception("[DocumentManager] 上传文件失败")
-                continue
-
-            # 保存到MongoDB
-            doc_info = Document(
-                _id=file_id,
-                user_sub=user_sub,
-                name=document.filename,
-                type=mime,
-                size=document.size / 1024.0,
-                conversation_id=conversation_id,
-            )
-            await doc_collection.insert_one(doc_info.model_dump(by_alias=True))
-            await conversation_collection.update_one(
-                {"_id": conversation_id},
-                {
-                    "$push": {"unused_docs": file_id},
-                },
-            )
-
-            # 准备返回值
-            uploaded_files.append(doc_info)
-
+        await doc_collection.insert_many([doc.model_dump(by_alias=True) for doc in uploaded_files])
+        await conversation_collection.update_one(
+            {"_id": conversation_id},
+            {
+                "$push": {"unused_docs": {"$each": [doc.id for doc in uploaded_files]}},
+            },
+        )
         return uploaded_files
 
     @classmethod
@@ -143,7 +161,8 @@ class DocumentManager:
 
     @classmethod
     async def get_used_docs(
-            cls, user_sub: str, conversation_id: str, record_num: int | None = 10, type: str | None = None) -> list[Document]:
+        cls, user_sub: str, conversation_id: str, record_num: int | None = 10, type: str | None = None,
+    ) -> list[Document]:
         """获取最后n次问答所用到的文件"""
         mongo = MongoDB()
         docs_collection = mongo.get_collection("document")
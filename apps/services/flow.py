@@ -3,12 +3,9 @@
 
 import logging
 
-from pymongo import ASCENDING
-
 from apps.common.mongo import MongoDB
 from apps.scheduler.pool.loader.flow import FlowLoader
 from apps.scheduler.slot.slot import Slot
-from apps.schemas.collection import User
 from apps.schemas.enum_var import EdgeType, PermissionType
 from apps.schemas.flow import Edge, Flow, Step
 from apps.schemas.flow_topology import (
@@ -20,6 +17,7 @@ from apps.schemas.flow_topology import (
     PositionItem,
 )
 from apps.services.node import NodeManager
+from apps.services.node_catalog import NodeCatalog
 
 logger = logging.getLogger(__name__)
 
@@ -76,37 +74,11 @@ class FlowManager:
         :param service_id: 服务id
         :return: 节点元数据的列表
         """
-        node_pool_collection = MongoDB().get_collection("node")  # 获取节点集合
         try:
-            cursor = node_pool_collection.find({"service_id": service_id}).sort("created_at", ASCENDING)
-
-            nodes_meta_data_items = []
-            async for node_pool_record in cursor:
-                params_schema, output_schema = await NodeManager.get_node_params(node_pool_record["_id"])
-                try:
-                    # TODO: 由于现在没有动态表单，所以暂时使用Slot的create_empty_slot方法
-                    parameters = {
-                        "input_parameters": Slot(params_schema).create_empty_slot(),
-                        "output_parameters": Slot(output_schema).extract_type_desc_from_schema(),
-                    }
-                except Exception:
-                    logger.exception("[FlowManager] generate_from_schema 失败")
-                    continue
-                node_meta_data_item = NodeMetaDataItem(
-                    nodeId=node_pool_record["_id"],
-                    callId=node_pool_record["call_id"],
-                    name=node_pool_record["name"],
-                    description=node_pool_record["description"],
-                    editable=True,
-                    createdAt=node_pool_record["created_at"],
-                    parameters=parameters,  # 添加 parametersTemplate 参数
-                )
-                nodes_meta_data_items.append(node_meta_data_item)
+            return await NodeCatalog().get_nodes(service_id)
         except Exception:
             logger.exception("[FlowManager] 获取节点元数据失败")
             return None
-        else:
-            return nodes_meta_data_items
 
     @staticmethod
     async def get_service_by_user_id(user_sub: str) -> list[NodeServiceItem] | None:
@@ -116,60 +88,19 @@ class FlowManager:
         :user_sub: 用户的唯一标识符
         :return: service的列表
         """
-        service_collection = MongoDB().get_collection("service")
         user_collection = MongoDB().get_collection("user")
         try:
-            db_result = await user_collection.find_one({"_id": user_sub})
-            user = User.model_validate(db_result)
-            if user is None:
+            db_result = await user_collection.find_one({"_id": user_sub}, {"fav_services": 1})
+            if db_result is None:
                 logger.error("[FlowManager] 用户 %s 不存在或数据损坏", user_sub)
                 return None
             # 获取用户收藏的服务列表
-            fav_services = user.fav_services
+            fav_services = db_result.get("fav_services", [])
             logger.info("[FlowManager] 用户 %s 收藏的服务列表: %s", user_sub, fav_services)
-            match_conditions = [
-                {"author": user_sub},
-                {
-                    "$and": [
-                        {"permission.type": PermissionType.PUBLIC.value},
-                        {"_id": {"$in": fav_services}},
-                    ],
-                },
-                {
-                    "$and": [
-                        {"permission.type": PermissionType.PROTECTED.value},
-                        {"permission.users": {"$in": [user_sub]}},
-                        {"_id": {"$in": fav_services}},
-                    ],
-                },
-            ]
-            query = {"$or": match_conditions}
-            service_records_cursor = service_collection.find(
-                query,
-                sort=[("created_at", ASCENDING)],
-            )
-            service_records = await service_records_cursor.to_list(length=None)
-            service_items = [NodeServiceItem(serviceId="", name="系统", type="system", nodeMetaDatas=[])]
-            service_items += [
-                NodeServiceItem(
-                    serviceId=record["_id"],
-                    name=record["name"],
-                    type="default",
-                    nodeMetaDatas=[],
-                    createdAt=str(record["created_at"]),
-                )
-                for record in service_records
-            ]
-            for service_item in service_items:
-                node_meta_datas = await FlowManager.get_node_id_by_service_id(service_item.service_id)
-                if node_meta_datas is None:
-                    node_meta_datas = []
-                service_item.node_meta_datas = node_meta_datas
+            return await NodeCatalog().get_services(user_sub, fav_services)
         except Exception:
             logger.exception("[FlowManager] 获取用户服务失败")
             return None
-        else:
-            return service_items
 
     @staticmethod
     async def get_node_meta_data_by_node_meta_data_id(node_meta_data_id: str) -> NodeMetaDataItem | None:
@@ -256,15 +187,24 @@ class FlowManager:
                 connectivity=flow_config.connectivity,
                 debug=flow_config.debug,
             )
+            # 节点的输出参数优先从节点目录中批量获取
+            catalog_nodes = await NodeCatalog().get_nodes_by_id(
+                [node_config.node for node_config in flow_config.steps.values()],
+            )
             for node_id, node_config in flow_config.steps.items():
                 input_parameters = node_config.params
-                if node_config.node not in ("Empty"):
-                    _, output_parameters = await NodeManager.get_node_params(node_config.node)
+                catalog_node = catalog_nodes.get(node_config.node)
+                if catalog_node is not None and catalog_node.parameters is not None:
+                    output_type_desc = catalog_node.parameters["output_parameters"]
                 else:
-                    output_parameters = {}
+                    if node_config.node not in ("Empty"):
+                        _, output_parameters = await NodeManager.get_node_params(node_config.node)
+                    else:
+                        output_parameters = {}
+                    output_type_desc = Slot(output_parameters).extract_type_desc_from_schema()
                 parameters = {
                     "input_parameters": input_parameters,
-                    "output_parameters": Slot(output_parameters).extract_type_desc_from_schema(),
+                    "output_parameters": output_type_desc,
                 }
                 node_item = NodeItem(
                     stepId=node_id,
@@ -434,7 +374,11 @@ class FlowManager:
 
             app_collection = MongoDB().get_collection("app")
             key = f"flow/{flow_id}.yaml"
-            await app_collection.update_one({"_id": app_id}, {"$unset": {f"hashes.{key}": ""}})
+            # 文件名中含有“.”，需使用 $unsetField 删除，不能使用点号路径
+            await app_collection.update_one(
+                {"_id": app_id},
+                [{"$set": {"hashes": {"$unsetField": {"field": key, "input": {"$ifNull": ["$hashes", {}]}}}}}],
+            )
             await app_collection.update_one({"_id": app_id}, {"$pull": {"flows": {"id": flow_id}}})
 
             result = await FlowLoader().delete(app_id, flow_id)
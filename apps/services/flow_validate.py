@@ -4,155 +4,135 @@
 import collections
 import logging
 
-from apps.exceptions import FlowBranchValidationError, FlowEdgeValidationError, FlowNodeValidationError
+from apps.exceptions import FlowBranchValidationError, FlowValidationError
+from apps.scheduler.pool.pool import Pool
 from apps.schemas.enum_var import NodeType
 from apps.schemas.flow_topology import EdgeItem, FlowItem, NodeItem
 
 logger = logging.getLogger(__name__)
+# 不对应Call的特殊节点
+_SPECIAL_NODE_IDS = ("start", "end", "Empty")
+# 分支ID中不允许出现的字符
+_BRANCH_ILLEGAL_CHARS = "."
+# Call不存在时，在节点描述前添加的提示
+_UNAVAILABLE_NODE_NOTICE = "【对应的api工具被删除！节点不可用！请联系相关人员！】\n\n"
 
 
 class FlowService:
     """flow拓扑相关函数"""
 
     @staticmethod
-    def _validate_branch_id(
-        node_name: str, branch_id: str, node_branches: set, branch_illegal_chars: str = ".",
-    ) -> None:
-        """验证分支ID的合法性；当分支ID重复或包含非法字符时抛出异常"""
+    def _check_branch_id(
+        node_name: str, branch_id: str, node_branches: set, branch_illegal_chars: str = _BRANCH_ILLEGAL_CHARS,
+    ) -> list[str]:
+        """检查分支ID的合法性；返回分支ID重复或包含非法字符时的错误信息"""
+        errors = []
         if branch_id in node_branches:
-            err = f"[FlowService] 节点{node_name}的分支{branch_id}重复"
-            logger.error(err)
-            raise FlowBranchValidationError(err)
-
-        for illegal_char in branch_illegal_chars:
-            if illegal_char in branch_id:
-                err = f"[FlowService] 节点{node_name}的分支{branch_id}名称中含有非法字符"
-                logger.error(err)
-                raise FlowBranchValidationError(err)
+            errors.append(f"节点{node_name}的分支{branch_id}重复")
+        if any(illegal_char in branch_id for illegal_char in branch_illegal_chars):
+            errors.append(f"节点{node_name}的分支{branch_id}名称中含有非法字符")
+        return errors
 
     @staticmethod
     async def remove_excess_structure_from_flow(flow_item: FlowItem) -> FlowItem:
-        """移除流程图中的多余结构"""
-        node_branch_map = {}
-        branch_illegal_chars = "."
+        """
+        移除流程图中的多余结构
+
+        所有节点引用的Call一次性查询；Call不存在的节点被标记为不可用。
+        分支ID不合法时，一次性抛出所有错误。
+        """
+        call_ids = {node.call_id for node in flow_item.nodes if node.node_id not in _SPECIAL_NODE_IDS}
+        calls = await Pool().get_calls(call_ids)
+
+        errors = []
+        node_branch_map: dict[str, set[str]] = {}
         for node in flow_item.nodes:
-            from apps.scheduler.pool.pool import Pool
-            from pydantic import BaseModel
-            if node.node_id != 'start' and node.node_id != 'end' and node.node_id != 'Empty':
-                try:
-                    call_class: type[BaseModel] = await Pool().get_call(node.call_id)
-                    if not call_class:
-                        node.node_id = 'Empty'
-                        node.description = '【对应的api工具被删除！节点不可用！请联系相关人员！】\n\n'+node.description
-                except Exception as e:
-                    node.node_id = 'Empty'
-                    node.description = '【对应的api工具被删除！节点不可用！请联系相关人员！】\n\n'+node.description
-                    logger.error(f"[FlowService] 获取步骤的call_id失败{node.call_id}由于：{e}")
-            node_branch_map[node.step_id] = set()
+            if node.node_id not in _SPECIAL_NODE_IDS and node.call_id not in calls:
+                logger.error("[FlowService] 步骤%s的Call %s 不存在", node.step_id, node.call_id)
+                node.node_id = "Empty"
+                node.description = _UNAVAILABLE_NODE_NOTICE + node.description
+            branches = node_branch_map[node.step_id] = set()
             if node.call_id == NodeType.CHOICE.value:
                 node.parameters = node.parameters["input_parameters"]
                 if "choices" not in node.parameters:
                     node.parameters["choices"] = []
                 for choice in node.parameters["choices"]:
-                    if choice["branchId"] in node_branch_map[node.step_id]:
-                        err = f"[FlowService] 节点{node.name}的分支{choice['branchId']}重复"
-                        logger.error(err)
-                        raise Exception(err)
-                    for illegal_char in branch_illegal_chars:
-                        if illegal_char in choice["branchId"]:
-                            err = f"[FlowService] 节点{node.name}的分支{choice['branchId']}名称中含有非法字符"
-                            logger.error(err)
-                            raise Exception(err)
-                    node_branch_map[node.step_id].add(choice["branchId"])
+                    errors += FlowService._check_branch_id(node.name, choice["branchId"], branches)
+                    branches.add(choice["branchId"])
             else:
-                node_branch_map[node.step_id].add("")
-        valid_edges = []
-        for edge in flow_item.edges:
-            if edge.source_node not in node_branch_map:
-                continue
-            if edge.target_node not in node_branch_map:
-                continue
-            if edge.branch_id not in node_branch_map[edge.source_node]:
-                continue
-            valid_edges.append(edge)
-        flow_item.edges = valid_edges
+                branches.add("")
+        if errors:
+            logger.error("[FlowService] 流程分支不合法：%s", errors)
+            raise FlowBranchValidationError(errors)
+
+        flow_item.edges = [
+            edge for edge in flow_item.edges
+            if edge.source_node in node_branch_map
+            and edge.target_node in node_branch_map
+            and edge.branch_id in node_branch_map[edge.source_node]
+        ]
         return flow_item
 
     @staticmethod
-    async def _validate_node_ids(nodes: list[NodeItem]) -> tuple[str, str]:
-        """验证节点ID的唯一性并获取起始和终止节点ID，当节点ID重复或起始/终止节点数量不为1时抛出异常"""
+    def _validate_node_ids(nodes: list[NodeItem], errors: list[str]) -> tuple[str | None, str | None]:
+        """检查节点ID的唯一性并获取起始和终止节点ID；节点ID重复或起始/终止节点数量不为1时记录错误"""
         ids = set()
-        start_cnt = 0
-        end_cnt = 0
-        start_id = None
-        end_id = None
+        start_ids = []
+        end_ids = []
 
         for node in nodes:
             if node.step_id in ids:
-                err = f"[FlowService] 节点{node.name}的id重复"
-                logger.error(err)
-                raise FlowNodeValidationError(err)
+                errors.append(f"节点{node.name}的id重复")
             ids.add(node.step_id)
             if node.call_id == NodeType.START.value:
-                start_cnt += 1
-                start_id = node.step_id
+                start_ids.append(node.step_id)
             if node.call_id == NodeType.END.value:
-                end_cnt += 1
-                end_id = node.step_id
+                end_ids.append(node.step_id)
 
-        if start_cnt != 1 or end_cnt != 1:
-            err = "[FlowService] 起始节点和终止节点数量不为1"
-            logger.error(err)
-            raise FlowNodeValidationError(err)
-
-        if start_id is None or end_id is None:
-            err = "[FlowService] 起始节点或终止节点ID为空"
-            logger.error(err)
-            raise FlowNodeValidationError(err)
-
-        return start_id, end_id
+        if len(start_ids) != 1 or len(end_ids) != 1:
+            errors.append("起始节点和终止节点数量不为1")
+            return None, None
+        return start_ids[0], end_ids[0]
 
     @staticmethod
     async def validate_flow_illegal(flow_item: FlowItem) -> tuple[str, str]:
-        """验证流程图是否合法；当流程图不合法时抛出异常"""
+        """验证流程图是否合法；不合法时一次性抛出所有错误"""
+        errors: list[str] = []
         # 验证节点ID并获取起始和终止节点
-        start_id, end_id = await FlowService._validate_node_ids(flow_item.nodes)
+        start_id, end_id = FlowService._validate_node_ids(flow_item.nodes, errors)
 
         # 验证边的合法性并获取节点的入度和出度
-        in_deg, out_deg = await FlowService._validate_edges(flow_item.edges)
+        in_deg, out_deg = FlowService._validate_edges(flow_item.edges, errors)
 
         # 验证起始和终止节点的入度和出度
-        await FlowService._validate_node_degrees(start_id, end_id, in_deg, out_deg)
+        if start_id is not None and end_id is not None:
+            FlowService._validate_node_degrees(start_id, end_id, in_deg, out_deg, errors)
 
+        if errors or start_id is None or end_id is None:
+            logger.error("[FlowService] 流程图不合法：%s", errors)
+            raise FlowValidationError(errors)
         return start_id, end_id
 
     @staticmethod
-    async def _validate_edges(edges: list[EdgeItem]) -> tuple[dict[str, int], dict[str, int]]:
-        """验证边的合法性并计算节点的入度和出度；当边的ID重复、起始终止节点相同或分支重复时抛出异常"""
+    def _validate_edges(edges: list[EdgeItem], errors: list[str]) -> tuple[dict[str, int], dict[str, int]]:
+        """检查边的合法性并计算节点的入度和出度；边的ID重复、起始终止节点相同或分支重复时记录错误"""
         ids = set()
-        branches = {}
-        in_deg = {}
-        out_deg = {}
+        branches: dict[str, set[str]] = {}
+        in_deg: dict[str, int] = {}
+        out_deg: dict[str, int] = {}
 
         for e in edges:
             if e.edge_id in ids:
-                err = f"[FlowService] 边{e.edge_id}的id重复"
-                logger.error(err)
-                raise FlowEdgeValidationError(err)
+                errors.append(f"边{e.edge_id}的id重复")
             ids.add(e.edge_id)
 
             if e.source_node == e.target_node:
-                err = f"[FlowService] 边{e.edge_id}的起始节点和终止节点相同"
-                logger.error(err)
-                raise FlowEdgeValidationError(err)
-
-            if e.source_node not in branches:
-                branches[e.source_node] = set()
-            if e.branch_id in branches[e.source_node]:
-                err = f"[FlowService] 边{e.edge_id}的分支{e.branch_id}重复"
-                logger.error(err)
-                raise FlowEdgeValidationError(err)
-            branches[e.source_node].add(e.branch_id)
+                errors.append(f"边{e.edge_id}的起始节点和终止节点相同")
+
+            source_branches = branches.setdefault(e.source_node, set())
+            if e.branch_id in source_branches:
+                errors.append(f"边{e.edge_id}的分支{e.branch_id}重复")
+            source_branches.add(e.branch_id)
 
             in_deg[e.target_node] = in_deg.get(e.target_node, 0) + 1
             out_deg[e.source_node] = out_deg.get(e.source_node, 0) + 1
@@ -160,18 +140,14 @@ class FlowService:
         return in_deg, out_deg
 
     @staticmethod
-    async def _validate_node_degrees(
-        start_id: str, end_id: str, in_deg: dict[str, int], out_deg: dict[str, int],
+    def _validate_node_degrees(
+        start_id: str, end_id: str, in_deg: dict[str, int], out_deg: dict[str, int], errors: list[str],
     ) -> None:
-        """验证起始和终止节点的入度和出度；当起始节点入度不为0或终止节点出度不为0时抛出异常"""
-        if start_id in in_deg and in_deg[start_id] != 0:
-            err = f"[FlowService] 起始节点{start_id}的入度不为0"
-            logger.error(err)
-            raise FlowNodeValidationError(err)
-        if end_id in out_deg and out_deg[end_id] != 0:
-            err = f"[FlowService] 终止节点{end_id}的出度不为0"
-            logger.error(err)
-            raise FlowNodeValidationError(err)
+        """检查起始和终止节点的入度和出度；起始节点入度不为0或终止节点出度不为0时记录错误"""
+        if in_deg.get(start_id, 0) != 0:
+            errors.append(f"起始节点{start_id}的入度不为0")
+        if out_deg.get(end_id, 0) != 0:
+            errors.append(f"终止节点{end_id}的出度不为0")
 
     @staticmethod
     def _find_start_node_id(nodes: list[NodeItem]) -> str:
@@ -229,29 +205,13 @@ class FlowService:
             if node.call_id == NodeType.END.value:
                 end_id = node.step_id
 
-        # 构建邻接表
-        adj = {}
-        for edge in flow_item.edges:
-            if edge.source_node not in adj:
-                adj[edge.source_node] = []
-            adj[edge.source_node].append(edge.target_node)
-
-        # BFS遍历检查连通性
-        vis = {start_id}
-        q = [start_id]  # 使用list替代queue.Queue
-
-        while q:  # 使用while q替代while not q.empty()
-            cur = q.pop(0)  # 使用pop(0)替代q.get()
-            # 检查非终止节点是否有出边
-            if cur != end_id and cur not in adj:
-                return False
-
-            # 遍历所有出边
-            if cur in adj:
-                for nxt in adj[cur]:
-                    if nxt not in vis:
-                        vis.add(nxt)
-                        q.append(nxt)  # 使用append替代q.put()
+        # 构建邻接表，BFS遍历检查连通性
+        adj = FlowService._build_adjacency_list(flow_item.edges)
+        visited = FlowService._bfs_traverse(start_id or "", adj)
+
+        # 检查非终止节点是否有出边
+        if any(node_id != end_id and node_id not in adj for node_id in visited):
+            return False
 
         # 检查是否能到达终止节点
-        return end_id in vis
+        return end_id in visited
@@ -13,6 +13,7 @@ from apps.schemas.rag_data import (
     RAGFileParseReqItem,
     RAGFileStatusRspItem,
 )
+from apps.services.rag import RAGRetriever
 
 logger = logging.getLogger(__name__)
 rag_host = Config().get_config().rag.rag_service
@@ -43,7 +44,11 @@ class KnowledgeBaseService:
             document_list=rag_docs).model_dump(exclude_none=True, by_alias=True)
 
         async with httpx.AsyncClient() as client:
-            resp = await client.post(_RAG_DOC_PARSE_URI, headers=headers, json=post_data, timeout=30.0)
+            try:
+                resp = await client.post(_RAG_DOC_PARSE_URI, headers=headers, json=post_data, timeout=30.0)
+            finally:
+                # RAG处理请求后再使缓存失效，避免请求期间的检索重新缓存旧结果
+                await RAGRetriever().invalidate()
             resp_data = resp.json()
             if resp.status_code != status.HTTP_200_OK:
                 return []
@@ -58,7 +63,10 @@ class KnowledgeBaseService:
         }
         delete_data = {"ids": doc_ids}
         async with httpx.AsyncClient() as client:
-            resp = await client.post(_RAG_DOC_DELETE_URI, headers=headers, json=delete_data, timeout=30.0)
+            try:
+                resp = await client.post(_RAG_DOC_DELETE_URI, headers=headers, json=delete_data, timeout=30.0)
+            finally:
+                await RAGRetriever().invalidate()
             resp_data = resp.json()
             if resp.status_code != status.HTTP_200_OK:
                 return []
@@ -1,6 +1,7 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2024-2025. All rights reserved.
 """MCP服务管理器"""
 
+import asyncio
 import logging
 import random
 import re
@@ -89,18 +90,19 @@ class MCPServiceManager:
         :return: MCP服务列表
         """
         filters = MCPServiceManager._build_filters(search_type, keyword)
-        mcpservice_pools = await MCPServiceManager._search_mcpservice(filters, page)
+        mcpservice_pools = await MCPServiceManager._search_mcpservice(filters, page, user_sub)
+        icons = await asyncio.gather(*[MCPLoader.get_icon(item.id) for item, _ in mcpservice_pools])
         return [
             MCPServiceCardItem(
                 mcpserviceId=item.id,
-                icon=await MCPLoader.get_icon(item.id),
+                icon=icon,
                 name=item.name,
                 description=item.description,
                 author=item.author,
-                isActive=await MCPServiceManager.is_active(user_sub, item.id),
-                status=await MCPServiceManager.get_service_status(item.id),
+                isActive=is_active,
+                status=item.status,
             )
-            for item in mcpservice_pools
+            for (item, is_active), icon in zip(mcpservice_pools, icons, strict=True)
         ]
 
     @staticmethod
@@ -155,26 +157,47 @@ class MCPServiceManager:
     async def _search_mcpservice(
             search_conditions: dict[str, Any],
             page: int,
-    ) -> list[MCPCollection]:
+            user_sub: str,
+    ) -> list[tuple[MCPCollection, bool]]:
         """
-        基于输入条件搜索MCP服务
+        基于输入条件搜索MCP服务；一次查询同时得到用户的激活状态
 
         :param search_conditions: dict[str, Any]: 搜索条件
         :param page: int: 页码
-        :return: MCP列表
+        :param user_sub: str: 用户ID
+        :return: MCP列表，以及用户是否激活了该MCP
         """
         mcpservice_collection = MongoDB().get_collection("mcp")
-        # 分页查询
+        # 分页查询；不返回激活用户列表和工具列表，只计算当前用户是否激活
         skip = (page - 1) * SERVICE_PAGE_SIZE
-        db_mcpservices = await mcpservice_collection.find(search_conditions).skip(skip).limit(
-            SERVICE_PAGE_SIZE,
-        ).to_list()
+        cursor = await mcpservice_collection.aggregate([
+            {"$match": search_conditions},
+            {"$skip": skip},
+            {"$limit": SERVICE_PAGE_SIZE},
+            {"$project": {
+                "name": 1,
+                "description": 1,
+                "type": 1,
+                "author": 1,
+                "status": 1,
+                "is_active": {"$in": [user_sub, {"$ifNull": ["$activated", []]}]},
+            }},
+        ])
+        db_mcpservices = await cursor.to_list(None)
         # 如果未找到，返回空列表
         if not db_mcpservices:
             logger.warning("[MCPServiceManager] 没有找到符合条件的MCP服务: %s", search_conditions)
             return []
-        # 将数据库中的MCP服务转换为对象
-        return [MCPCollection.model_validate(db_mcpservice) for db_mcpservice in db_mcpservices]
+        # 将数据库中的MCP服务转换为对象；状态的取值与 get_service_status 一致
+        result = []
+        for db_mcpservice in db_mcpservices:
+            is_active = db_mcpservice.pop("is_active", False)
+            status = db_mcpservice.pop("status", None)
+            if status not in (MCPInstallStatus.READY.value, MCPInstallStatus.INSTALLING.value):
+                status = MCPInstallStatus.FAILED.value
+            item = MCPCollection.model_validate({**db_mcpservice, "status": status})
+            result.append((item, is_active))
+        return result
 
     @staticmethod
     def _build_filters(
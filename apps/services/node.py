@@ -30,6 +30,16 @@ class NodeManager:
         return node["call_id"]
 
 
+    @staticmethod
+    async def get_node_brief(node_ids: list[str]) -> dict[str, tuple[str, str]]:
+        """批量获取Node的call_id和名称，只查询一次数据库；不存在的Node不包含在结果中"""
+        node_collection = MongoDB().get_collection("node")
+        return {
+            node["_id"]: (node["call_id"], node.get("name", ""))
+            async for node in node_collection.find({"_id": {"$in": node_ids}}, {"call_id": 1, "name": 1})
+        }
+
+
     @staticmethod
     async def get_node(node_id: str) -> NodePool:
         """获取Node的类型"""
@@ -79,8 +89,6 @@ class NodeManager:
     @staticmethod
     async def get_node_params(node_id: str) -> tuple[dict[str, Any], dict[str, Any]]:
         """获取Node数据"""
-        from apps.scheduler.pool.pool import Pool
-
         # 查找Node信息
         logger.info("[NodeManager] 获取节点 %s", node_id)
         node_collection = MongoDB().get_collection("node")
@@ -90,7 +98,14 @@ class NodeManager:
             logger.error(err)
             raise ValueError(err)
 
-        node_data = NodePool.model_validate(node)
+        return await NodeManager.get_pool_params(NodePool.model_validate(node))
+
+
+    @staticmethod
+    async def get_pool_params(node_data: NodePool) -> tuple[dict[str, Any], dict[str, Any]]:
+        """根据已查询到的Node数据获取参数Schema"""
+        from apps.scheduler.pool.pool import Pool
+
         call_id = node_data.call_id
 
         # 查找Call信息
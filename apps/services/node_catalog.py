@@ -0,0 +1,196 @@
+# Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
+工作流编辑器的节点目录
+
+所有服务及其节点的编辑器数据（含Slot处理后的参数模板）只在服务或Call变化时构建一次，保存在内存中；
+打开编辑器时按用户权限从内存中筛选。目录的版本号保存在MongoDB中，由Service和Call的加载器递增，
+因此多个进程之间也能及时发现变化。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from pydantic import ValidationError
+from pymongo import ASCENDING
+
+from apps.common.mongo import MongoDB
+from apps.common.singleton import SingletonMeta
+from apps.scheduler.slot.slot import Slot
+from apps.schemas.enum_var import PermissionType
+from apps.schemas.flow import Permission
+from apps.schemas.flow_topology import NodeMetaDataItem, NodeServiceItem
+from apps.schemas.pool import NodePool
+from apps.services.node import NodeManager
+
+logger = logging.getLogger(__name__)
+# 保存版本号的文档ID
+_VERSION_ID = "node_catalog"
+
+
+@dataclass
+class _ServiceEntry:
+    """服务的展示信息与权限"""
+
+    id: str
+    name: str
+    author: str
+    created_at: float | None
+    permission: Permission | None
+
+
+@dataclass
+class _CatalogData:
+    """某一版本的节点目录"""
+
+    version: int
+    services: list[_ServiceEntry] = field(default_factory=list)
+    nodes: dict[str, list[NodeMetaDataItem]] = field(default_factory=dict)
+    by_id: dict[str, NodeMetaDataItem] = field(default_factory=dict)
+
+
+class NodeCatalog(metaclass=SingletonMeta):
+    """节点目录"""
+
+    def __init__(self) -> None:
+        """初始化"""
+        self._data: _CatalogData | None = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    async def bump() -> None:
+        """Service或Call发生变化后调用，使所有进程中的节点目录失效"""
+        await MongoDB().get_collection("catalog_version").update_one(
+            {"_id": _VERSION_ID}, {"$inc": {"version": 1}}, upsert=True,
+        )
+        NodeCatalog().invalidate()
+
+    def invalidate(self) -> None:
+        """丢弃当前进程中的节点目录，下次读取时重新构建"""
+        self._data = None
+
+    @staticmethod
+    async def _get_version() -> int:
+        """读取当前版本号"""
+        doc = await MongoDB().get_collection("catalog_version").find_one({"_id": _VERSION_ID})
+        return doc["version"] if doc else 0
+
+    @staticmethod
+    async def _build_node(node: NodePool) -> NodeMetaDataItem | None:
+        """生成单个节点的编辑器数据"""
+        try:
+            params_schema, output_schema = await NodeManager.get_pool_params(node)
+            # TODO: 由于现在没有动态表单，所以暂时使用Slot的create_empty_slot方法
+            parameters = {
+                "input_parameters": Slot(params_schema).create_empty_slot(),
+                "output_parameters": Slot(output_schema).extract_type_desc_from_schema(),
+            }
+        except Exception:
+            logger.exception("[NodeCatalog] 生成节点 %s 的参数模板失败", node.id)
+            return None
+        return NodeMetaDataItem(
+            nodeId=node.id,
+            callId=node.call_id,
+            name=node.name,
+            description=node.description,
+            editable=True,
+            createdAt=node.created_at,
+            parameters=parameters,
+        )
+
+    async def _build(self, version: int) -> _CatalogData:
+        """从数据库构建节点目录"""
+        mongo = MongoDB()
+        data = _CatalogData(version=version)
+        async for record in mongo.get_collection("service").find({}).sort("created_at", ASCENDING):
+            try:
+                permission = Permission.model_validate(record["permission"]) if "permission" in record else None
+                data.services.append(_ServiceEntry(
+                    id=record["_id"],
+                    name=record["name"],
+                    author=record.get("author", ""),
+                    created_at=record.get("created_at"),
+                    permission=permission,
+                ))
+            except (KeyError, ValidationError):
+                logger.exception("[NodeCatalog] 服务 %s 数据损坏", record.get("_id"))
+        async for record in mongo.get_collection("node").find({}).sort("created_at", ASCENDING):
+            try:
+                node = NodePool.model_validate(record)
+            except ValidationError:
+                logger.exception("[NodeCatalog] 节点 %s 数据损坏", record.get("_id"))
+                continue
+            item = await self._build_node(node)
+            if item is not None:
+                data.nodes.setdefault(node.service_id or "", []).append(item)
+                data.by_id[node.id] = item
+        logger.info(
+            "[NodeCatalog] 已构建节点目录，版本 %d，服务 %d 个，节点 %d 个",
+            version, len(data.services), sum(len(items) for items in data.nodes.values()),
+        )
+        return data
+
+    async def _get(self) -> _CatalogData:
+        """获取最新的节点目录；版本变化时重新构建，同一时间只有一个协程构建"""
+        version = await self._get_version()
+        data = self._data
+        if data is not None and data.version == version:
+            return data
+        async with self._lock:
+            data = self._data
+            if data is None or data.version != version:
+                data = await self._build(version)
+                self._data = data
+        return data
+
+    async def get_nodes(self, service_id: str) -> list[NodeMetaDataItem]:
+        """
+        获取服务下所有节点的编辑器数据
+
+        :param service_id: 服务ID；系统Call对应的服务ID为空字符串
+        :return: 节点元数据的列表
+        """
+        data = await self._get()
+        return list(data.nodes.get(service_id, []))
+
+    async def get_nodes_by_id(self, node_ids: list[str]) -> dict[str, NodeMetaDataItem]:
+        """
+        按节点ID批量获取节点的编辑器数据
+
+        :param node_ids: 节点ID列表
+        :return: 节点ID -> 节点元数据；目录中不存在的节点不包含在结果中
+        """
+        data = await self._get()
+        return {node_id: data.by_id[node_id] for node_id in node_ids if node_id in data.by_id}
+
+    async def get_services(self, user_sub: str, fav_services: list[str]) -> list[NodeServiceItem]:
+        """
+        获取用户可在编辑器中使用的服务：用户自己上传的、公开且收藏的、受保护且有权限访问并收藏的服务
+
+        :param user_sub: 用户的唯一标识符
+        :param fav_services: 用户收藏的服务ID列表
+        :return: 服务的列表，第一项为系统服务
+        """
+        data = await self._get()
+        favorites = set(fav_services)
+        service_items = [
+            NodeServiceItem(serviceId="", name="系统", type="system", nodeMetaDatas=list(data.nodes.get("", []))),
+        ]
+        for service in data.services:
+            permission = service.permission
+            visible = service.author == user_sub or (
+                service.id in favorites and permission is not None and (
+                    permission.type == PermissionType.PUBLIC
+                    or (permission.type == PermissionType.PROTECTED and user_sub in permission.users)
+                )
+            )
+            if not visible:
+                continue
+            service_items.append(NodeServiceItem(
+                serviceId=service.id,
+                name=service.name,
+                type="default",
+                nodeMetaDatas=list(data.nodes.get(service.id, [])),
+                createdAt=str(service.created_at),
+            ))
+        return service_items
@@ -1,26 +1,200 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """对接Euler Intelligence RAG"""
 
+import asyncio
 import json
 import logging
+import time
+from collections import OrderedDict
 from collections.abc import AsyncGenerator
+from hashlib import sha256
+from typing import Any
 
 import httpx
-from typing import Any
-from fastapi import status
 
 from apps.common.config import Config
+from apps.common.mongo import MongoDB
+from apps.common.singleton import SingletonMeta
+from apps.constants import RAG_CACHE_MAX_SIZE, RAG_CACHE_TTL, RAG_SEARCH_DEADLINE
 from apps.llm.patterns.rewrite import QuestionRewrite
 from apps.llm.reasoning import ReasoningLLM
-from apps.llm.token import TokenCalculator
+from apps.llm.token import TokenCalculator, TokenMeter
 from apps.schemas.collection import LLM
 from apps.schemas.config import LLMConfig
 from apps.schemas.enum_var import EventType
-from apps.schemas.rag_data import RAGQueryReq
+from apps.schemas.rag_data import RAGEventData, RAGQueryReq
 from apps.services.activity import Activity
 from apps.services.session import SessionManager
 
 logger = logging.getLogger(__name__)
+# 保存检索缓存版本号的文档ID
+_CACHE_VERSION_ID = "rag_retriever"
+
+
+class RAGRetriever(metaclass=SingletonMeta):
+    """
+    知识库分片检索；所有检索请求共用同一个HTTP连接池
+
+    检索结果按“会话 + 规范化的问题 + 知识库 + 检索参数”缓存，在重新生成回答、重复提问时直接返回。
+    缓存的版本号保存在MongoDB中，知识库中的文档发生变化时递增，因此所有进程中的缓存都会失效。
+    指定了文档的检索不缓存：文档由RAG异步解析，检索时可能尚未解析完成。
+    """
+
+    def __init__(self) -> None:
+        """初始化"""
+        self._client: httpx.AsyncClient | None = None
+        self._cache: OrderedDict[str, tuple[float, int, list[dict[str, Any]]]] = OrderedDict()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取共享的HTTP客户端；在首次使用时于当前事件循环中创建"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=30)
+        return self._client
+
+    @staticmethod
+    def _cache_key(session_id: str, data: dict[str, Any]) -> str:
+        """生成缓存Key；问题忽略大小写和多余空白，知识库ID忽略顺序"""
+        normalized = {
+            **data,
+            "query": " ".join(str(data.get("query", "")).split()).casefold(),
+            "kbIds": sorted(data.get("kbIds") or []),
+            "session_id": session_id,
+        }
+        raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+        return sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def _get_version() -> int:
+        """读取当前缓存版本号"""
+        doc = await MongoDB().get_collection("rag_cache_version").find_one({"_id": _CACHE_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    def _cache_get(self, key: str, version: int) -> list[dict[str, Any]] | None:
+        """读取缓存；过期或版本号不一致的缓存视为不存在"""
+        item = self._cache.get(key)
+        if item is None:
+            return None
+        expire_at, item_version, value = item
+        if expire_at < time.monotonic() or item_version != version:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _cache_set(self, key: str, version: int, value: list[dict[str, Any]], ttl: float) -> None:
+        """写入缓存"""
+        self._cache[key] = (time.monotonic() + ttl, version, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > RAG_CACHE_MAX_SIZE:
+            self._cache.popitem(last=False)
+
+    async def invalidate(self) -> None:
+        """知识库中的文档发生变化后调用，使所有进程中的检索缓存失效"""
+        await MongoDB().get_collection("rag_cache_version").update_one(
+            {"_id": _CACHE_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True,
+        )
+        self._cache.clear()
+
+    async def search(
+        self,
+        session_id: str,
+        data: dict[str, Any],
+        request_timeout: float = 30,
+        cache_ttl: float = RAG_CACHE_TTL,
+    ) -> list[dict[str, Any]]:
+        """
+        调用RAG服务检索分片
+
+        :param session_id: 用户的会话ID
+        :param data: 检索请求体
+        :param request_timeout: 请求超时时间（秒）
+        :param cache_ttl: 结果缓存有效期（秒）；为0时不使用缓存
+        :return: 按文档组织的分片列表；可能为缓存内容，调用方不应修改
+        :raises httpx.HTTPStatusError: RAG服务返回错误
+        """
+        # 指定文档时，文档可能仍在解析中，部分结果不能缓存
+        use_cache = bool(cache_ttl) and not data.get("docIds")
+        key = self._cache_key(session_id, data)
+        version = 0
+        if use_cache:
+            # 检索前读取版本号：检索期间发生的失效会使写入的缓存在下次读取时作废
+            version = await self._get_version()
+            cached = self._cache_get(key, version)
+            if cached is not None:
+                logger.info("[RAGRetriever] 命中检索缓存 %s", key)
+                return cached
+
+        url = Config().get_config().rag.rag_service.rstrip("/") + "/chunk/search"
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {session_id}",
+        }
+        response = await self._get_client().post(url, headers=headers, json=data, timeout=request_timeout)
+        response.raise_for_status()
+        result = response.json()["result"]["docChunks"]
+        # 文档可能尚未解析完成，空结果不缓存
+        if use_cache and result:
+            self._cache_set(key, version, result, cache_ttl)
+        return result
+
+    async def search_many(
+        self,
+        session_id: str,
+        requests: list[dict[str, Any]],
+        deadline: float = RAG_SEARCH_DEADLINE,
+    ) -> list[dict[str, Any]]:
+        """
+        并发执行多个检索请求，合并并去重结果
+
+        超过截止时间仍未返回的请求将被取消，只使用已返回的结果；单个请求失败不影响其他请求
+
+        :param session_id: 用户的会话ID
+        :param requests: 检索请求体列表
+        :param deadline: 截止时间（秒）
+        :return: 合并后的分片列表
+        """
+        if not requests:
+            return []
+        tasks = [asyncio.create_task(self.search(session_id, data)) for data in requests]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("[RAGRetriever] %d 个检索请求超时，使用部分结果", len(pending))
+
+        results = []
+        for task in tasks:
+            if task not in done:
+                continue
+            if task.exception() is not None:
+                logger.error("[RAGRetriever] 获取文档分片失败: %s", task.exception())
+                continue
+            results.append(task.result())
+        return self.merge(results)
+
+    @staticmethod
+    def merge(results: list[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+        """
+        合并多次检索的结果：同一文档的分片归并到一起，重复的分片只保留一次
+
+        :param results: 多次检索的结果，靠前的结果优先
+        :return: 合并后的分片列表
+        """
+        docs: dict[str, dict[str, Any]] = {}
+        seen: dict[str, set[str]] = {}
+        for doc_chunk_list in results:
+            for doc_chunk in doc_chunk_list:
+                doc_id = doc_chunk["docId"]
+                if doc_id not in docs:
+                    docs[doc_id] = {**doc_chunk, "chunks": []}
+                    seen[doc_id] = set()
+                for chunk in doc_chunk.get("chunks", []):
+                    key = chunk.get("chunkId") or chunk.get("id") or chunk["text"]
+                    if key in seen[doc_id]:
+                        continue
+                    seen[doc_id].add(key)
+                    docs[doc_id]["chunks"].append(chunk)
+        return list(docs.values())
 
 
 class RAG:
@@ -28,6 +202,10 @@ class RAG:
 
     system_prompt: str = "You are a helpful assistant."
     """系统提示词"""
+    summary_prompt: str = (
+        "\n\n以下是此前对话的摘要，在<summary>中给出：\n<summary>\n{summary}\n</summary>"
+    )
+    """对话摘要提示词；有摘要时附加在系统提示词之后"""
     user_prompt = """'
     <instructions>
             你是openEuler社区的智能助手。请结合给出的背景信息, 回答用户的提问，并且基于给出的背景信息在相关句子后进行脚注。
@@ -81,14 +259,9 @@ class RAG:
     async def get_doc_info_from_rag(user_sub: str, max_tokens: int,
                                     doc_ids: list[str],
                                     data: RAGQueryReq) -> list[dict[str, Any]]:
-        """获取RAG服务的文档信息"""
+        """获取RAG服务的文档信息；文档检索与知识库检索并发进行"""
         session_id = await SessionManager.get_session_by_user_sub(user_sub)
-        url = Config().get_config().rag.rag_service.rstrip("/") + "/chunk/search"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {session_id}",
-        }
-        doc_chunk_list = []
+        requests = []
         if doc_ids:
             default_kb_id = "00000000-0000-0000-0000-000000000000"
             tmp_data = RAGQueryReq(
@@ -102,53 +275,21 @@ class RAG:
                 isRerank=data.is_rerank,
                 tokensLimit=max_tokens,
             )
-            try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    data_json = tmp_data.model_dump(exclude_none=True, by_alias=True)
-                    response = await client.post(url, headers=headers, json=data_json)
-                    if response.status_code == status.HTTP_200_OK:
-                        result = response.json()
-                        doc_chunk_list += result["result"]["docChunks"]
-            except Exception as e:
-                logger.error(f"[RAG] 获取文档分片失败: {e}")
+            requests.append(tmp_data.model_dump(exclude_none=True, by_alias=True))
         if data.kb_ids:
-            try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    data_json = data.model_dump(exclude_none=True, by_alias=True)
-                    response = await client.post(url, headers=headers, json=data_json)
-                    # 检查响应状态码
-                    if response.status_code == status.HTTP_200_OK:
-                        result = response.json()
-                        doc_chunk_list += result["result"]["docChunks"]
-            except Exception as e:
-                logger.error(f"[RAG] 获取文档分片失败: {e}")
-        return doc_chunk_list
+            requests.append(data.model_dump(exclude_none=True, by_alias=True))
+        return await RAGRetriever().search_many(session_id, requests)
 
     @staticmethod
     async def assemble_doc_info(doc_chunk_list: list[dict[str, Any]], max_tokens: int) -> str:
-        """组装文档信息"""
-        bac_info = ""
+        """
+        组装文档信息
+
+        所有文档头和分片的Token数批量计算一次；只有超出预算的最后一个分片需要截断
+        """
         doc_info_list = []
         doc_cnt = 0
         doc_id_map = {}
-        leave_tokens = max_tokens
-        token_calculator = TokenCalculator()
-        for doc_chunk in doc_chunk_list:
-            if doc_chunk["docId"] not in doc_id_map:
-                doc_cnt += 1
-                doc_id_map[doc_chunk["docId"]] = doc_cnt
-            doc_index = doc_id_map[doc_chunk["docId"]]
-            leave_tokens -= token_calculator.calculate_token_length(messages=[
-                {"role": "user", "content": f'''<document id="{doc_index}"  name="{doc_chunk["docName"]}">'''},
-                {"role": "user", "content": "</document>"}
-            ],
-                pure_text=True)
-        tokens_of_chunk_element = token_calculator.calculate_token_length(messages=[
-            {"role": "user", "content": "<chunk>"},
-            {"role": "user", "content": "</chunk>"},
-        ], pure_text=True)
-        doc_cnt = 0
-        doc_id_map = {}
         for doc_chunk in doc_chunk_list:
             if doc_chunk["docId"] not in doc_id_map:
                 doc_cnt += 1
@@ -161,43 +302,64 @@ class RAG:
                     "size": doc_chunk.get("docSize", 0),
                 })
                 doc_id_map[doc_chunk["docId"]] = doc_cnt
-            doc_index = doc_id_map[doc_chunk["docId"]]
+
+        token_calculator = TokenCalculator()
+        doc_headers = [
+            f'''<document id="{doc_id_map[doc_chunk["docId"]]}"  name="{doc_chunk["docName"]}">'''
+            for doc_chunk in doc_chunk_list
+        ]
+        chunk_texts = [chunk["text"] for doc_chunk in doc_chunk_list for chunk in doc_chunk["chunks"]]
+        counts = await token_calculator.count_tokens_batch_async(
+            ["<chunk>", "</chunk>", "</document>", *doc_headers, *chunk_texts],
+        )
+        tokens_of_chunk_element = counts[0] + counts[1]
+        tokens_of_document_end = counts[2]
+        header_counts = counts[3:3 + len(doc_headers)]
+        chunk_counts = iter(counts[3 + len(doc_headers):])
+
+        leave_tokens = max_tokens - sum(header_counts) - tokens_of_document_end * len(doc_chunk_list)
+        bac_info: list[str] = []
+        for doc_chunk, doc_header in zip(doc_chunk_list, doc_headers, strict=True):
             if bac_info:
-                bac_info += "\n\n"
-            bac_info += f'''
-            <document id="{doc_index}"  name="{doc_chunk["docName"]}">
-            '''
+                bac_info.append("\n\n")
+            bac_info.append(f'''
+            {doc_header}
+            ''')
             for chunk in doc_chunk["chunks"]:
+                chunk_tokens = next(chunk_counts)
                 if leave_tokens <= tokens_of_chunk_element:
-                    break
+                    continue
                 chunk_text = chunk["text"]
-                chunk_text = TokenCalculator.get_k_tokens_words_from_content(
-                    content=chunk_text, k=leave_tokens)
-                leave_tokens -= token_calculator.calculate_token_length(messages=[
-                    {"role": "user", "content": "<chunk>"},
-                    {"role": "user", "content": chunk_text},
-                    {"role": "user", "content": "</chunk>"},
-                ], pure_text=True)
-                bac_info += f'''
+                if chunk_tokens > leave_tokens:
+                    chunk_text = await token_calculator.truncate_async(chunk_text, leave_tokens)
+                    chunk_tokens = token_calculator.count_tokens(chunk_text)
+                leave_tokens -= tokens_of_chunk_element + chunk_tokens
+                bac_info.append(f'''
                 <chunk>
                     {chunk_text}
                 </chunk>
-                '''
-            bac_info += "</document>"
-        return bac_info, doc_info_list
+                ''')
+            bac_info.append("</document>")
+        return "".join(bac_info), doc_info_list
 
     @staticmethod
-    async def chat_with_llm_base_on_rag(
-        user_sub: str, llm: LLM, history: list[dict[str, str]], doc_ids: list[str], data: RAGQueryReq
-    ) -> AsyncGenerator[str, None]:
-        """获取RAG服务的结果"""
+    async def chat_with_llm_base_on_rag(  # noqa: PLR0913
+        user_sub: str, llm: LLM, history: list[dict[str, str]], doc_ids: list[str], data: RAGQueryReq,
+        summary: str = "",
+    ) -> AsyncGenerator[RAGEventData, None]:
+        """
+        获取RAG服务的结果；以事件对象的形式逐个返回
+
+        :param history: 最近几轮问答
+        :param summary: 对话的滚动摘要，概括更早的问答
+        """
         reasion_llm = ReasoningLLM(
             LLMConfig(
                 endpoint=llm.openai_base_url,
                 key=llm.openai_api_key,
                 model=llm.model_name,
                 max_tokens=llm.max_tokens,
-            )
+            ),
         )
         if history:
             try:
@@ -209,44 +371,77 @@ class RAG:
             user_sub=user_sub, max_tokens=llm.max_tokens, doc_ids=doc_ids, data=data)
         bac_info, doc_info_list = await RAG.assemble_doc_info(
             doc_chunk_list=doc_chunk_list, max_tokens=llm.max_tokens)
-        messages = [
+        messages = RAG._build_messages(history, summary, bac_info, data.query)
+        input_tokens = await asyncio.to_thread(TokenCalculator().calculate_token_length, messages=messages)
+        doc_cnt = 0
+        for doc_info in doc_info_list:
+            doc_cnt = max(doc_cnt, doc_info["order"])
+            yield RAGEventData(
+                event_type=EventType.DOCUMENT_ADD.value,
+                content=doc_info,
+                input_tokens=input_tokens,
+                output_tokens=0,
+            )
+        async for event in RAG._stream_answer(user_sub, llm, reasion_llm, messages, input_tokens, doc_cnt):
+            yield event
+
+    @staticmethod
+    def _build_messages(
+        history: list[dict[str, str]], summary: str, bac_info: str, question: str,
+    ) -> list[dict[str, str]]:
+        """组装发送给大模型的消息"""
+        system_prompt = RAG.system_prompt
+        if summary:
+            system_prompt += RAG.summary_prompt.format(summary=summary)
+        return [
             *history,
             {
                 "role": "system",
-                "content": RAG.system_prompt,
+                "content": system_prompt,
             },
             {
                 "role": "user",
                 "content": RAG.user_prompt.format(
                     bac_info=bac_info,
-                    user_question=data.query,
+                    user_question=question,
                 ),
             },
         ]
-        input_tokens = TokenCalculator().calculate_token_length(messages=messages)
-        output_tokens = 0
-        doc_cnt = 0
-        for doc_info in doc_info_list:
-            doc_cnt = max(doc_cnt, doc_info["order"])
-            yield (
-                "data: "
-                + json.dumps(
-                    {
-                        "event_type": EventType.DOCUMENT_ADD.value,
-                        "input_tokens": input_tokens,
-                        "output_tokens": output_tokens,
-                        "content": doc_info,
-                    },
-                    ensure_ascii=False,
-                )
-                + "\n\n"
-            )
-        max_footnote_length = 4
-        while doc_cnt > 0:
-            doc_cnt //= 10
-            max_footnote_length += 1
+
+    @staticmethod
+    def _split_footnote(text: str, max_footnote_length: int) -> tuple[str, str]:
+        """
+        防止脚注被截断：文本末尾可能是未输出完整的脚注时，将其留到下一段输出
+
+        :param text: 待输出的文本
+        :param max_footnote_length: 脚注的最大长度
+        :return: 可以输出的文本，以及留到下一段的文本
+        """
+        if len(text) < len("]]") or text.endswith("]]"):
+            return text, ""
+        index = len(text) - 1
+        while index >= max(0, len(text) - max_footnote_length) and text[index] != "]":
+            index -= 1
+        if index < 0:
+            return text, ""
+        return text[:index + 1], text[index + 1:]
+
+    @staticmethod
+    async def _stream_answer(  # noqa: PLR0913
+        user_sub: str, llm: LLM, reasion_llm: ReasoningLLM, messages: list[dict[str, str]],
+        input_tokens: int, doc_cnt: int,
+    ) -> AsyncGenerator[RAGEventData, None]:
+        """
+        流式输出大模型的回答；最后一段输出在拿到准确的Token数后再推送
+
+        :param doc_cnt: 文档的数量，用于确定脚注的最大长度
+        """
+        max_footnote_length = 4 + len(str(doc_cnt)) if doc_cnt > 0 else 4
         buffer = ""
-        async for chunk in reasion_llm.call(
+        pending = ""
+        output_tokens = 0
+        meter = TokenMeter()
+        async for delta in reasion_llm.call(
             messages,
             max_tokens=llm.max_tokens,
             streaming=True,
@@ -255,54 +450,28 @@ class RAG:
             model=llm.model_name,
         ):
             if not await Activity.is_active(user_sub):
-                return
-            chunk = buffer + chunk
-            # 防止脚注被截断
-            if len(chunk) >= 2 and chunk[-2:] != "]]":
-                index = len(chunk) - 1
-                while index >= max(0, len(chunk) - max_footnote_length) and chunk[index] != "]":
-                    index -= 1
-                if index >= 0:
-                    buffer = chunk[index + 1:]
-                    chunk = chunk[:index + 1]
-            else:
-                buffer = ""
-            output_tokens += TokenCalculator().calculate_token_length(
-                messages=[
-                    {"role": "assistant", "content": chunk},
-                ],
-                pure_text=True,
-            )
-            yield (
-                "data: "
-                + json.dumps(
-                    {
-                        "event_type": EventType.TEXT_ADD.value,
-                        "content": chunk,
-                        "input_tokens": input_tokens,
-                        "output_tokens": output_tokens,
-                    },
-                    ensure_ascii=False,
-                )
-                + "\n\n"
-            )
-        if buffer:
-            output_tokens += TokenCalculator().calculate_token_length(
-                messages=[
-                    {"role": "assistant", "content": buffer},
-                ],
-                pure_text=True,
-            )
-            yield (
-                "data: "
-                + json.dumps(
-                    {
-                        "event_type": EventType.TEXT_ADD.value,
-                        "content": buffer,
-                        "input_tokens": input_tokens,
-                        "output_tokens": output_tokens,
-                    },
-                    ensure_ascii=False,
-                )
-                + "\n\n"
-            )
+                break
+            text, buffer = RAG._split_footnote(buffer + delta, max_footnote_length)
+            if pending:
+                yield RAG._text_event(pending, input_tokens, output_tokens)
+            pending = text
+            output_tokens = meter.feed(text)
+
+        # 以上游返回的用量为准；上游未返回时在线程池中重新计数
+        meter.feed(buffer)
+        if reasion_llm.output_tokens:
+            meter.set_usage(reasion_llm.output_tokens)
+        output_tokens = await meter.finalize()
+        input_tokens = reasion_llm.input_tokens or input_tokens
+        if pending or buffer:
+            yield RAG._text_event(pending + buffer, input_tokens, output_tokens)
+
+    @staticmethod
+    def _text_event(content: str, input_tokens: int, output_tokens: int) -> RAGEventData:
+        """组装文本消息"""
+        return RAGEventData(
+            event_type=EventType.TEXT_ADD.value,
+            content=content,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        )
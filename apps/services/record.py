@@ -2,26 +2,110 @@
 """问答对Manager"""
 
 import logging
-from typing import Literal
+import threading
+from collections import OrderedDict
+from typing import Any, Literal
 
 from apps.common.mongo import MongoDB
+from apps.common.security import Security
+from apps.common.singleton import SingletonMeta
+from apps.constants import HISTORY_CACHE_CONVERSATIONS, HISTORY_CACHE_RECORDS
 from apps.schemas.record import (
     Record,
+    RecordContent,
     RecordGroup,
 )
 
 logger = logging.getLogger(__name__)
 
 
+class HistoryCache(metaclass=SingletonMeta):
+    """
+    解密后的历史问答缓存，在同一Worker内共享
+
+    按对话分组、以Record ID为Key缓存；Record写入后内容不再变化，因此缓存无需与其他Worker同步。
+    新问答保存时直接写入缓存，对话删除时整体失效。
+    """
+
+    def __init__(self) -> None:
+        """初始化缓存"""
+        self._data: OrderedDict[str, OrderedDict[str, RecordContent]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str, record_id: str) -> RecordContent | None:
+        """获取解密后的问答"""
+        with self._lock:
+            records = self._data.get(conversation_id)
+            if records is None or record_id not in records:
+                return None
+            self._data.move_to_end(conversation_id)
+            records.move_to_end(record_id)
+            return records[record_id]
+
+    def put(self, conversation_id: str, record_id: str, content: RecordContent) -> None:
+        """写入解密后的问答"""
+        with self._lock:
+            records = self._data.setdefault(conversation_id, OrderedDict())
+            records[record_id] = content
+            records.move_to_end(record_id)
+            self._data.move_to_end(conversation_id)
+            while len(records) > HISTORY_CACHE_RECORDS:
+                records.popitem(last=False)
+            while len(self._data) > HISTORY_CACHE_CONVERSATIONS:
+                self._data.popitem(last=False)
+
+    def invalidate(self, conversation_id: str) -> None:
+        """删除对话的全部缓存"""
+        with self._lock:
+            self._data.pop(conversation_id, None)
+
+
 class RecordManager:
-    """问答对相关操作"""
+    """
+    问答对相关操作
+
+    问答对保存在独立的 ``record`` 集合中，通过 ``groupId`` 和 ``conversationId`` 关联问答组与对话；
+    旧版本的问答对内嵌在 ``record_group.records`` 数组中，读取时两处合并，迁移见 ``apps/scripts/migrate_record.py``。
+    """
+
+    @staticmethod
+    def record_to_document(record: Record) -> dict[str, Any]:
+        """将问答对转换为 ``record`` 集合中的文档"""
+        return {**record.model_dump(by_alias=True), "_id": record.id}
+
+    @staticmethod
+    async def _fill_records(groups: list[dict[str, Any]], *, latest_only: bool = False) -> list[RecordGroup]:
+        """
+        为问答组填充问答对：合并 ``record`` 集合与旧版内嵌数组中的数据，按创建时间排序
+
+        :param groups: 问答组文档
+        :param latest_only: 是否每个问答组只保留最新的一条问答对
+        :return: 填充后的问答组
+        """
+        group_ids = [group["_id"] for group in groups]
+        records: dict[str, dict[str, Record]] = {group_id: {} for group_id in group_ids}
+        for group in groups:
+            for item in group.get("records", []):
+                record = Record.model_validate(item)
+                records[group["_id"]][record.id] = record
+
+        record_collection = MongoDB().get_collection("record")
+        async for item in record_collection.find({"groupId": {"$in": group_ids}}):
+            record = Record.model_validate(item)
+            records[record.group_id][record.id] = record
+
+        result = []
+        for group in groups:
+            group_records = sorted(records[group["_id"]].values(), key=lambda record: record.created_at)
+            if latest_only:
+                group_records = group_records[-1:]
+            result.append(RecordGroup.model_validate({**group, "records": group_records}))
+        return result
 
     @staticmethod
     async def create_record_group(group_id: str, user_sub: str, conversation_id: str, task_id: str) -> str | None:
         """创建问答组"""
-        mongo = MongoDB()
-        record_group_collection = mongo.get_collection("record_group")
-        conversation_collection = mongo.get_collection("conversation")
+        record_group_collection = MongoDB().get_collection("record_group")
         record_group = RecordGroup(
             _id=group_id,
             user_sub=user_sub,
@@ -30,13 +114,7 @@ class RecordManager:
         )
 
         try:
-            async with mongo.get_session() as session, await session.start_transaction():
-                # RecordGroup里面加一条记录
-                await record_group_collection.insert_one(record_group.model_dump(by_alias=True), session=session)
-                # Conversation里面加一个ID
-                await conversation_collection.update_one(
-                    {"_id": conversation_id}, {"$push": {"record_groups": group_id}}, session=session,
-                )
+            await record_group_collection.insert_one(record_group.model_dump(by_alias=True, exclude={"records"}))
         except Exception:
             logger.exception("[RecordManager] 创建问答组失败")
             return None
@@ -46,13 +124,10 @@ class RecordManager:
     @staticmethod
     async def insert_record_data_into_record_group(user_sub: str, group_id: str, record: Record) -> str | None:
         """加密问答对，并插入MongoDB中的特定问答组"""
-        mongo = MongoDB()
-        group_collection = mongo.get_collection("record_group")
+        record_collection = MongoDB().get_collection("record")
         try:
-            await group_collection.update_one(
-                {"_id": group_id, "user_sub": user_sub},
-                {"$push": {"records": record.model_dump(by_alias=True)}},
-            )
+            record = record.model_copy(update={"user_sub": user_sub, "group_id": group_id})
+            await record_collection.insert_one(RecordManager.record_to_document(record))
         except Exception:
             logger.exception("[RecordManager] 插入加密问答对失败")
             return None
@@ -73,41 +148,46 @@ class RecordManager:
         """
         sort_order = -1 if order == "desc" else 1
 
-        mongo = MongoDB()
-        record_group_collection = mongo.get_collection("record_group")
+        record_group_collection = MongoDB().get_collection("record_group")
         try:
-            # 得到conversation的全部record_group id
-            record_groups = await record_group_collection.aggregate(
-                [
-                    {"$match": {"conversation_id": conversation_id, "user_sub": user_sub}},
-                    {"$sort": {"created_at": sort_order}},
-                    {"$project": {"_id": 1}},
-                    {"$limit": total_pairs} if total_pairs is not None else {},
-                ],
-            )
-
-            records = []
-            async for record_group_id in record_groups:
-                record = await record_group_collection.aggregate(
-                    [
-                        {"$match": {"_id": record_group_id["_id"]}},
-                        {"$project": {"records": 1}},
-                        {"$unwind": "$records"},
-                        {"$sort": {"records.created_at": -1}},
-                        {"$limit": 1},
-                    ],
-                )
-                record = await record.to_list(length=1)
-                if not record:
-                    logger.info("[RecordManager] 问答组 %s 没有问答对", record_group_id)
-                    continue
-
-                records.append(Record.model_validate(record[0]["records"]))
+            cursor = record_group_collection.find(
+                {"conversation_id": conversation_id, "user_sub": user_sub},
+            ).sort({"created_at": sort_order})
+            if total_pairs is not None:
+                cursor = cursor.limit(total_pairs)
+            groups = await RecordManager._fill_records(await cursor.to_list(None), latest_only=True)
         except Exception:
             logger.exception("[RecordManager] 查询加密问答对失败")
             return []
-        else:
-            return records
+
+        records = []
+        for group in groups:
+            if not group.records:
+                logger.info("[RecordManager] 问答组 %s 没有问答对", group.id)
+                continue
+            records.append(group.records[0])
+        return records
+
+    @staticmethod
+    async def query_record_content_by_conversation_id(
+        user_sub: str,
+        conversation_id: str,
+        total_pairs: int | None = None,
+    ) -> list[RecordContent]:
+        """
+        查询ConversationID的最后n条问答对，并解密
+
+        已解密过的问答直接从缓存中获取；结果按时间倒序排列
+        """
+        cache = HistoryCache()
+        contents = []
+        for record in await RecordManager.query_record_by_conversation_id(user_sub, conversation_id, total_pairs):
+            content = cache.get(conversation_id, record.id)
+            if content is None:
+                content = RecordContent.model_validate_json(Security.decrypt(record.content, record.key))
+                cache.put(conversation_id, record.id, content)
+            contents.append(content)
+        return contents
 
     @staticmethod
     async def query_record_group_by_conversation_id(
@@ -120,19 +200,46 @@ class RecordManager:
         """
         record_group_collection = MongoDB().get_collection("record_group")
         try:
-            pipeline = [
-                {"$match": {"conversation_id": conversation_id}},
-                {"$sort": {"created_at": -1}},
-            ]
+            cursor = record_group_collection.find({"conversation_id": conversation_id}).sort({"created_at": -1})
             if total_pairs is not None:
-                pipeline.append({"$limit": total_pairs})
-
-            records = await record_group_collection.aggregate(pipeline)
-            return [RecordGroup.model_validate(record) async for record in records]
+                cursor = cursor.limit(total_pairs)
+            return await RecordManager._fill_records(await cursor.to_list(None))
         except Exception:
             logger.exception("[RecordManager] 查询问答组失败")
             return []
 
+    @staticmethod
+    async def get_record(record_id: str, group_id: str | None = None, user_sub: str | None = None) -> Record | None:
+        """
+        根据ID获取问答对；兼容旧版内嵌在问答组中的数据
+
+        :param record_id: 问答对ID
+        :param group_id: 问答组ID；设置时需匹配
+        :param user_sub: 用户ID；设置时需匹配
+        :return: 问答对；不存在时返回None
+        """
+        mongo = MongoDB()
+        query: dict[str, Any] = {"_id": record_id}
+        if group_id is not None:
+            query["groupId"] = group_id
+        if user_sub is not None:
+            query["user_sub"] = user_sub
+        data = await mongo.get_collection("record").find_one(query)
+        if data:
+            return Record.model_validate(data)
+
+        legacy_query: dict[str, Any] = {"records.id": record_id}
+        if group_id is not None:
+            legacy_query["_id"] = group_id
+        if user_sub is not None:
+            legacy_query["user_sub"] = user_sub
+        group = await mongo.get_collection("record_group").find_one(
+            legacy_query, {"records": {"$elemMatch": {"id": record_id}}},
+        )
+        if not group or not group.get("records"):
+            return None
+        return Record.model_validate(group["records"][0])
+
     @staticmethod
     async def verify_record_in_group(group_id: str, record_id: str, user_sub: str) -> bool:
         """
@@ -142,11 +249,7 @@ class RecordManager:
         :return: 记录是否存在
         """
         try:
-            record_group_collection = MongoDB().get_collection("record_group")
-            record_data = await record_group_collection.find_one(
-                {"_id": group_id, "user_sub": user_sub, "records.id": record_id},
-            )
-            return bool(record_data)
+            return await RecordManager.get_record(record_id, group_id, user_sub) is not None
         except Exception:
             logger.exception("[RecordManager] 验证记录是否在组中失败")
             return False
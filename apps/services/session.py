@@ -1,27 +1,233 @@
 # Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
 """浏览器Session Manager"""
 
+import asyncio
+import base64
+import hashlib
+import hmac
 import logging
 import secrets
+import time
 from datetime import UTC, datetime, timedelta
+from functools import cache
+
+from pydantic import ValidationError
 
 from apps.common.config import Config
 from apps.common.mongo import MongoDB
+from apps.common.singleton import SingletonMeta
 from apps.constants import SESSION_TTL
 from apps.exceptions import LoginSettingsError
 from apps.schemas.config import FixedUserConfig
-from apps.schemas.session import Session
+from apps.schemas.session import Session, SessionToken
 from apps.services.blacklist import UserBlacklistManager
 
 logger = logging.getLogger(__name__)
+# 无状态Session Token的前缀；普通Session ID为十六进制字符串，不会与之冲突
+_TOKEN_PREFIX = "v1."  # noqa: S105 Token格式前缀，并非密钥
+
+
+def _b64encode(data: bytes) -> str:
+    """URL安全的Base64编码，去掉填充"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    """URL安全的Base64解码"""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionRevocation(metaclass=SingletonMeta):
+    """
+    无状态Session Token的吊销列表
+
+    吊销记录写入MongoDB，并定期同步到内存；鉴权时只查内存。
+    吊销记录只需保留到被吊销的Token全部过期为止，因此列表始终很小。
+    """
+
+    def __init__(self) -> None:
+        """初始化"""
+        config = Config().get_config().session
+        self._token_ttl = config.token_ttl
+        self._sync_interval = config.revocation_sync
+        self._sessions: dict[str, float] = {}
+        self._users: dict[str, float] = {}
+        self._synced_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def is_revoked(self, token: SessionToken) -> bool:
+        """
+        判断Token是否已被吊销
+
+        :param token: Token内容
+        :return: Session被删除，或用户在Token签发后被吊销时返回True
+        """
+        if token.sid in self._sessions:
+            return True
+        return token.iat < self._users.get(token.sub, float("-inf"))
+
+    async def sync(self) -> None:
+        """距上次同步超过间隔时，从数据库重新加载吊销列表；同一时间只有一个协程执行同步"""
+        if time.monotonic() - self._synced_at < self._sync_interval:
+            return
+        async with self._lock:
+            if time.monotonic() - self._synced_at < self._sync_interval:
+                return
+            try:
+                collection = MongoDB().get_collection("session_revocation")
+                sessions: dict[str, float] = {}
+                users: dict[str, float] = {}
+                async for item in collection.find({}):
+                    if item["kind"] == "session":
+                        sessions[item["target"]] = item["not_before"]
+                    else:
+                        users[item["target"]] = item["not_before"]
+            except Exception:
+                logger.exception("[SessionRevocation] 同步吊销列表失败")
+                return
+            self._sessions = sessions
+            self._users = users
+            self._synced_at = time.monotonic()
+
+    async def _add(self, kind: str, target: str) -> None:
+        """写入吊销记录"""
+        now = time.time()
+        await MongoDB().get_collection("session_revocation").update_one(
+            {"_id": f"{kind}_{target}"},
+            {"$set": {
+                "kind": kind,
+                "target": target,
+                "not_before": now,
+                "expired_at": datetime.now(UTC) + timedelta(seconds=self._token_ttl),
+            }},
+            upsert=True,
+        )
+        (self._sessions if kind == "session" else self._users)[target] = now
+
+    async def revoke_session(self, session_id: str) -> None:
+        """
+        吊销某个Session的所有Token
+
+        :param session_id: Session ID
+        """
+        await self._add("session", session_id)
+
+    async def revoke_user(self, user_sub: str) -> None:
+        """
+        吊销某个用户此前签发的所有Token，并删除该用户的所有Session
+
+        :param user_sub: 用户sub
+        """
+        await self._add("user", user_sub)
+        # Token过期后会回退到数据库校验，Session仍存在时可能被续签
+        await MongoDB().get_collection("session").delete_many({"user_sub": user_sub})
 
 
 class SessionManager:
     """浏览器Session管理"""
 
+    @staticmethod
+    @cache
+    def _token_key() -> bytes | None:
+        """签名密钥；未启用无状态Session或未配置密钥时返回None"""
+        config = Config().get_config()
+        if not config.session.stateless or not config.security.jwt_key:
+            return None
+        return config.security.jwt_key.encode("utf-8")
+
+    @staticmethod
+    @cache
+    def _token_ttl() -> int:
+        """Session Token有效期"""
+        return Config().get_config().session.token_ttl
+
+    @staticmethod
+    def issue_token(session_id: str, user_sub: str) -> str:
+        """
+        签发无状态Session Token；未启用时直接返回Session ID
+
+        :param session_id: Session ID
+        :param user_sub: 用户sub
+        :return: Session Token
+        """
+        key = SessionManager._token_key()
+        if key is None:
+            return session_id
+        now = int(time.time())
+        token = SessionToken(sid=session_id, sub=user_sub, iat=now, exp=now + SessionManager._token_ttl())
+        payload = _TOKEN_PREFIX + _b64encode(token.model_dump_json().encode("utf-8"))
+        signature = hmac.new(key, payload.encode("ascii"), hashlib.sha256).digest()
+        return f"{payload}.{_b64encode(signature)}"
+
+    @staticmethod
+    def decode_token(token: str) -> SessionToken | None:
+        """
+        校验签名并解析Token；不检查是否过期或被吊销
+
+        :param token: Session Token
+        :return: Token内容；不是Token或签名无效时返回None
+        """
+        key = SessionManager._token_key()
+        if key is None or not token.startswith(_TOKEN_PREFIX):
+            return None
+        payload, _, signature = token.rpartition(".")
+        expected = hmac.new(key, payload.encode("ascii", errors="replace"), hashlib.sha256).digest()
+        try:
+            if not hmac.compare_digest(_b64decode(signature), expected):
+                return None
+            return SessionToken.model_validate_json(_b64decode(payload[len(_TOKEN_PREFIX):]))
+        except (ValueError, ValidationError):
+            return None
+
+    @staticmethod
+    def get_session_id(session_id: str) -> str:
+        """
+        获取真实的Session ID；传入无状态Token时从中取出Session ID
+
+        :param session_id: Session ID或Session Token
+        :return: Session ID
+        """
+        token = SessionManager.decode_token(session_id)
+        return token.sid if token is not None else session_id
+
+    @staticmethod
+    async def _verify_token(session_id: str) -> str | None:
+        """
+        不访问数据库，直接校验无状态Token
+
+        :param session_id: Session ID或Session Token
+        :return: Token有效、未过期且未被吊销时返回用户sub；否则返回None，由调用方回退到数据库校验
+        """
+        token = SessionManager.decode_token(session_id)
+        if token is None or token.exp <= time.time():
+            return None
+        revocation = SessionRevocation()
+        await revocation.sync()
+        if revocation.is_revoked(token):
+            return None
+        return token.sub
+
+    @staticmethod
+    async def refresh_token(session_id: str) -> str | None:
+        """
+        为已过期的Token签发新Token；调用方需先通过 ``get_user`` 在数据库中确认Session有效且用户不在黑名单中
+
+        :param session_id: Session ID或Session Token
+        :return: 新Token；传入的不是已过期的Token，或Token已被吊销时返回None
+        """
+        token = SessionManager.decode_token(session_id)
+        if token is None or token.exp > time.time():
+            return None
+        # 被吊销的Token不能续签，否则新Token的签发时间晚于吊销时间，会绕过吊销
+        revocation = SessionRevocation()
+        await revocation.sync()
+        if revocation.is_revoked(token):
+            return None
+        return SessionManager.issue_token(token.sid, token.sub)
+
     @staticmethod
     async def create_session(ip: str | None = None, user_sub: str | None = None) -> str:
-        """创建浏览器Session"""
+        """创建浏览器Session；启用无状态Session时返回签名的Token"""
         if not ip:
             err = "用户IP错误！"
             raise ValueError(err)
@@ -44,18 +250,20 @@ class SessionManager:
 
         collection = MongoDB().get_collection("session")
         await collection.insert_one(data.model_dump(exclude_none=True, by_alias=True))
-        await collection.create_index(
-            "expired_at", expireAfterSeconds=0,
-        )
-        return session_id
+        if data.user_sub is None:
+            return session_id
+        return SessionManager.issue_token(session_id, data.user_sub)
 
     @staticmethod
     async def delete_session(session_id: str) -> None:
-        """删除浏览器Session"""
+        """删除浏览器Session，并吊销其Token"""
         if not session_id:
             return
+        session_id = SessionManager.get_session_id(session_id)
         collection = MongoDB().get_collection("session")
         await collection.delete_one({"_id": session_id})
+        if SessionManager._token_key() is not None:
+            await SessionRevocation().revoke_session(session_id)
 
     @staticmethod
     async def get_session(session_id: str, session_ip: str) -> str:
@@ -66,7 +274,7 @@ class SessionManager:
         ip = None
         mongo = MongoDB()
         collection = mongo.get_collection("session")
-        data = await collection.find_one({"_id": session_id})
+        data = await collection.find_one({"_id": SessionManager.get_session_id(session_id)})
         if not data:
             return await SessionManager.create_session(session_ip)
         ip = Session(**data).ip
@@ -77,17 +285,25 @@ class SessionManager:
 
     @staticmethod
     async def verify_user(session_id: str) -> bool:
-        """验证用户是否在Session中"""
-        mongo = MongoDB()
-        collection = mongo.get_collection("session")
-        data = await collection.find_one({"_id": session_id})
-        if not data:
-            return False
-        return Session(**data).user_sub is not None
+        """验证用户是否在Session中；与 ``get_user`` 相同，回退到数据库校验时会检查黑名单"""
+        return await SessionManager.get_user(session_id) is not None
 
     @staticmethod
     async def get_user(session_id: str) -> str | None:
         """从Session中获取用户"""
+        user_sub = await SessionManager._verify_token(session_id)
+        if user_sub is not None:
+            return user_sub
+
+        # Token已过期时回退到数据库校验，但被吊销的Token不再放行
+        token = SessionManager.decode_token(session_id)
+        if token is not None:
+            revocation = SessionRevocation()
+            await revocation.sync()
+            if revocation.is_revoked(token):
+                return None
+
+        session_id = SessionManager.get_session_id(session_id)
         mongo = MongoDB()
         collection = mongo.get_collection("session")
         data = await collection.find_one({"_id": session_id})
@@ -72,20 +72,14 @@ class TaskManager:
     @staticmethod
     async def get_context_by_record_id(record_group_id: str, record_id: str) -> list[dict[str, Any]]:
         """根据record_group_id获取flow信息"""
-        record_group_collection = MongoDB().get_collection("record_group")
         flow_context_collection = MongoDB().get_collection("flow_context")
         try:
-            record_group = await record_group_collection.aggregate([
-                {"$match": {"_id": record_group_id}},
-                {"$unwind": "$records"},
-                {"$match": {"records.id": record_id}},
-            ])
-            records = await record_group.to_list(length=1)
-            if not records:
+            record = await RecordManager.get_record(record_id, record_group_id)
+            if record is None:
                 return []
 
             flow_context_list = []
-            for flow_context_id in records[0]["records"]["flow"]:
+            for flow_context_id in record.flow:
                 flow_context = await flow_context_collection.find_one({"_id": flow_context_id})
                 if flow_context:
                     flow_context_list.append(flow_context)
@@ -99,7 +99,6 @@ class TokenManager:
                         }},
                         upsert=True,
                     )
-                    await collection.create_index("expired_at", expireAfterSeconds=0)
                 except Exception:
                     logger.exception("[TokenManager] 获取OIDC Access token 失败")
                     return None
@@ -133,9 +132,6 @@ class TokenManager:
                 }},
                 upsert=True,
             )
-
-            # 创建TTL索引
-            await collection.create_index("expired_at", expireAfterSeconds=0)
             return ret["access_token"]
 
     @staticmethod
@@ -102,5 +102,9 @@ class UserManager:
             return
         result = User.model_validate(result)
 
-        for conv_id in result.conversations:
+        # 旧版本的用户文档中记录了对话ID列表；新版本只能通过conversation集合查询
+        conv_ids = set(result.conversations)
+        conv_collection = mongo.get_collection("conversation")
+        conv_ids.update([conv["_id"] async for conv in conv_collection.find({"user_sub": user_sub}, {"_id": 1})])
+        for conv_id in conv_ids:
             await ConversationManager.delete_conversation_by_conversation_id(user_sub, conv_id)
@@ -0,0 +1,45 @@
+"""ByteBudget单元测试"""
+import asyncio
+
+import pytest
+
+from apps.common.byte_budget import ByteBudget
+
+
+@pytest.mark.asyncio
+async def test_budget_limits_concurrency() -> None:
+    """同时预留的字节数不超过总预算"""
+    budget = ByteBudget(100)
+    active = 0
+    peak = 0
+
+    async def task() -> None:
+        nonlocal active, peak
+        async with budget.reserve(40):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*[task() for _ in range(10)])
+    assert peak == 2  # noqa: PLR2004
+    assert budget.available == 100  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_oversized_reservation() -> None:
+    """超过总预算的预留按总预算计算，不会永远等待"""
+    budget = ByteBudget(100)
+    async with budget.reserve(1000):
+        assert budget.available == 0
+    assert budget.available == 100  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_released_on_error() -> None:
+    """任务出错时也会释放预算"""
+    budget = ByteBudget(100)
+    with pytest.raises(RuntimeError):
+        async with budget.reserve(50):
+            raise RuntimeError
+    assert budget.available == 100  # noqa: PLR2004
@@ -0,0 +1,184 @@
+"""MongoDB索引注册表单元测试"""
+import asyncio
+import contextlib
+from collections.abc import Iterator
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from apps.common import mongo_index
+from apps.common.mongo_index import MONGO_INDEXES, IndexSpec, diff_indexes, ensure_indexes, explain
+
+# 热点查询：(集合, 查询条件, 排序)
+HOT_QUERIES: list[tuple[str, dict[str, Any], list[tuple[str, int]] | None]] = [
+    ("conversation", {"user_sub": "u", "debug": False}, [("created_at", ASCENDING), ("_id", ASCENDING)]),
+    ("record_group", {"conversation_id": "c", "user_sub": "u"}, [("created_at", DESCENDING)]),
+    ("record_group", {"records.id": "r"}, None),
+    ("record", {"groupId": {"$in": ["g1", "g2"]}}, None),
+    ("record", {"conversationId": "c"}, None),
+    ("document", {"user_sub": "u", "conversation_id": "c"}, None),
+    ("task", {"conversation_id": "c"}, None),
+    ("flow_context", {"task_id": "t"}, [("created_at", DESCENDING)]),
+    ("activity", {"user_sub": "u"}, None),
+    ("session", {"user_sub": "u"}, None),
+    ("user", {"api_key": "k"}, None),
+    ("node", {"service_id": "s"}, None),
+]
+# 仅连接一次MongoDB；不可用时后续用例直接跳过
+_MONGO_STATE: dict[str, str] = {}
+
+
+def _stages(plan: dict[str, Any]) -> list[str]:
+    """展开执行计划中的所有阶段"""
+    stages = [plan["stage"]]
+    for child in [plan.get("inputStage"), *plan.get("inputStages", [])]:
+        if child:
+            stages.extend(_stages(child))
+    return stages
+
+
+def _existing(specs: list[IndexSpec]) -> dict[str, dict[str, dict[str, Any]]]:
+    """按声明构造 ``index_information()`` 格式的已有索引"""
+    existing: dict[str, dict[str, dict[str, Any]]] = {}
+    for spec in specs:
+        existing.setdefault(spec.collection, {"_id_": {"key": [("_id", 1)]}})[spec.name] = {
+            "key": list(spec.keys),
+            **spec.options,
+        }
+    return existing
+
+
+@pytest.fixture(scope="module")
+def throwaway_database() -> Iterator[None]:
+    """将配置中的数据库临时切换为一次性数据库，用例结束后删除；不会改动配置中数据库的索引"""
+    from apps.common.config import Config
+    from apps.common.mongo import MongoDB
+
+    try:
+        mongodb = Config().get_config().mongodb
+    except Exception as e:  # noqa: BLE001
+        pytest.skip(f"配置不可用: {e}")
+    original = mongodb.database
+    mongodb.database = f"{original}_index_test_{uuid4().hex[:8]}"
+
+    async def drop() -> None:
+        collection = MongoDB().get_collection("_")
+        with contextlib.suppress(Exception):
+            await collection.database.client.drop_database(mongodb.database)
+        await collection.database.client.close()
+
+    try:
+        yield
+    finally:
+        # MongoDB可用时才需要清理
+        if _MONGO_STATE.get("ready") == "":
+            asyncio.run(drop())
+        mongodb.database = original
+
+
+def test_registry_names_unique() -> None:
+    """同一集合内的索引名称不重复"""
+    names = [(spec.collection, spec.name) for spec in MONGO_INDEXES]
+    assert len(names) == len(set(names))
+
+
+def test_ttl_index_name_matches_default() -> None:
+    """TTL索引名称与MongoDB默认生成的名称一致，已有部署不会重复创建"""
+    spec = next(spec for spec in MONGO_INDEXES if spec.collection == "session" and "expireAfterSeconds" in spec.options)
+    assert spec.name == "expired_at_1"
+
+
+def test_diff_clean() -> None:
+    """索引与声明一致时没有差异"""
+    assert diff_indexes(MONGO_INDEXES, _existing(MONGO_INDEXES)).clean
+
+
+def test_diff_missing_changed_extra() -> None:
+    """缺失、变化和多余的索引分别报告"""
+    existing = _existing(MONGO_INDEXES)
+    del existing["task"]["conversation_id_1"]
+    existing["session"]["expired_at_1"]["expireAfterSeconds"] = 3600
+    existing["user"]["legacy_1"] = {"key": [("legacy", 1)]}
+
+    report = diff_indexes(MONGO_INDEXES, existing)
+    assert report.missing == ["task.conversation_id_1"]
+    assert report.changed == ["session.expired_at_1"]
+    assert report.extra == ["user.legacy_1"]
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_continues_on_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    """单个索引创建失败时记录并继续创建其余索引"""
+    created = []
+
+    class FakeCollection:
+        def __init__(self, name: str) -> None:
+            self.name = name
+
+        async def index_information(self) -> dict[str, Any]:
+            return {}
+
+        async def create_indexes(self, models: list[Any]) -> None:
+            if self.name == "task":
+                err = "IndexOptionsConflict"
+                raise OperationFailure(err)
+            created.append(self.name)
+
+    class FakeMongoDB:
+        def get_collection(self, name: str) -> FakeCollection:
+            return FakeCollection(name)
+
+    monkeypatch.setattr(mongo_index, "MongoDB", FakeMongoDB)
+    specs = [IndexSpec("task", (("conversation_id", ASCENDING),)), IndexSpec("record", (("groupId", ASCENDING),))]
+    report = await ensure_indexes(specs)
+    assert report.failed == ["task.conversation_id_1"]
+    assert created == ["record"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("rebuild", [False, True])
+async def test_ensure_indexes_rebuild_opt_in(monkeypatch: pytest.MonkeyPatch, *, rebuild: bool) -> None:
+    """定义不一致的索引默认只报告；显式要求时才删除并重建"""
+    calls = []
+
+    class FakeCollection:
+        async def index_information(self) -> dict[str, Any]:
+            return {"_id_": {"key": [("_id", 1)]}, "conversation_id_1": {"key": [("conversation_id", -1)]}}
+
+        async def drop_index(self, name: str) -> None:
+            calls.append(("drop", name))
+
+        async def create_indexes(self, models: list[Any]) -> None:
+            calls.append(("create", models[0].document["name"]))
+
+    class FakeMongoDB:
+        def get_collection(self, _name: str) -> FakeCollection:
+            return FakeCollection()
+
+    monkeypatch.setattr(mongo_index, "MongoDB", FakeMongoDB)
+    report = await ensure_indexes([IndexSpec("task", (("conversation_id", ASCENDING),))], rebuild=rebuild)
+    assert report.changed == ["task.conversation_id_1"]
+    assert calls == ([("drop", "conversation_id_1"), ("create", "conversation_id_1")] if rebuild else [])
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("throwaway_database")
+@pytest.mark.parametrize(("collection", "query", "sort"), HOT_QUERIES)
+async def test_hot_query_uses_index(collection: str, query: dict[str, Any], sort: list[tuple[str, int]] | None) -> None:
+    """热点查询命中索引；需要可用的MongoDB，在一次性数据库中执行"""
+    if "ready" not in _MONGO_STATE:
+        try:
+            await ensure_indexes()
+            _MONGO_STATE["ready"] = ""
+        except Exception as e:  # noqa: BLE001
+            _MONGO_STATE["ready"] = str(e)
+    if _MONGO_STATE["ready"]:
+        pytest.skip(f"MongoDB不可用: {_MONGO_STATE['ready']}")
+
+    stages = _stages(await explain(collection, query, sort))
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
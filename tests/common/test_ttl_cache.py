@@ -0,0 +1,61 @@
+"""AsyncTTLCache单元测试"""
+import asyncio
+
+import pytest
+
+from apps.common.ttl_cache import AsyncTTLCache
+
+
+@pytest.mark.asyncio
+async def test_single_flight() -> None:
+    """并发未命中只加载一次"""
+    cache: AsyncTTLCache[str, str] = AsyncTTLCache(60, 60, 16)
+    calls = 0
+
+    async def load() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "user"
+
+    results = await asyncio.gather(*[cache.get("key", load) for _ in range(20)])
+    assert results == ["user"] * 20
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_and_invalidate() -> None:
+    """None结果按negative_ttl缓存；失效后重新加载"""
+    cache: AsyncTTLCache[str, str] = AsyncTTLCache(60, 0.01, 16)
+    calls = 0
+
+    async def load() -> None:
+        nonlocal calls
+        calls += 1
+
+    await cache.get("key", load)
+    await cache.get("key", load)
+    assert calls == 1
+    await asyncio.sleep(0.02)
+    await cache.get("key", load)
+    assert calls == 2  # noqa: PLR2004
+
+    cache.invalidate("key")
+    await cache.get("key", load)
+    assert calls == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_error_not_cached() -> None:
+    """加载失败时不缓存"""
+    cache: AsyncTTLCache[str, str] = AsyncTTLCache(60, 60, 16)
+
+    async def fail() -> str:
+        raise RuntimeError
+
+    async def load() -> str:
+        return "user"
+
+    with pytest.raises(RuntimeError):
+        await cache.get("key", fail)
+    assert await cache.get("key", load) == "user"
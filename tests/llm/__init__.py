@@ -0,0 +1,5 @@
+"""
+UT: /apps/llm
+
+Copyright (c) Huawei Technologies Co., Ltd. 2023-2025. All rights reserved.
+"""
@@ -0,0 +1,32 @@
+"""大模型响应缓存单元测试"""
+import asyncio
+
+import pytest
+from anyio import Path
+
+from apps.llm.cache import DiskCacheBackend, MemoryCacheBackend
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_returns_copy() -> None:
+    """修改读出的结果不会影响缓存中的内容"""
+    backend = MemoryCacheBackend()
+    value = {"choice": "A", "items": [1]}
+    await backend.set("key", value, 60)
+    value["items"].append(2)
+
+    cached = await backend.get("key")
+    assert cached == {"choice": "A", "items": [1]}
+    cached["choice"] = "B"
+    assert await backend.get("key") == {"choice": "A", "items": [1]}
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_concurrent_set(tmp_path: Path) -> None:
+    """并发写入同一Key时，结果是其中一次完整的写入，且不留下临时文件"""
+    backend = DiskCacheBackend(Path(tmp_path))
+    values = [{"result": str(i) * 1000} for i in range(20)]
+    await asyncio.gather(*[backend.set("abcd", value, 60) for value in values])
+
+    assert await backend.get("abcd") in values
+    assert [file.name async for file in Path(tmp_path).rglob("*.tmp")] == []
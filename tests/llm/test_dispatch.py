@@ -0,0 +1,51 @@
+"""LLMDispatcher单元测试"""
+import asyncio
+
+import pytest
+
+from apps.llm.dispatch import LLMDispatcher
+from apps.schemas.config import LLMDispatchConfig, LLMEndpointLimitConfig
+from apps.schemas.enum_var import LLMPriority
+
+ENDPOINT = "http://llm"
+
+
+def _dispatcher(max_concurrency: int) -> LLMDispatcher:
+    dispatcher = object.__new__(LLMDispatcher)
+    dispatcher._config = LLMDispatchConfig(default=LLMEndpointLimitConfig(max_concurrency=max_concurrency))  # noqa: SLF001
+    dispatcher._endpoints = {}  # noqa: SLF001
+    return dispatcher
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_skipped() -> None:
+    """排队中的请求被取消后，归还执行位不会出错，执行位也不会丢失"""
+    dispatcher = _dispatcher(1)
+    holder_entered = asyncio.Event()
+    holder_release = asyncio.Event()
+
+    async def holder() -> None:
+        async with dispatcher.acquire(ENDPOINT, LLMPriority.INTERACTIVE):
+            holder_entered.set()
+            await holder_release.wait()
+
+    async def waiter() -> None:
+        async with dispatcher.acquire(ENDPOINT, LLMPriority.BACKGROUND):
+            pytest.fail("被取消的请求不应拿到执行位")
+
+    holder_task = asyncio.create_task(holder())
+    await holder_entered.wait()
+    waiter_task = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+
+    # 取消排队中的请求，并在其处理取消之前归还执行位
+    holder_release.set()
+    waiter_task.cancel()
+    await holder_task
+    with pytest.raises(asyncio.CancelledError):
+        await waiter_task
+
+    state = dispatcher._get_state(ENDPOINT)  # noqa: SLF001
+    assert state.active == 0
+    async with asyncio.timeout(1), dispatcher.acquire(ENDPOINT, LLMPriority.INTERACTIVE):
+        assert state.active == 1
@@ -0,0 +1,61 @@
+"""JsonGenerator单元测试"""
+from typing import Any
+
+import pytest
+
+from apps.llm.function import JsonGenerator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "a": {"type": "string"},
+        "b": {"type": "string"},
+        "c": {"type": "string"},
+        "d": {"type": "string"},
+    },
+    "required": ["a", "b", "c"],
+}
+
+
+@pytest.mark.asyncio
+async def test_partial_reask_all_missing_fields(monkeypatch: pytest.MonkeyPatch) -> None:
+    """缺少多个必填字段时，一次重新生成所有缺失字段，并与原结果合并"""
+    schemas = []
+
+    async def single_trial(_self: JsonGenerator, schema: dict[str, Any] | None = None, *_: object) -> dict[str, Any]:
+        schemas.append(schema)
+        if schema is None:
+            return {"d": "first"}
+        return {"a": "1", "b": "2", "c": "3", "d": "second"}
+
+    monkeypatch.setattr(JsonGenerator, "_single_trial", single_trial)
+    result = await JsonGenerator("query", [], SCHEMA).generate()
+
+    assert result == {"a": "1", "b": "2", "c": "3", "d": "first"}
+    assert len(schemas) == 2  # noqa: PLR2004
+    assert list(schemas[1]["properties"]) == ["a", "b", "c"]
+    assert schemas[1]["required"] == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("cache_ttl", "temperature"), [(60, 0), (None, None)])
+async def test_cached_generation_uses_zero_temperature(
+    monkeypatch: pytest.MonkeyPatch, cache_ttl: float | None, temperature: float | None,
+) -> None:
+    """启用缓存时以温度0调用大模型；不启用缓存时使用配置的温度"""
+    temperatures = []
+
+    class FakeFunctionLLM:
+        async def call(self, _messages: object, _schema: object, _max_tokens: object, temp: float | None,
+                       **_: object) -> dict[str, Any]:
+            temperatures.append(temp)
+            return {}
+
+    async def assemble_message(_self: JsonGenerator, _schema: object = None) -> str:
+        return "prompt"
+
+    monkeypatch.setattr("apps.llm.function.FunctionLLM", FakeFunctionLLM)
+    monkeypatch.setattr(JsonGenerator, "_assemble_message", assemble_message)
+    await JsonGenerator("query", [], SCHEMA, cache_ttl=cache_ttl)._single_trial()  # noqa: SLF001
+
+    assert temperatures == [temperature]
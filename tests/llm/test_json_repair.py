@@ -0,0 +1,51 @@
+"""JSON本地修复单元测试"""
+import json
+
+from apps.llm.json_repair import coerce_to_schema, repair_json
+
+
+def test_repair_structure() -> None:
+    """测试单引号、Python字面量与尾随逗号的修复"""
+    repaired = repair_json("结果如下：{'a': 'it\"s', 'b': True, 'c': [1, 2,],}")
+    assert json.loads(repaired) == {"a": 'it"s', "b": True, "c": [1, 2]}
+
+
+def test_repair_truncated() -> None:
+    """测试被截断的输出"""
+    repaired = repair_json('{"a": [1, {"b": "trunc')
+    assert json.loads(repaired) == {"a": [1, {"b": "trunc"}]}
+
+
+def test_repair_no_json() -> None:
+    """测试不包含JSON的输出"""
+    assert repair_json("没有JSON") is None
+
+
+def test_coerce_to_schema() -> None:
+    """测试类型转换、默认值填充与枚举对齐"""
+    schema = {
+        "type": "object",
+        "properties": {
+            "num": {"type": "integer"},
+            "flag": {"type": "boolean"},
+            "choice": {"type": "string", "enum": ["API", "SQL"]},
+            "items": {"type": "array", "items": {"type": "string"}},
+            "opt": {"anyOf": [{"type": "number"}, {"type": "null"}]},
+            "ref": {"$ref": "#/$defs/Ref"},
+            "default": {"type": "string", "default": "x"},
+        },
+        "$defs": {"Ref": {"type": "object", "properties": {"k": {"type": "number"}}}},
+    }
+    result = coerce_to_schema(
+        {"num": "3", "flag": "yes", "choice": "api ", "items": "abc", "opt": "1.5", "ref": {"k": "2"}},
+        schema,
+    )
+    assert result == {
+        "num": 3,
+        "flag": True,
+        "choice": "API",
+        "items": ["abc"],
+        "opt": 1.5,
+        "ref": {"k": 2},
+        "default": "x",
+    }
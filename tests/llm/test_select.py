@@ -0,0 +1,12 @@
+"""Select单元测试"""
+import pytest
+
+from apps.llm.patterns.select import Select
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("vote_count", [0, -1])
+async def test_generate_rejects_invalid_vote_count(vote_count: int) -> None:
+    """调用时传入的投票次数小于1时报错"""
+    with pytest.raises(ValueError, match="投票次数"):
+        await Select().generate(question="q", choices=[], vote_count=vote_count)
@@ -0,0 +1,27 @@
+"""AppSearch单元测试"""
+import pytest
+
+from apps.services.app_search import AppSearch
+
+NAME = "智能问答 Bot"
+DESCRIPTION = "基于知识库回答运维问题"
+AUTHOR = "admin"
+
+
+@pytest.mark.parametrize("keyword", ["问答", "BOT", "知识库", "运维问题", "adm", "答"])
+def test_keyword_terms_match_app(keyword: str) -> None:
+    """能被正则匹配的关键字，其搜索词一定是应用搜索词的子集，不会被索引漏掉"""
+    terms = set(AppSearch.terms(NAME, DESCRIPTION, AUTHOR))
+    condition = AppSearch.keyword_filter(keyword)
+    assert set(condition["search_terms"]["$all"]) <= terms
+
+
+def test_keyword_escaped() -> None:
+    """关键字中的正则元字符被转义"""
+    condition = AppSearch.keyword_filter("a.*")
+    assert condition["$or"][0]["name"]["$regex"] == r"a\.\*"
+
+
+def test_blank_keyword() -> None:
+    """只有空白的关键字不生成搜索词，只用正则匹配"""
+    assert "search_terms" not in AppSearch.keyword_filter("  ")
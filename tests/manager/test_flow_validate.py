@@ -0,0 +1,72 @@
+"""FlowService单元测试"""
+import pytest
+
+from apps.exceptions import FlowBranchValidationError, FlowValidationError
+from apps.scheduler.pool.pool import Pool
+from apps.schemas.flow_topology import EdgeItem, FlowItem, NodeItem
+from apps.services.flow_validate import FlowService
+
+
+def _node(step_id: str, call_id: str, node_id: str | None = None, **kwargs: object) -> NodeItem:
+    return NodeItem(stepId=step_id, callId=call_id, nodeId=node_id or call_id, name=step_id, **kwargs)
+
+
+def _edge(edge_id: str, source: str, target: str, branch: str = "") -> EdgeItem:
+    return EdgeItem(edgeId=edge_id, sourceNode=source, targetNode=target, branchId=branch)
+
+
+@pytest.mark.asyncio
+async def test_remove_excess_structure_bulk(monkeypatch: pytest.MonkeyPatch) -> None:
+    """所有Call只查询一次；Call不存在的节点被标记为不可用，指向不存在节点的边被移除"""
+    requested = []
+
+    async def get_calls(_self: Pool, call_ids: set[str]) -> dict[str, object]:
+        requested.append(set(call_ids))
+        return {"LLM": object}
+
+    monkeypatch.setattr(Pool, "get_calls", get_calls)
+    flow = FlowItem(
+        nodes=[_node("start", "start"), _node("a", "LLM"), _node("b", "API", "deleted"), _node("end", "end")],
+        edges=[_edge("e1", "start", "a"), _edge("e2", "a", "b"), _edge("e3", "b", "ghost")],
+    )
+    flow = await FlowService.remove_excess_structure_from_flow(flow)
+    assert requested == [{"LLM", "API"}]
+    assert flow.nodes[2].node_id == "Empty"
+    assert [edge.edge_id for edge in flow.edges] == ["e1", "e2"]
+
+
+@pytest.mark.asyncio
+async def test_branch_errors_reported_together(monkeypatch: pytest.MonkeyPatch) -> None:
+    """分支ID的所有错误一次性返回"""
+
+    async def get_calls(_self: Pool, call_ids: set[str]) -> dict[str, object]:
+        return dict.fromkeys(call_ids, object)
+
+    monkeypatch.setattr(Pool, "get_calls", get_calls)
+    choices = [{"branchId": "x"}, {"branchId": "x"}, {"branchId": "a.b"}]
+    flow = FlowItem(nodes=[_node("c", "choice", parameters={"input_parameters": {"choices": choices}})])
+    with pytest.raises(FlowBranchValidationError) as exc_info:
+        await FlowService.remove_excess_structure_from_flow(flow)
+    assert len(exc_info.value.errors) == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_validate_flow_reports_all_errors() -> None:
+    """节点与边的错误一次性返回"""
+    flow = FlowItem(
+        nodes=[_node("start", "start"), _node("a", "LLM"), _node("a", "LLM"), _node("end", "end")],
+        edges=[_edge("e1", "a", "a"), _edge("e1", "end", "start")],
+    )
+    with pytest.raises(FlowValidationError) as exc_info:
+        await FlowService.validate_flow_illegal(flow)
+    assert len(exc_info.value.errors) == 5  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_connectivity() -> None:
+    """起始节点可达终止节点，且除终止节点外都有出边时连通"""
+    nodes = [_node("start", "start"), _node("a", "LLM"), _node("end", "end")]
+    flow = FlowItem(nodes=nodes, edges=[_edge("e1", "start", "a"), _edge("e2", "a", "end")])
+    assert await FlowService.validate_flow_connectivity(flow)
+    flow = FlowItem(nodes=nodes, edges=[_edge("e1", "start", "a")])
+    assert not await FlowService.validate_flow_connectivity(flow)
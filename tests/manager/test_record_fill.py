@@ -0,0 +1,73 @@
+"""RecordManager合并新旧问答对的单元测试"""
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+
+from apps.services import record as record_module
+from apps.services.record import RecordManager
+
+
+def _record(record_id: str, group_id: str, created_at: float, content: str = "") -> dict[str, Any]:
+    return {
+        "id": record_id,
+        "groupId": group_id,
+        "conversationId": "c",
+        "taskId": "t",
+        "user_sub": "u",
+        "content": content,
+        "metadata": {},
+        "createdAt": created_at,
+    }
+
+
+def _group(group_id: str, records: list[dict[str, Any]]) -> dict[str, Any]:
+    return {"_id": group_id, "user_sub": "u", "conversation_id": "c", "task_id": "t", "records": records}
+
+
+@pytest.fixture
+def record_collection(monkeypatch: pytest.MonkeyPatch) -> list[dict[str, Any]]:
+    """用列表代替record集合"""
+    documents: list[dict[str, Any]] = []
+
+    class FakeCollection:
+        async def find(self, query: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+            group_ids = query["groupId"]["$in"]
+            for document in documents:
+                if document["groupId"] in group_ids:
+                    yield document
+
+    class FakeMongoDB:
+        def get_collection(self, _name: str) -> FakeCollection:
+            return FakeCollection()
+
+    monkeypatch.setattr(record_module, "MongoDB", FakeMongoDB)
+    return documents
+
+
+@pytest.mark.asyncio
+async def test_merge_legacy_and_new(record_collection: list[dict[str, Any]]) -> None:
+    """内嵌的旧问答对与record集合中的问答对合并，按创建时间排序"""
+    record_collection.append(_record("r2", "g", 2))
+    groups = await RecordManager._fill_records([_group("g", [_record("r1", "g", 1), _record("r3", "g", 3)])])  # noqa: SLF001
+    assert [record.id for record in groups[0].records] == ["r1", "r2", "r3"]
+
+
+@pytest.mark.asyncio
+async def test_deduplicate_prefers_record_collection(record_collection: list[dict[str, Any]]) -> None:
+    """迁移中途同一问答对同时存在于两处时只保留一条，以record集合中的为准"""
+    record_collection.append(_record("r1", "g", 1, "new"))
+    groups = await RecordManager._fill_records([_group("g", [_record("r1", "g", 1, "old")])])  # noqa: SLF001
+    assert len(groups[0].records) == 1
+    assert groups[0].records[0].content == "new"
+
+
+@pytest.mark.asyncio
+async def test_latest_only_per_group(record_collection: list[dict[str, Any]]) -> None:
+    """每个问答组只保留最新的问答对，各问答组互不影响"""
+    record_collection.extend([_record("a2", "a", 5), _record("b1", "b", 1)])
+    groups = await RecordManager._fill_records(  # noqa: SLF001
+        [_group("a", [_record("a1", "a", 3)]), _group("b", [])],
+        latest_only=True,
+    )
+    assert [[record.id for record in group.records] for group in groups] == [["a2"], ["b1"]]